@@ -212,11 +212,28 @@ QUEUE_DOWNLOAD = int(QUEUE_DOWNLOAD) if QUEUE_DOWNLOAD else ''
 QUEUE_UPLOAD = environ.get('QUEUE_UPLOAD', '')
 QUEUE_UPLOAD = int(QUEUE_UPLOAD) if QUEUE_UPLOAD else ''
 
+QUEUE_ENGINES = environ.get('QUEUE_ENGINES', '')
+
 ARGO_TOKEN = environ.get('ARGO_TOKEN', '')
 PING_URL = environ.get('PING_URL', '')
 ENABLE_STREAM_LINK = environ.get('ENABLE_STREAM_LINK', 'False').lower() == 'true'
 STREAM_BASE_URL = environ.get('STREAM_BASE_URL', '').rstrip('/')
 STREAM_PORT = environ.get('STREAM_PORT', '')
+STREAM_PREFETCH = environ.get('STREAM_PREFETCH', '')
+STREAM_PREFETCH = int(STREAM_PREFETCH) if STREAM_PREFETCH else 4
+STREAM_SESSIONS = environ.get('STREAM_SESSIONS', '')
+STREAM_SESSIONS = int(STREAM_SESSIONS) if STREAM_SESSIONS else 1
+TG_DOWNLOAD_SESSIONS = environ.get('TG_DOWNLOAD_SESSIONS', '')
+TG_DOWNLOAD_SESSIONS = int(TG_DOWNLOAD_SESSIONS) if TG_DOWNLOAD_SESSIONS else 4
+TG_DOWNLOAD_PARTS = environ.get('TG_DOWNLOAD_PARTS', '')
+TG_DOWNLOAD_PARTS = int(TG_DOWNLOAD_PARTS) if TG_DOWNLOAD_PARTS else 8
+STREAM_CACHE_SIZE = environ.get('STREAM_CACHE_SIZE', '')
+STREAM_CACHE_SIZE = int(STREAM_CACHE_SIZE) if STREAM_CACHE_SIZE else 64
+STREAM_CACHE_DIR = environ.get('STREAM_CACHE_DIR', '').rstrip('/')
+STREAM_CACHE_DISK_SIZE = environ.get('STREAM_CACHE_DISK_SIZE', '')
+STREAM_CACHE_DISK_SIZE = int(STREAM_CACHE_DISK_SIZE) if STREAM_CACHE_DISK_SIZE else 1024
+STREAM_CACHE_TTL = environ.get('STREAM_CACHE_TTL', '')
+STREAM_CACHE_TTL = int(STREAM_CACHE_TTL) if STREAM_CACHE_TTL else 3600
 QUEUE_COMPLETE = environ.get('QUEUE_COMPLETE', 'True').lower() == 'true'
 DISABLE_MIRROR_LEECH = environ.get('DISABLE_MIRROR_LEECH', '')
 INDEX_URL = environ.get('INDEX_URL', '').rstrip('/')
@@ -231,7 +248,14 @@ SESSION_TIMEOUT = int(environ.get('SESSION_TIMEOUT', 0))
 DAILY_MODE = environ.get('DAILY_MODE', 'False').lower() == 'true'
 MEDIA_GROUP = environ.get('MEDIA_GROUP', 'False').lower() == 'true'
 STOP_DUPLICATE = environ.get('STOP_DUPLICATE', 'True').lower() == 'true'
+STOP_DUPLICATE_INDEX = environ.get('STOP_DUPLICATE_INDEX', 'False').lower() == 'true'
+STOP_DUPLICATE_INDEX_SYNC = environ.get('STOP_DUPLICATE_INDEX_SYNC', '')
+STOP_DUPLICATE_INDEX_SYNC = int(STOP_DUPLICATE_INDEX_SYNC) if STOP_DUPLICATE_INDEX_SYNC else 60
 IS_TEAM_DRIVE = environ.get('IS_TEAM_DRIVE', 'True').lower() == 'true'
+GD_WORKERS = environ.get('GD_WORKERS', '')
+GD_WORKERS = int(GD_WORKERS) if GD_WORKERS else 10
+EXTRACT_WORKERS = environ.get('EXTRACT_WORKERS', '')
+EXTRACT_WORKERS = int(EXTRACT_WORKERS) if EXTRACT_WORKERS else 0
 MULTI_TIMEGAP = int(environ.get('MULTI_TIMEGAP', 5))
 AS_DOCUMENT = environ.get('AS_DOCUMENT', 'False').lower() == 'true'
 SAVE_MESSAGE = environ.get('SAVE_MESSAGE', 'True').lower() == 'true'
@@ -240,6 +264,13 @@ LEECH_INFO_PIN = environ.get('LEECH_INFO_PIN', 'False').lower() == 'true'
 USER_SESSION_STRING = environ.get('USER_SESSION_STRING', '')
 SAVE_SESSION_STRING = environ.get('SAVE_SESSION_STRING', '')
 USERBOT_LEECH = environ.get('USERBOT_LEECH', 'False').lower() == 'true'
+LEECH_BOT_TOKENS = environ.get('LEECH_BOT_TOKENS', '')
+LEECH_UPLOAD_WORKERS = environ.get('LEECH_UPLOAD_WORKERS', '')
+LEECH_UPLOAD_WORKERS = int(LEECH_UPLOAD_WORKERS) if LEECH_UPLOAD_WORKERS else 4
+LEECH_UPLOAD_SESSIONS = environ.get('LEECH_UPLOAD_SESSIONS', '')
+LEECH_UPLOAD_SESSIONS = int(LEECH_UPLOAD_SESSIONS) if LEECH_UPLOAD_SESSIONS else 4
+LEECH_UPLOAD_PARTS = environ.get('LEECH_UPLOAD_PARTS', '')
+LEECH_UPLOAD_PARTS = int(LEECH_UPLOAD_PARTS) if LEECH_UPLOAD_PARTS else 8
 AUTO_DELETE_MESSAGE_DURATION = int(environ.get('AUTO_DELETE_MESSAGE_DURATION', 30))
 AUTO_DELETE_UPLOAD_MESSAGE_DURATION = int(environ.get('AUTO_DELETE_UPLOAD_MESSAGE_DURATION', 30))
 STATUS_UPDATE_INTERVAL = int(environ.get('STATUS_UPDATE_INTERVAL', 5))
@@ -289,6 +320,10 @@ LINK_LOG = int(LINK_LOG) if LINK_LOG.isdigit() or LINK_LOG.startswith('-') else
 
 # ============================= LIMITS =================================
 EQUAL_SPLITS = environ.get('EQUAL_SPLITS', 'False').lower() == 'true'
+LEECH_VIRTUAL_SPLIT = environ.get('LEECH_VIRTUAL_SPLIT', 'False').lower() == 'true'
+ZIP_PIPELINE_VOLUMES = environ.get('ZIP_PIPELINE_VOLUMES', '')
+ZIP_PIPELINE_VOLUMES = int(ZIP_PIPELINE_VOLUMES) if ZIP_PIPELINE_VOLUMES else 0
+EARLY_UPLOAD = environ.get('EARLY_UPLOAD', 'False').lower() == 'true'
 
 CLONE_LIMIT = ''
 
@@ -501,6 +536,8 @@ RSS_CHAT = int(RSS_CHAT) if RSS_CHAT.isdigit() or RSS_CHAT.startswith('-') else
 
 RSS_DELAY = environ.get('RSS_DELAY', '')
 RSS_DELAY = int(RSS_DELAY) if RSS_DELAY else 900
+RSS_WORKERS = environ.get('RSS_WORKERS', '')
+RSS_WORKERS = int(RSS_WORKERS) if RSS_WORKERS else 10
 # ======================================================================
 
 
@@ -545,6 +582,14 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                'ENABLE_STREAM_LINK': ENABLE_STREAM_LINK,
                'STREAM_BASE_URL': STREAM_BASE_URL,
                'STREAM_PORT': STREAM_PORT,
+               'STREAM_PREFETCH': STREAM_PREFETCH,
+               'STREAM_SESSIONS': STREAM_SESSIONS,
+               'TG_DOWNLOAD_SESSIONS': TG_DOWNLOAD_SESSIONS,
+               'TG_DOWNLOAD_PARTS': TG_DOWNLOAD_PARTS,
+               'STREAM_CACHE_SIZE': STREAM_CACHE_SIZE,
+               'STREAM_CACHE_DIR': STREAM_CACHE_DIR,
+               'STREAM_CACHE_DISK_SIZE': STREAM_CACHE_DISK_SIZE,
+               'STREAM_CACHE_TTL': STREAM_CACHE_TTL,
                'DISABLE_MIRROR_LEECH': DISABLE_MIRROR_LEECH,
                'AUTHORIZED_CHATS': AUTHORIZED_CHATS,
                'SUDO_USERS': SUDO_USERS,
@@ -558,7 +603,11 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                'USE_SERVICE_ACCOUNTS': USE_SERVICE_ACCOUNTS,
                'CMD_SUFFIX': CMD_SUFFIX,
                'STOP_DUPLICATE': STOP_DUPLICATE,
+               'STOP_DUPLICATE_INDEX': STOP_DUPLICATE_INDEX,
+               'STOP_DUPLICATE_INDEX_SYNC': STOP_DUPLICATE_INDEX_SYNC,
                'IS_TEAM_DRIVE': IS_TEAM_DRIVE,
+               'GD_WORKERS': GD_WORKERS,
+               'EXTRACT_WORKERS': EXTRACT_WORKERS,
                'MULTI_TIMEGAP': MULTI_TIMEGAP,
                'AS_DOCUMENT': AS_DOCUMENT,
                'SAVE_MESSAGE': SAVE_MESSAGE,
@@ -567,6 +616,10 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                'USER_SESSION_STRING': USER_SESSION_STRING,
                'SAVE_SESSION_STRING': SAVE_SESSION_STRING,
                'USERBOT_LEECH': USERBOT_LEECH,
+               'LEECH_BOT_TOKENS': LEECH_BOT_TOKENS,
+               'LEECH_UPLOAD_WORKERS': LEECH_UPLOAD_WORKERS,
+               'LEECH_UPLOAD_SESSIONS': LEECH_UPLOAD_SESSIONS,
+               'LEECH_UPLOAD_PARTS': LEECH_UPLOAD_PARTS,
                'AUTO_DELETE_MESSAGE_DURATION': AUTO_DELETE_MESSAGE_DURATION,
                'AUTO_DELETE_UPLOAD_MESSAGE_DURATION': AUTO_DELETE_UPLOAD_MESSAGE_DURATION,
                'STATUS_UPDATE_INTERVAL': STATUS_UPDATE_INTERVAL,
@@ -579,6 +632,7 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                'QUEUE_ALL': QUEUE_ALL,
                'QUEUE_DOWNLOAD': QUEUE_DOWNLOAD,
                'QUEUE_UPLOAD': QUEUE_UPLOAD,
+               'QUEUE_ENGINES': QUEUE_ENGINES,
                'QUEUE_COMPLETE': QUEUE_COMPLETE,
                # RCLONE
                'ENABLE_FASTDL': ENABLE_FASTDL,
@@ -597,6 +651,9 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                'LINK_LOG': LINK_LOG,
                # LIMITS
                'EQUAL_SPLITS': EQUAL_SPLITS,
+               'LEECH_VIRTUAL_SPLIT': LEECH_VIRTUAL_SPLIT,
+               'ZIP_PIPELINE_VOLUMES': ZIP_PIPELINE_VOLUMES,
+               'EARLY_UPLOAD': EARLY_UPLOAD,
                'DAILY_LIMIT_SIZE': DAILY_LIMIT_SIZE,
                'CLONE_LIMIT': CLONE_LIMIT,
                'LEECH_LIMIT': LEECH_LIMIT,
@@ -720,6 +777,7 @@ config_dict = {'BOT_TOKEN': BOT_TOKEN,
                # RSS
                'RSS_CHAT': RSS_CHAT,
                'RSS_DELAY': RSS_DELAY,
+               'RSS_WORKERS': RSS_WORKERS,
                # TORSEARCH
                'SEARCH_API_LINK': SEARCH_API_LINK,
                'SEARCH_PLUGINS': SEARCH_PLUGINS,
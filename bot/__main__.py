@@ -19,7 +19,7 @@ from psutil import boot_time, cpu_count, cpu_freq, cpu_percent, disk_usage, swap
 from bot import bot, bot_loop, bot_dict, bot_lock, bot_name, botStartTime, Intervals, user_data, config_dict, scheduler, LOGGER, DATABASE_URL, INCOMPLETE_TASK_NOTIFIER, ARIA_NAME, QBIT_NAME, FFMPEG_NAME
 from bot.helper.ext_utils.argo_tunnel import ping_base_route, kill_route
 from bot.helper.ext_utils.bot_utils import cmd_exec, sync_to_async, new_task, update_user_ldata
-from bot.helper.ext_utils.conf_loads import intialize_userbot, intialize_savebot
+from bot.helper.ext_utils.conf_loads import intialize_userbot, intialize_savebot, intialize_leech_bots
 from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.files_utils import clean_all, exit_clean_up, clean_target
 from bot.helper.ext_utils.help_messages import HelpString, get_help_button
@@ -27,9 +27,11 @@ from bot.helper.ext_utils.jdownloader_booter import jdownloader
 from bot.helper.ext_utils.links_utils import is_media
 from bot.helper.ext_utils.shortenurl import short_url
 from bot.helper.ext_utils.status_utils import get_readable_file_size, get_readable_time, get_progress_bar_string
+from bot.helper.ext_utils.task_manager import queue_stats
 from bot.helper.ext_utils.telegraph_helper import telegraph
 from bot.helper.listeners.aria2_listener import start_aria2_listener
 from bot.helper.mirror_utils.rclone_utils.serve import rclone_serve_booter
+from bot.helper.stream_utils.chunk_cache import chunk_cache
 from bot.helper.stream_utils.file_properties import gen_link
 from bot.helper.stream_utils.web_services import start_server, server
 from bot.helper.telegram_helper.bot_commands import BotCommands
@@ -47,6 +49,8 @@ async def stats(_, message: Message):
         last_commit = last_commit[0]
     else:
         last_commit = 'No UPSTREAM_REPO'
+    qstats = queue_stats()
+    qdl, qup = qstats['dl'], qstats['up']
     cpu, mem, disk, swap = f'{cpu_percent(interval=1)}%', f'{virtual_memory().percent}%', f'{disk_usage("/")[3]}%', f'{swap_memory().percent}%'
     msg = f'''
 <b>UPSTREAM REPO AND BOT STATUS</b>
@@ -70,6 +74,19 @@ async def stats(_, message: Message):
 <b>🌚 DISK:</b> {get_progress_bar_string(disk)} {disk}
 <b>🌚 SWAP:</b> {get_progress_bar_string(swap)} {swap}
 <b>🌚 OS:</b> {system()}, {architecture()[0]}, {release()}\n
+<b>QUEUE STATUS</b>
+<b>🌚 Download:</b> {qdl['running']} running, {qdl['queued']} queued
+<b>🌚 Upload:</b> {qup['running']} running, {qup['queued']} queued
+<b>🌚 Avg Wait:</b> {get_readable_time(qdl['avg_wait']) or '0s'} / {get_readable_time(qup['avg_wait']) or '0s'}
+<b>🌚 Max Wait:</b> {get_readable_time(qdl['max_wait']) or '0s'} / {get_readable_time(qup['max_wait']) or '0s'}
+'''
+    if config_dict['ENABLE_STREAM_LINK']:
+        cstats = chunk_cache.stats()
+        msg += f'''
+<b>STREAM CACHE</b>
+<b>🌚 Hits:</b> {cstats['hits']} memory, {cstats['disk_hits']} disk, {cstats['joined']} joined
+<b>🌚 Misses:</b> {cstats['misses']} ({cstats['hit_ratio']:.1f}% hit ratio)
+<b>🌚 Size:</b> {get_readable_file_size(cstats['memory_bytes'])} memory / {get_readable_file_size(cstats['disk_bytes'])} disk
 '''
     statsmsg = await sendingMessage(msg, message, config_dict['IMAGE_STATS'])
     await auto_delete_message(message, statsmsg)
@@ -181,6 +198,7 @@ async def restart(_, message: Message):
         _, msg = await gather(kill_route(), sendMessage('<i>Restarting bro wait if I did not respond from 2-3 min tag my broken 💔 baby @...</i>', message))
         if scheduler.running:
             scheduler.shutdown(wait=False)
+        await rss.close_rss_session()
         if qb := Intervals['qb']:
             qb.cancel()
         if jd := Intervals['jd']:
@@ -188,6 +206,8 @@ async def restart(_, message: Message):
         if st := Intervals['status']:
             for intvl in list(st.values()):
                 intvl.cancel()
+        if DATABASE_URL:
+            await DbManager().flush()
         await gather(sync_to_async(clean_all), server.cleanup())
         proc1 = await create_subprocess_exec('pkill', '-9', '-f', f'gunicorn|{ARIA_NAME}|{QBIT_NAME}|{FFMPEG_NAME}|gclone|java|alass')
         proc2 = await create_subprocess_exec('python3', 'update.py')
@@ -340,6 +360,7 @@ async def main():
     await gather(set_command(),
                  start_server(),
                  intialize_userbot(False),
+                 intialize_leech_bots(False),
                  sync_to_async(clean_all),
                  torrent_search.initiate_search_tools(),
                  telegraph.create_account(),
@@ -4,18 +4,18 @@ from asyncio import sleep, gather, create_subprocess_exec
 from asyncio.subprocess import PIPE
 from glob import glob
 from natsort import natsorted
-from os import walk, path as ospath
+from os import walk, path as ospath, cpu_count
 from pyrogram import Client
 from pyrogram.enums import ChatMemberStatus
 from pyrogram.types import Message
 from secrets import token_urlsafe
 
-from bot import bot_name, bot_dict, bot_lock, config_dict, user_data, multi_tags, task_dict, task_dict_lock, cpu_eater_lock, subprocess_lock, GLOBAL_EXTENSION_FILTER, LOGGER, DEFAULT_SPLIT_SIZE, FFMPEG_NAME
+from bot import bot_name, bot_dict, bot_lock, config_dict, user_data, multi_tags, task_dict, task_dict_lock, cpu_eater_lock, GLOBAL_EXTENSION_FILTER, LOGGER, DEFAULT_SPLIT_SIZE, FFMPEG_NAME
 from bot.helper.ext_utils.bot_utils import new_task, sync_to_async, is_premium_user, update_user_ldata, getSizeBytes
 from bot.helper.ext_utils.bulk_links import extractBulkLinks
 from bot.helper.ext_utils.conf_loads import intialize_savebot
 from bot.helper.ext_utils.exceptions import NotSupportedExtractionArchive
-from bot.helper.ext_utils.files_utils import is_archive, is_archive_split, is_first_archive_split, get_base_name, clean_target, get_path_size
+from bot.helper.ext_utils.files_utils import is_archive, is_archive_split, is_first_archive_split, get_archive_parts, get_base_name, clean_target, get_path_size
 from bot.helper.ext_utils.links_utils import is_gdrive_id, is_rclone_path, is_gdrive_link, is_tele_link
 from bot.helper.ext_utils.media_utils import createThumb, get_document_type, SampleVideo, createArchive, split_file
 from bot.helper.mirror_utils.gdrive_utlis.list import gdriveList
@@ -50,6 +50,8 @@ class TaskConfig:
         self.isClone = False
         self.isYtDlp = False
         self.equalSplits: bool = False
+        self.virtualSplits: dict = {}
+        self.earlyUpload = None
         self.isSharer: bool = False
         self.extract: bool = False
         self.compress: bool = False
@@ -95,6 +97,14 @@ class TaskConfig:
     def getConfigPath(self, dest: str):
         return f'rclone/{self.user_id}.conf' if dest.startswith('mrcc:') or dest == self.user_dict.get('rclone_path') else 'rclone.conf'
 
+    def canEarlyUpload(self):
+        if not config_dict['EARLY_UPLOAD'] or self.earlyUpload or not (self.isLeech or is_gdrive_id(self.upDest)):
+            return False
+        if any((self.compress, self.extract, self.join, self.seed, self.sampleVideo, self.screenShots, self.vidMode, self.isRename,
+                self.isGofile, self.isClone, self.sameDir)):
+            return False
+        return not any(self.user_dict.get(key) for key in ('prename', 'sufname', 'remname', 'metadata', 'clean_metadata'))
+
     async def isTokenExists(self, path, status):
         if is_rclone_path(path):
             config_path = self.getConfigPath(path)
@@ -407,13 +417,14 @@ class TaskConfig:
         try:
             LOGGER.info('Extracting: %s', self.name)
             async with task_dict_lock:
-                task_dict[self.mid] = ExtractStatus(self, size, gid)
+                task_dict[self.mid] = status = ExtractStatus(self, size, gid)
             if await aiopath.isdir(dl_path):
                 if self.seed:
                     self.newDir = f'{self.dir}10000'
                     up_path = ospath.join(self.newDir, self.name)
                 else:
                     up_path = dl_path
+                jobs, archives = [], {}
                 for dirpath, _, files in await sync_to_async(walk, dl_path, topdown=False):
                     for file_ in natsorted(files):
                         if is_first_archive_split(file_) or is_archive(file_) and not file_.endswith('.rar'):
@@ -422,22 +433,13 @@ class TaskConfig:
                             cmd = ['7z', 'x', f'-p{pswd}', f_path, f'-o{t_path}', '-aot', '-xr!@PaxHeader']
                             if not pswd:
                                 del cmd[2]
-                            async with subprocess_lock:
-                                if self.suproc == 'cancelled':
-                                    return
-                                self.suproc = await create_subprocess_exec(*cmd, stderr=PIPE)
-                            _, stderr = await self.suproc.communicate()
-                            code = self.suproc.returncode
-                            if code == -9:
-                                return
-                            if code != 0:
-                                LOGGER.error('%s. Unable to extract archive splits!. Path: %s', stderr.decode().strip(), f_path)
-                    if not self.seed and self.suproc is not None and self.suproc.returncode == 0:
-                        for file_ in natsorted(files):
-                            if is_archive_split(file_) or is_archive(file_):
-                                del_path = ospath.join(dirpath, file_)
-                                if not await clean_target(del_path):
-                                    return
+                            a_size = 0
+                            for part in get_archive_parts(file_, files):
+                                a_size += await aiopath.getsize(ospath.join(dirpath, part))
+                            jobs.append((dirpath, t_path, f_path, cmd, a_size))
+                    archives[dirpath] = [file_ for file_ in natsorted(files) if is_archive_split(file_) or is_archive(file_)]
+                if not await self._extract_archives(jobs, archives, status):
+                    return
             else:
                 up_path = get_base_name(dl_path)
                 if self.seed:
@@ -446,20 +448,15 @@ class TaskConfig:
                 cmd = ['7z', 'x', f'-p{pswd}', dl_path, f'-o{up_path}', '-aot', '-xr!@PaxHeader']
                 if not pswd:
                     del cmd[2]
-                async with subprocess_lock:
-                    if self.suproc == 'cancelled':
-                        return
-                    self.suproc = await create_subprocess_exec(*cmd, stderr=PIPE)
-                _, stderr = await self.suproc.communicate()
-                code = self.suproc.returncode
-                if code == -9:
+                code, stderr = await status.archive.run(self, cmd, size)
+                if code is None or code == -9:
                     return
                 if code == 0:
                     LOGGER.info('Extracted Path: %s', up_path)
                     if not self.seed and not await clean_target(dl_path):
                         return
                 else:
-                    LOGGER.error('%s. Unable to extract archive! Uploading anyway. Path: %s', stderr.decode().strip(), dl_path)
+                    LOGGER.error('%s. Unable to extract archive! Uploading anyway. Path: %s', stderr, dl_path)
                     self.newDir = ''
                     up_path = dl_path
         except NotSupportedExtractionArchive:
@@ -471,6 +468,55 @@ class TaskConfig:
         await self.editMetadata(up_path, gid)
         return up_path
 
+    @staticmethod
+    def _group_jobs(jobs: list) -> list:
+        """Jobs whose target folders are the same or nested in each other, in listed order. 7z only renames
+        a clashing name against files already on disk, so such jobs must not run at the same time."""
+        def nested(a, b):
+            return a == b or a.startswith(ospath.join(b, '')) or b.startswith(ospath.join(a, ''))
+
+        groups = []
+        for index, job in enumerate(jobs):
+            related = [group for group in groups if any(nested(job[1], jobs[i][1]) for i in group)]
+            merged = sorted([index, *(i for group in related for i in group)])
+            groups = [group for group in groups if group not in related] + [merged]
+        return [[jobs[i] for i in group] for group in sorted(groups)]
+
+    async def _extract_archives(self, jobs: list, archives: dict, status: ExtractStatus):
+        workers = config_dict['EXTRACT_WORKERS'] or max(cpu_count() // 2, 1)
+        groups = self._group_jobs(jobs)
+        pending, failed, extracted = iter(groups), set(), False
+
+        async def _worker():
+            nonlocal extracted
+            for group in pending:
+                for dirpath, _, f_path, cmd, a_size in group:
+                    if status.archive.cancelled:
+                        return
+                    code, stderr = await status.archive.run(self, cmd, a_size)
+                    if code is None or code == -9:
+                        status.archive.cancelled = True
+                        return
+                    if code == 0:
+                        extracted = True
+                    else:
+                        failed.add(dirpath)
+                        LOGGER.error('%s. Unable to extract archive splits!. Path: %s', stderr, f_path)
+
+        if len(groups) > 1:
+            LOGGER.info('Extracting %s archives in %s folders with %s workers: %s', len(jobs), len(groups), min(workers, len(groups)), self.name)
+        await gather(*(_worker() for _ in range(min(workers, len(groups)))))
+        if status.archive.cancelled:
+            return False
+        if not self.seed and extracted:
+            for dirpath, files in archives.items():
+                if dirpath in failed:
+                    continue
+                for file_ in files:
+                    if not await clean_target(ospath.join(dirpath, file_)):
+                        return False
+        return True
+
     async def proceedCompress(self, dl_path: str, size: int, gid: str):
         dl_path = await self.preName(dl_path)
         await self.editMetadata(dl_path, gid)
@@ -480,7 +526,7 @@ class TaskConfig:
         pswd = self.compress if isinstance(self.compress, str) else ''
         if zipmode in ['zfolder', 'zfpart']:
             async with task_dict_lock:
-                task_dict[self.mid] = ZipStatus(self, size, gid)
+                task_dict[self.mid] = zstatus = ZipStatus(self, size, gid)
             if self.seed and self.isLeech:
                 self.newDir = f'{self.dir}10000'
                 up_path = ospath.join(self.newDir, f'{self.name}.zip')
@@ -491,7 +537,7 @@ class TaskConfig:
                 up_path = ospath.join(zfpart, f'{self.name}.zip')
             else:
                 up_path = f'{dl_path}.zip'
-            res = await createArchive(self, dl_path, up_path, size, pswd, zipmode == 'zfpart')
+            res = await createArchive(self, dl_path, up_path, size, pswd, zipmode == 'zfpart', zstatus.archive)
             if not res:
                 return
             return zfpart or up_path
@@ -512,11 +558,11 @@ class TaskConfig:
                 self.newDir = f'{self.dir}10000'
                 dest_path = ospath.join(self.newDir, f'{file_}.zip')
                 async with task_dict_lock:
-                    task_dict[self.mid] = ZipStatus(self, size, gid, fpath)
+                    task_dict[self.mid] = zstatus = ZipStatus(self, size, gid, fpath)
                 if zipmode == 'zeach':
-                    archived.append(await createArchive(self, fpath, dest_path, size, pswd))
+                    archived.append(await createArchive(self, fpath, dest_path, size, pswd, progress=zstatus.archive))
                 elif zipmode == 'zpart' or (zipmode == 'auto' and int(size) > self.splitSize):
-                    archived.append(await createArchive(self, fpath, dest_path, size, pswd, True))
+                    archived.append(await createArchive(self, fpath, dest_path, size, pswd, True, zstatus.archive))
                 for item in glob(f'{self.newDir}/*'):
                     await move(item, dirpath)
                 await clean_target(self.newDir)
@@ -537,6 +583,11 @@ class TaskConfig:
                         async with task_dict_lock:
                             task_dict[self.mid] = sp
                         LOGGER.info('Splitting (%s): %s', self.splitSize, self.name)
+                    if config_dict['LEECH_VIRTUAL_SPLIT'] and not (await get_document_type(f_path))[0]:
+                        parts = -(-f_size // self.splitSize)
+                        self.virtualSplits[f_path] = -(-f_size // parts) if self.equalSplits else self.splitSize
+                        LOGGER.info('Uploading as virtual parts of %s bytes: %s', self.virtualSplits[f_path], f_path)
+                        continue
                     res = await split_file(f_path, f_size, dirpath, self.splitSize, self, sp)
                     if not res:
                         return
@@ -1,5 +1,5 @@
 from aiohttp import ClientSession
-from asyncio import create_subprocess_shell, create_subprocess_exec, run_coroutine_threadsafe, gather, sleep
+from asyncio import create_subprocess_shell, create_subprocess_exec, run_coroutine_threadsafe, sleep
 from asyncio.subprocess import PIPE
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial, wraps
@@ -48,7 +48,9 @@ class UserDaily:
             await self._reset()
 
     async def _reset(self):
-        await gather(update_user_ldata(self._user_id, 'daily_limit', 1), update_user_ldata(self._user_id, 'reset_limit', time() + 86400))
+        user_data.setdefault(self._user_id, {}).update({'daily_limit': 1, 'reset_limit': time() + 86400})
+        if DATABASE_URL:
+            await DbManager().update_user_data(self._user_id)
 
 
 def bt_selection_buttons(id_: int):
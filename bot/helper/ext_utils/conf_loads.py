@@ -11,6 +11,8 @@ from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.files_utils import clean_target
 from bot.helper.ext_utils.task_manager import start_from_queued
 from bot.helper.mirror_utils.rclone_utils.serve import rclone_serve_booter
+from bot.helper.mirror_utils.upload_utils.leech_clients import leech_clients
+from bot.helper.stream_utils.custom_dl import drop_streamer
 from bot.helper.stream_utils.web_services import start_server, server
 from bot.helper.telegram_helper.message_utils import update_status_message
 from bot.modules.rss import addJob
@@ -25,11 +27,22 @@ default_values = {'AUTO_DELETE_MESSAGE_DURATION': 30,
                   'DOWNLOAD_DIR': '/usr/src/app/downloads/',
                   'DISABLE_MIRROR_LEECH': '',
                   'USER_SESSION_STRING': '',
+                  'LEECH_UPLOAD_WORKERS': 4,
+                  'LEECH_UPLOAD_SESSIONS': 4,
+                  'LEECH_UPLOAD_PARTS': 8,
                   'LEECH_SPLIT_SIZE': DEFAULT_SPLIT_SIZE,
                   'STATUS_UPDATE_INTERVAL': 10,
                   'SEARCH_LIMIT': 0,
                   'STATUS_LIMIT': 10,
                   'RSS_DELAY': 900,
+                  'RSS_WORKERS': 10,
+                  'STREAM_PREFETCH': 4,
+                  'STREAM_SESSIONS': 1,
+                  'TG_DOWNLOAD_SESSIONS': 4,
+                  'TG_DOWNLOAD_PARTS': 8,
+                  'STREAM_CACHE_SIZE': 64,
+                  'STREAM_CACHE_DISK_SIZE': 1024,
+                  'STREAM_CACHE_TTL': 3600,
                   'CLOUD_LINK_FILTERS': '',
                   'UPSTREAM_BRANCH': 'main',
                   'FSUB_BUTTON_NAME': 'Join Group',
@@ -38,6 +51,10 @@ default_values = {'AUTO_DELETE_MESSAGE_DURATION': 30,
                   'AUTHOR_URL': 'https://t.me/maheshsirop',
                   'DRIVE_SEARCH_TITLE': 'Drive Search',
                   'GD_INFO': 'By @maheshsirop',
+                  'GD_WORKERS': 10,
+                  'EXTRACT_WORKERS': 0,
+                  'ZIP_PIPELINE_VOLUMES': 0,
+                  'STOP_DUPLICATE_INDEX_SYNC': 60,
                   'RCLONE_TFSIMULATION': 4,
                   'SESSION_TIMEOUT': 0,
                   'PROG_FINISH': '⬢',
@@ -185,11 +202,28 @@ async def load_config():
     QUEUE_UPLOAD = environ.get('QUEUE_UPLOAD', '')
     QUEUE_UPLOAD = int(QUEUE_UPLOAD) if QUEUE_UPLOAD else ''
 
+    QUEUE_ENGINES = environ.get('QUEUE_ENGINES', '')
+
     QUEUE_COMPLETE = environ.get('QUEUE_COMPLETE', 'False').lower() == 'true'
 
     ENABLE_STREAM_LINK = environ.get('ENABLE_STREAM_LINK', 'False').lower() == 'true'
     STREAM_BASE_URL = environ.get('STREAM_BASE_URL', '').rstrip('/')
     STREAM_PORT = environ.get('STREAM_PORT', '')
+    STREAM_PREFETCH = environ.get('STREAM_PREFETCH', '')
+    STREAM_PREFETCH = int(STREAM_PREFETCH) if STREAM_PREFETCH else 4
+    STREAM_SESSIONS = environ.get('STREAM_SESSIONS', '')
+    STREAM_SESSIONS = int(STREAM_SESSIONS) if STREAM_SESSIONS else 1
+    TG_DOWNLOAD_SESSIONS = environ.get('TG_DOWNLOAD_SESSIONS', '')
+    TG_DOWNLOAD_SESSIONS = int(TG_DOWNLOAD_SESSIONS) if TG_DOWNLOAD_SESSIONS else 4
+    TG_DOWNLOAD_PARTS = environ.get('TG_DOWNLOAD_PARTS', '')
+    TG_DOWNLOAD_PARTS = int(TG_DOWNLOAD_PARTS) if TG_DOWNLOAD_PARTS else 8
+    STREAM_CACHE_SIZE = environ.get('STREAM_CACHE_SIZE', '')
+    STREAM_CACHE_SIZE = int(STREAM_CACHE_SIZE) if STREAM_CACHE_SIZE else 64
+    STREAM_CACHE_DIR = environ.get('STREAM_CACHE_DIR', '').rstrip('/')
+    STREAM_CACHE_DISK_SIZE = environ.get('STREAM_CACHE_DISK_SIZE', '')
+    STREAM_CACHE_DISK_SIZE = int(STREAM_CACHE_DISK_SIZE) if STREAM_CACHE_DISK_SIZE else 1024
+    STREAM_CACHE_TTL = environ.get('STREAM_CACHE_TTL', '')
+    STREAM_CACHE_TTL = int(STREAM_CACHE_TTL) if STREAM_CACHE_TTL else 3600
 
     DISABLE_MIRROR_LEECH = environ.get('DISABLE_MIRROR_LEECH', '')
     INDEX_URL = environ.get('INDEX_URL', '').rstrip('/')
@@ -201,7 +235,14 @@ async def load_config():
     DAILY_MODE = environ.get('DAILY_MODE', 'False').lower() == 'true'
     MEDIA_GROUP = environ.get('MEDIA_GROUP', 'False').lower() == 'true'
     STOP_DUPLICATE = environ.get('STOP_DUPLICATE', 'False').lower() == 'true'
+    STOP_DUPLICATE_INDEX = environ.get('STOP_DUPLICATE_INDEX', 'False').lower() == 'true'
+    STOP_DUPLICATE_INDEX_SYNC = environ.get('STOP_DUPLICATE_INDEX_SYNC', '')
+    STOP_DUPLICATE_INDEX_SYNC = int(STOP_DUPLICATE_INDEX_SYNC) if STOP_DUPLICATE_INDEX_SYNC else 60
     IS_TEAM_DRIVE = environ.get('IS_TEAM_DRIVE', 'False').lower() == 'true'
+    GD_WORKERS = environ.get('GD_WORKERS', '')
+    GD_WORKERS = int(GD_WORKERS) if GD_WORKERS else 10
+    EXTRACT_WORKERS = environ.get('EXTRACT_WORKERS', '')
+    EXTRACT_WORKERS = int(EXTRACT_WORKERS) if EXTRACT_WORKERS else 0
     MULTI_TIMEGAP = int(environ.get('MULTI_TIMEGAP', 5))
     AS_DOCUMENT = environ.get('AS_DOCUMENT', 'False').lower() == 'true'
     SAVE_MESSAGE = environ.get('SAVE_MESSAGE', 'False').lower() == 'true'
@@ -210,6 +251,13 @@ async def load_config():
     USER_SESSION_STRING = environ.get('USER_SESSION_STRING', '')
     SAVE_SESSION_STRING = environ.get('SAVE_SESSION_STRING', '')
     USERBOT_LEECH = environ.get('USERBOT_LEECH', 'False').lower() == 'true'
+    LEECH_BOT_TOKENS = environ.get('LEECH_BOT_TOKENS', '')
+    LEECH_UPLOAD_WORKERS = environ.get('LEECH_UPLOAD_WORKERS', '')
+    LEECH_UPLOAD_WORKERS = int(LEECH_UPLOAD_WORKERS) if LEECH_UPLOAD_WORKERS else 4
+    LEECH_UPLOAD_SESSIONS = environ.get('LEECH_UPLOAD_SESSIONS', '')
+    LEECH_UPLOAD_SESSIONS = int(LEECH_UPLOAD_SESSIONS) if LEECH_UPLOAD_SESSIONS else 4
+    LEECH_UPLOAD_PARTS = environ.get('LEECH_UPLOAD_PARTS', '')
+    LEECH_UPLOAD_PARTS = int(LEECH_UPLOAD_PARTS) if LEECH_UPLOAD_PARTS else 8
     AUTO_DELETE_MESSAGE_DURATION = int(environ.get('AUTO_DELETE_MESSAGE_DURATION', 30))
     AUTO_DELETE_UPLOAD_MESSAGE_DURATION = int(environ.get('AUTO_DELETE_UPLOAD_MESSAGE_DURATION', 0))
     YT_DLP_OPTIONS = environ.get('YT_DLP_OPTIONS', '')
@@ -261,6 +309,10 @@ async def load_config():
 
     # ============================= LIMITS =================================
     EQUAL_SPLITS = environ.get('EQUAL_SPLITS', 'False').lower() == 'true'
+    LEECH_VIRTUAL_SPLIT = environ.get('LEECH_VIRTUAL_SPLIT', 'False').lower() == 'true'
+    ZIP_PIPELINE_VOLUMES = environ.get('ZIP_PIPELINE_VOLUMES', '')
+    ZIP_PIPELINE_VOLUMES = int(ZIP_PIPELINE_VOLUMES) if ZIP_PIPELINE_VOLUMES else 0
+    EARLY_UPLOAD = environ.get('EARLY_UPLOAD', 'False').lower() == 'true'
 
     CLONE_LIMIT = environ.get('CLONE_LIMIT', '')
     CLONE_LIMIT = float(CLONE_LIMIT) if CLONE_LIMIT else ''
@@ -447,6 +499,8 @@ async def load_config():
     RSS_CHAT = int(RSS_CHAT) if RSS_CHAT.isdigit() or RSS_CHAT.startswith('-') else RSS_CHAT
     RSS_DELAY = environ.get('RSS_DELAY', '')
     RSS_DELAY = int(RSS_DELAY) if RSS_DELAY else 900
+    RSS_WORKERS = environ.get('RSS_WORKERS', '')
+    RSS_WORKERS = int(RSS_WORKERS) if RSS_WORKERS else 10
     # ======================================================================
 
     # ============================ TORSEARCH ===============================
@@ -513,6 +567,14 @@ async def load_config():
                         'ENABLE_STREAM_LINK': ENABLE_STREAM_LINK,
                         'STREAM_BASE_URL': STREAM_BASE_URL,
                         'STREAM_PORT': STREAM_PORT,
+                        'STREAM_PREFETCH': STREAM_PREFETCH,
+                        'STREAM_SESSIONS': STREAM_SESSIONS,
+                        'TG_DOWNLOAD_SESSIONS': TG_DOWNLOAD_SESSIONS,
+                        'TG_DOWNLOAD_PARTS': TG_DOWNLOAD_PARTS,
+                        'STREAM_CACHE_SIZE': STREAM_CACHE_SIZE,
+                        'STREAM_CACHE_DIR': STREAM_CACHE_DIR,
+                        'STREAM_CACHE_DISK_SIZE': STREAM_CACHE_DISK_SIZE,
+                        'STREAM_CACHE_TTL': STREAM_CACHE_TTL,
                         'DISABLE_MIRROR_LEECH': DISABLE_MIRROR_LEECH,
                         'AUTHORIZED_CHATS': AUTHORIZED_CHATS,
                         'SUDO_USERS': SUDO_USERS,
@@ -524,7 +586,11 @@ async def load_config():
                         'USE_SERVICE_ACCOUNTS': USE_SERVICE_ACCOUNTS,
                         'CMD_SUFFIX': CMD_SUFFIX,
                         'STOP_DUPLICATE': STOP_DUPLICATE,
+                        'STOP_DUPLICATE_INDEX': STOP_DUPLICATE_INDEX,
+                        'STOP_DUPLICATE_INDEX_SYNC': STOP_DUPLICATE_INDEX_SYNC,
                         'IS_TEAM_DRIVE': IS_TEAM_DRIVE,
+                        'GD_WORKERS': GD_WORKERS,
+                        'EXTRACT_WORKERS': EXTRACT_WORKERS,
                         'MULTI_TIMEGAP': MULTI_TIMEGAP,
                         'AS_DOCUMENT': AS_DOCUMENT,
                         'SAVE_MESSAGE': SAVE_MESSAGE,
@@ -533,6 +599,10 @@ async def load_config():
                         'USER_SESSION_STRING': USER_SESSION_STRING,
                         'SAVE_SESSION_STRING': SAVE_SESSION_STRING,
                         'USERBOT_LEECH': USERBOT_LEECH,
+                        'LEECH_BOT_TOKENS': LEECH_BOT_TOKENS,
+                        'LEECH_UPLOAD_WORKERS': LEECH_UPLOAD_WORKERS,
+                        'LEECH_UPLOAD_SESSIONS': LEECH_UPLOAD_SESSIONS,
+                        'LEECH_UPLOAD_PARTS': LEECH_UPLOAD_PARTS,
                         'AUTO_DELETE_MESSAGE_DURATION': AUTO_DELETE_MESSAGE_DURATION,
                         'AUTO_DELETE_UPLOAD_MESSAGE_DURATION': AUTO_DELETE_UPLOAD_MESSAGE_DURATION,
                         'STATUS_UPDATE_INTERVAL': STATUS_UPDATE_INTERVAL,
@@ -545,6 +615,7 @@ async def load_config():
                         'QUEUE_ALL': QUEUE_ALL,
                         'QUEUE_DOWNLOAD': QUEUE_DOWNLOAD,
                         'QUEUE_UPLOAD': QUEUE_UPLOAD,
+                        'QUEUE_ENGINES': QUEUE_ENGINES,
                         'QUEUE_COMPLETE': QUEUE_COMPLETE,
                         # RCLONE
                         'ENABLE_FASTDL': ENABLE_FASTDL,
@@ -563,6 +634,9 @@ async def load_config():
                         'LINK_LOG': LINK_LOG,
                         # LIMITS
                         'EQUAL_SPLITS': EQUAL_SPLITS,
+                        'LEECH_VIRTUAL_SPLIT': LEECH_VIRTUAL_SPLIT,
+                        'ZIP_PIPELINE_VOLUMES': ZIP_PIPELINE_VOLUMES,
+                        'EARLY_UPLOAD': EARLY_UPLOAD,
                         'DAILY_LIMIT_SIZE': DAILY_LIMIT_SIZE,
                         'CLONE_LIMIT': CLONE_LIMIT,
                         'LEECH_LIMIT': LEECH_LIMIT,
@@ -686,6 +760,7 @@ async def load_config():
                         # RSS
                         'RSS_CHAT': RSS_CHAT,
                         'RSS_DELAY': RSS_DELAY,
+                        'RSS_WORKERS': RSS_WORKERS,
                         # TORSEARCH
                         'SEARCH_API_LINK': SEARCH_API_LINK,
                         'SEARCH_PLUGINS': SEARCH_PLUGINS,
@@ -697,7 +772,7 @@ async def load_config():
     if DATABASE_URL:
         await DbManager().update_config(config_dict)
         LOGGER.info('Config update in database!!')
-    await gather(server.cleanup(), intialize_userbot(), initiate_search_tools(), start_from_queued(), rclone_serve_booter())
+    await gather(server.cleanup(), intialize_userbot(), intialize_leech_bots(), initiate_search_tools(), start_from_queued(), rclone_serve_booter())
     await start_server()
     addJob()
 
@@ -707,6 +782,7 @@ async def intialize_userbot(check=True):
         if check:
             userbot: Client = bot_dict['USERBOT']
             if userbot and userbot.is_connected:
+                await gather(leech_clients.drop(userbot), drop_streamer(userbot))
                 await userbot.stop()
                 LOGGER.info('Userbot stopped.')
         bot_dict.update({'IS_PREMIUM': False, 'USERBOT': None, 'MAX_SPLIT_SIZE': DEFAULT_SPLIT_SIZE})
@@ -737,6 +813,25 @@ async def intialize_userbot(check=True):
     LOGGER.info('Leech Split Size: %s.', config_dict["LEECH_SPLIT_SIZE"])
 
 
+async def intialize_leech_bots(check=True):
+    async with bot_lock:
+        if check:
+            for client in bot_dict.get('LEECH_BOTS', []):
+                if client.is_connected:
+                    await leech_clients.drop(client)
+                    await client.stop()
+        bot_dict['LEECH_BOTS'] = []
+        for index, token in enumerate(config_dict['LEECH_BOT_TOKENS'].split(), 1):
+            try:
+                client = await Client(f'leechbot{index}', config_dict['TELEGRAM_API'], config_dict['TELEGRAM_HASH'],
+                                      bot_token=token, in_memory=True, no_updates=True, **kwargs).start()
+                bot_dict['LEECH_BOTS'].append(client)
+            except Exception as e:
+                LOGGER.error('Leech bot %s: %s', index, e)
+        if bot_dict['LEECH_BOTS']:
+            LOGGER.info('%s extra leech bots started.', len(bot_dict['LEECH_BOTS']))
+
+
 async def intialize_savebot(session_string=None, check=True, user_id=None):
     async with bot_lock:
         if session_string == config_dict['USER_SESSION_STRING'] and (userbot := bot_dict.get('USERBOT')):
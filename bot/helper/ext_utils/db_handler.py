@@ -1,13 +1,24 @@
 from aiofiles import open as aiopen
 from aiofiles.os import path as aiopath, makedirs
+from asyncio import sleep
+from copy import deepcopy
 from dotenv import dotenv_values
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
 from pymongo.errors import PyMongoError
 
 from bot import user_data, rss_dict, bot_id, config_dict, aria2_options, qbit_options, bot_loop, DATABASE_URL, LOGGER
 
 
 class DbManager:
+    _client = None
+    _pending_users = set()
+    _pending_rss = set()
+    _flush_task = None
+    _retry_delay = 0
+    FLUSH_DELAY = 2
+    MAX_RETRY_DELAY = 60
+
     def __init__(self):
         self._err = False
         self._db = None
@@ -16,12 +27,62 @@ class DbManager:
 
     def _connect(self):
         try:
-            self._conn = AsyncIOMotorClient(DATABASE_URL)
+            if DbManager._client is None:
+                DbManager._client = AsyncIOMotorClient(DATABASE_URL)
+            self._conn = DbManager._client
             self._db = self._conn.mltb
         except PyMongoError as e:
             LOGGER.error('Error in DB connection: %s', e)
             self._err = True
 
+    def _schedule_flush(self, delay=FLUSH_DELAY):
+        if DbManager._flush_task is None:
+            DbManager._flush_task = bot_loop.create_task(self._delayed_flush(delay))
+
+    async def _delayed_flush(self, delay):
+        await sleep(delay)
+        DbManager._flush_task = None
+        await self.flush()
+
+    @staticmethod
+    def _take_pending():
+        users, rss = DbManager._pending_users.copy(), DbManager._pending_rss.copy()
+        DbManager._pending_users.clear()
+        DbManager._pending_rss.clear()
+        user_ops = []
+        for user_id in users:
+            data = {key: value for key, value in user_data.get(user_id, {}).items() if key not in ['thumb', 'rclone_config', 'token_pickle']}
+            user_ops.append(ReplaceOne({'_id': user_id}, deepcopy(data), upsert=True))
+        rss_ops = [ReplaceOne({'_id': user_id}, deepcopy(rss_dict[user_id]), upsert=True) for user_id in rss if user_id in rss_dict]
+        return users, rss, user_ops, rss_ops
+
+    async def flush(self):
+        if self._err:
+            return
+        users, rss, user_ops, rss_ops = self._take_pending()
+        try:
+            if user_ops:
+                await self._db.users[bot_id].bulk_write(user_ops, ordered=False)
+            if rss_ops:
+                await self._db.rss[bot_id].bulk_write(rss_ops, ordered=False)
+        except PyMongoError as e:
+            DbManager._pending_users.update(users)
+            DbManager._pending_rss.update(rss)
+            DbManager._retry_delay = min(max(DbManager._retry_delay * 2, self.FLUSH_DELAY), self.MAX_RETRY_DELAY)
+            LOGGER.error('Error while flushing DB writes: %s. Retrying in %ss', e, DbManager._retry_delay)
+            self._schedule_flush(DbManager._retry_delay)
+        else:
+            DbManager._retry_delay = 0
+
+    def flush_sync(self):
+        if self._err:
+            return
+        _, _, user_ops, rss_ops = self._take_pending()
+        if user_ops:
+            self._db.users[bot_id].delegate.bulk_write(user_ops, ordered=False)
+        if rss_ops:
+            self._db.rss[bot_id].delegate.bulk_write(rss_ops, ordered=False)
+
     async def db_load(self):
         if self._err:
             return
@@ -107,11 +168,8 @@ class DbManager:
     async def update_user_data(self, user_id):
         if self._err:
             return
-        data = user_data.get(user_id, {})
-        data.pop('thumb', None)
-        data.pop('rclone_config', None)
-        data.pop('token_pickle', None)
-        await self._db.users[bot_id].replace_one({'_id': user_id}, data, upsert=True)
+        DbManager._pending_users.add(user_id)
+        self._schedule_flush()
 
     async def update_user_doc(self, user_id, key, path=''):
         if self._err:
@@ -121,22 +179,26 @@ class DbManager:
                 doc_bin = await doc.read()
         else:
             doc_bin = ''
+        if user_id in DbManager._pending_users:
+            await self.flush()
         await self._db.users[bot_id].update_one({'_id': user_id}, {'$set': {key: doc_bin}}, upsert=True)
 
     async def rss_update_all(self):
         if self._err:
             return
-        for user_id in list(rss_dict.keys()):
-            await self._db.rss[bot_id].replace_one({'_id': user_id}, rss_dict[user_id], upsert=True)
+        DbManager._pending_rss.update(rss_dict)
+        self._schedule_flush()
 
     async def rss_update(self, user_id):
         if self._err:
             return
-        await self._db.rss[bot_id].replace_one({'_id': user_id}, rss_dict[user_id], upsert=True)
+        DbManager._pending_rss.add(user_id)
+        self._schedule_flush()
 
     async def rss_delete(self, user_id):
         if self._err:
             return
+        DbManager._pending_rss.discard(user_id)
         await self._db.rss[bot_id].delete_one({'_id': user_id})
 
     async def add_incomplete_task(self, cid, link, tag):
@@ -169,11 +231,16 @@ class DbManager:
 
     async def delete_user(self, user_id):
         if not self._err and user_data.pop(user_id, None):
+            DbManager._pending_users.discard(user_id)
             await self._db.users[bot_id].delete_one({'_id': user_id})
 
     async def trunc_table(self, name):
         if self._err:
             return
+        if name == 'users':
+            DbManager._pending_users.clear()
+        elif name == 'rss':
+            DbManager._pending_rss.clear()
         await self._db[name][bot_id].drop()
 
 
@@ -2,14 +2,22 @@ from aiofiles import open as aiopen
 from aiofiles.os import remove as aioremove, path as aiopath, listdir
 from aiohttp import ClientSession
 from aioshutil import rmtree as aiormtree, disk_usage
+from asyncio import create_subprocess_exec, gather, Queue
+from asyncio.subprocess import PIPE
+from io import RawIOBase, SEEK_SET, SEEK_CUR, SEEK_END
 from magic import Magic
-from os import walk, path as ospath, makedirs
-from re import split as re_split, search as re_search, escape, I
+from natsort import natsorted
+from os import walk, path as ospath, makedirs, pread
+from re import split as re_split, search as re_search, findall as re_findall, sub as re_sub, escape, I
+from shutil import copyfileobj
 from subprocess import run as srun
 from sys import exit as sexit
+from threading import Semaphore
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
 
-from bot import aria2, config_dict, get_client, DOWNLOAD_DIR, LOGGER, ARIA_NAME, QBIT_NAME, FFMPEG_NAME
+from bot import aria2, bot_loop, config_dict, get_client, subprocess_lock, DOWNLOAD_DIR, DATABASE_URL, LOGGER, ARIA_NAME, QBIT_NAME, FFMPEG_NAME
 from bot.helper.ext_utils.bot_utils import sync_to_async, async_to_sync, cmd_exec
+from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.exceptions import NotSupportedExtractionArchive
 
 
@@ -66,6 +74,11 @@ def clean_all():
 def exit_clean_up(_, __):
     try:
         LOGGER.info('Please wait, while we clean up and stop the running downloads')
+        if DATABASE_URL:
+            try:
+                DbManager().flush_sync()
+            except Exception as e:
+                LOGGER.error('Failed to flush pending DB writes: %s', e)
         clean_all()
         srun(['pkill', '-9', '-f', f'gunicorn|{ARIA_NAME}|{QBIT_NAME}|{FFMPEG_NAME}|gclone|java|alass'], check=True)
         sexit(0)
@@ -129,6 +142,194 @@ def get_base_name(orig_path):
     raise NotSupportedExtractionArchive('File format not supported for extraction')
 
 
+class FileSlice(RawIOBase):
+    """Read-only view of `length` bytes of a file starting at `offset`, so a part of a
+    big file can be uploaded as it is without writing the part to disk first."""
+
+    def __init__(self, path, offset, length, name):
+        super().__init__()
+        self.name = name
+        self._file = open(path, 'rb')
+        self._offset = offset
+        self._length = length
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            pos += self._pos
+        elif whence == SEEK_END:
+            pos += self._length
+        self._pos = max(0, min(pos, self._length))
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._length - self._pos:
+            size = self._length - self._pos
+        if size <= 0:
+            return b''
+        data = pread(self._file.fileno(), size, self._offset + self._pos)
+        self._pos += len(data)
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class ZipVolumeStream(RawIOBase):
+    """Stored zip archive written straight into numbered volumes (name.zip.001, ...) the way 7z -v
+    splits them. Every finished volume is put on `volumes` for upload and the writer blocks while
+    `max_pending` volumes are still waiting, so only a few volumes are on disk at any time."""
+
+    def __init__(self, dest_path, volume_size, max_pending):
+        super().__init__()
+        self.volumes = Queue()
+        self.error = None
+        self._dest_path = dest_path
+        self._volume_size = volume_size
+        self._max_pending = max_pending
+        self._slots = Semaphore(max_pending)
+        self._cancelled = False
+        self._file = None
+        self._index = 0
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        while view:
+            if self._cancelled:
+                raise OSError('Archiving cancelled')
+            if self._file is None:
+                self._slots.acquire()
+                if self._cancelled:
+                    raise OSError('Archiving cancelled')
+            if self._file is None:
+                self._index += 1
+                self._file = open(f'{self._dest_path}.{self._index:03}', 'wb')
+                self._written = 0
+            length = min(len(view), self._volume_size - self._written)
+            self._file.write(view[:length])
+            self._written += length
+            view = view[length:]
+            if self._written == self._volume_size:
+                self._finish_volume()
+        return len(data)
+
+    def _finish_volume(self):
+        self._file.close()
+        bot_loop.call_soon_threadsafe(self.volumes.put_nowait, self._file.name)
+        self._file = None
+
+    def build(self, src_path, extension_filter):
+        try:
+            exclude = tuple(f'.{ext}' for ext in extension_filter)
+            base_dir = ospath.dirname(src_path)
+            with ZipFile(self, 'w', ZIP_STORED) as zf:
+                if ospath.isfile(src_path):
+                    self._add_file(zf, src_path, ospath.basename(src_path))
+                for dirpath, dirs, files in walk(src_path):
+                    for dir_ in natsorted(dirs):
+                        zf.writestr(ZipInfo.from_file(ospath.join(dirpath, dir_), ospath.relpath(ospath.join(dirpath, dir_), base_dir)), b'')
+                    for file_ in natsorted(files):
+                        if not file_.endswith(exclude):
+                            f_path = ospath.join(dirpath, file_)
+                            self._add_file(zf, f_path, ospath.relpath(f_path, base_dir))
+            if self._file:
+                self._finish_volume()
+        except Exception as e:
+            if self._file:
+                self._file.close()
+            if not self._cancelled:
+                LOGGER.error('Unable to zip this path: %s. %s', src_path, e)
+                self.error = e
+        finally:
+            bot_loop.call_soon_threadsafe(self.volumes.put_nowait, None)
+
+    def _add_file(self, zf, f_path, arcname):
+        zinfo = ZipInfo.from_file(f_path, arcname)
+        zinfo.compress_type = ZIP_STORED
+        with open(f_path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+            copyfileobj(src, dest, 4 * 1024 * 1024)
+
+    def volume_done(self):
+        self._slots.release()
+
+    def cancel(self):
+        self._cancelled = True
+        for _ in range(self._max_pending):
+            self._slots.release()
+
+
+def get_file_parts(size, part_size):
+    return [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+
+def get_archive_parts(file_, files):
+    prefix = re_sub(r'(part0*1\.rar|7z\.0*1|zip\.0*1|rar|zip)$', '', file_)
+    return [file_] + [f for f in files if f != file_ and f.startswith(prefix) and is_archive_split(f)]
+
+
+class SevenZipProgress:
+    """Bytes processed by 7z runs, parsed from their -bsp1 percentage output so the
+    status does not have to walk the output directory on every refresh."""
+
+    def __init__(self):
+        self.active = False
+        self.cancelled = False
+        self._done = 0
+        self._running = {}
+
+    @property
+    def processed(self):
+        return self._done + sum(size * percent // 100 for size, percent in list(self._running.values()))
+
+    @staticmethod
+    async def _read_progress(stream, state):
+        tail = b''
+        while data := await stream.read(4096):
+            tail = tail[-4:] + data
+            if percents := re_findall(rb'(\d{1,3})%', tail):
+                state[1] = min(int(percents[-1]), 100)
+
+    async def run(self, listener, cmd, size):
+        async with subprocess_lock:
+            if listener.suproc == 'cancelled' or self.cancelled:
+                return None, ''
+            listener.suproc = proc = await create_subprocess_exec(*cmd, '-bsp1', '-bso0', stdout=PIPE, stderr=PIPE)
+            self._running[proc] = state = [size, 0]
+        self.active = True
+        _, stderr, code = await gather(self._read_progress(proc.stdout, state), proc.stderr.read(), proc.wait())
+        del self._running[proc]
+        self._done += size
+        return code, stderr.decode().strip()
+
+    def kill(self):
+        """Stop every running 7z process of this task, call it under subprocess_lock."""
+        self.cancelled = True
+        killed = False
+        for proc in self._running:
+            if proc.returncode is None:
+                proc.kill()
+                killed = True
+        return killed
+
+
 def get_mime_type(file_path):
     mime = Magic(mime=True)
     mime_type = mime.from_file(file_path)
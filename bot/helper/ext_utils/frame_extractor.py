@@ -0,0 +1,105 @@
+from aiofiles.os import path as aiopath, makedirs
+from asyncio import Semaphore, TimeoutError, create_subprocess_exec, wait_for
+from asyncio.subprocess import PIPE
+from os import path as ospath, cpu_count
+from time import time
+from typing import List, Optional
+
+from bot import FFMPEG_NAME, LOGGER
+from bot.helper.ext_utils.media_probe import media_probe
+
+MOSAIC_TILES = 9
+DRAW_TIME = "drawtext=fontfile=font.ttf:fontsize=70:fontcolor=white:box=1:boxcolor=black@0.7:x=(W-tw)/1.05:y=h-(2*lh):text='%{pts\\:hms}'"
+
+
+class Frames:
+    def __init__(self):
+        self.screenshots: List[str] = []
+        self.thumbnail: Optional[str] = None
+        self.mosaic: Optional[str] = None
+
+
+class FrameExtractor:
+    """Screenshots, thumbnail and the 3x3 mosaic of a video from a single ffmpeg run. Every distinct timestamp is one
+    keyframe-only input seek, so each frame is decoded once whatever it is used for. At most one run per CPU at a time."""
+
+    def __init__(self):
+        self._pool = Semaphore(cpu_count() or 1)
+
+    async def extract(self, path: str, duration: int=None, screenshots: int=0, ss_dir: str='', thumbnail: bool=False,
+                      mosaic: str='') -> Frames:
+        frames = Frames()
+        if duration is None:
+            duration = (await media_probe.probe(path)).duration
+        if not duration:
+            LOGGER.error('Frames: Can\'t get the duration of video. Path: %s', path)
+            screenshots, mosaic = 0, ''
+        jobs = []
+        if screenshots:
+            await makedirs(ss_dir, exist_ok=True)
+            name = ospath.splitext(ospath.basename(path))[0]
+            interval = duration // (min(screenshots, 10) + 1)
+            jobs.extend((interval * (i + 1), 'ss', ospath.join(ss_dir, f'SS.{name}_{i:02}.png')) for i in range(min(screenshots, 10)))
+        if thumbnail:
+            await makedirs('thumbnails', exist_ok=True)
+            jobs.append(((duration or 3) // 2, 'thumb', ospath.join('thumbnails', f'{time()}.jpg')))
+        if mosaic and duration > 5:
+            if mosaic_dir := ospath.dirname(mosaic):
+                await makedirs(mosaic_dir, exist_ok=True)
+            step = duration // 10
+            jobs.extend((step * (i + 1), 'mosaic', None) for i in range(MOSAIC_TILES))
+        else:
+            mosaic = ''
+        if not jobs:
+            return frames
+        async with self._pool:
+            code, stderr = await self._run(path, jobs, mosaic)
+            if code != 0 and mosaic and any(kind != 'mosaic' for _, kind, _ in jobs):
+                LOGGER.warning('Frames: %s. Retrying without mosaic. Path: %s', stderr, path)
+                jobs, mosaic = [job for job in jobs if job[1] != 'mosaic'], ''
+                code, stderr = await self._run(path, jobs, mosaic)
+        if code != 0:
+            LOGGER.error('Error while extracting frames from video. Path: %s. stderr: %s', path, stderr)
+        for _, kind, output in jobs:
+            if kind == 'mosaic' or not await aiopath.exists(output):
+                continue
+            if kind == 'ss':
+                frames.screenshots.append(output)
+            else:
+                frames.thumbnail = output
+        if mosaic and await aiopath.exists(mosaic):
+            frames.mosaic = mosaic
+        return frames
+
+    @staticmethod
+    async def _run(path: str, jobs: list, mosaic: str):
+        times = sorted({cap_time for cap_time, _, _ in jobs})
+        cmd = [FFMPEG_NAME, '-hide_banner', '-loglevel', 'error', '-y', '-copyts', '-start_at_zero']
+        for cap_time in times:
+            cmd.extend(['-skip_frame', 'nokey', '-noaccurate_seek', '-ss', str(cap_time), '-i', path])
+        users = {cap_time: [] for cap_time in times}
+        for index, (cap_time, _, _) in enumerate(jobs):
+            users[cap_time].append(f'[f{index}]')
+        graph = [f'[{i}:v]trim=end_frame=1,split={len(users[cap_time])}{"".join(users[cap_time])}' for i, cap_time in enumerate(times)]
+        outputs, tiles = [], []
+        for index, (_, kind, output) in enumerate(jobs):
+            if kind == 'mosaic':
+                graph.append(f'[f{index}]{DRAW_TIME},setpts=PTS-STARTPTS[m{index}]')
+                tiles.append(f'[m{index}]')
+            else:
+                outputs.extend(['-map', f'[f{index}]', '-frames:v', '1', *(['-q:v', '1'] if kind == 'ss' else []), output])
+        if tiles:
+            graph.append(f'{"".join(tiles)}concat=n={len(tiles)}:v=1:a=0,scale=1920:-1,tile=3x3[mosaic]')
+            outputs.extend(['-map', '[mosaic]', '-frames:v', '1', mosaic])
+        cmd.extend(['-filter_complex', ';'.join(graph), *outputs])
+        proc = await create_subprocess_exec(*cmd, stderr=PIPE)
+        try:
+            _, stderr = await wait_for(proc.communicate(), timeout=15 + 2 * len(times))
+        except TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return -9, 'Timeout some issues with ffmpeg with specific arch!'
+        return proc.returncode, stderr.decode().strip()
+
+
+frame_extractor = FrameExtractor()
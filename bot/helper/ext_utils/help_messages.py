@@ -446,12 +446,13 @@ Note:
     RSSHELP = '''
 Use this format to add feed url:
 Title1 link (required)
-Title2 link -c cmd -inf xx -exf xx
+Title2 link -c cmd -inf xx -exf xx -fm iw
 Title3 link -c cmd -d ratio:time -z password
 
 -c command + any arg
 -inf For included words filter.
 -exf For excluded words filter.
+-fm Filter mode: i to ignore case, w to match whole words only. Default is case sensitive substring match.
 
 Example: Title https://www.rss-url.com -inf 1080 or 720 or 144p|mkv or mp4|hevc -exf flv or web|xxx -c -up: mrcc:remote:path/subdir -rcf: --buffer-size:8M|key|key:value
 This filter will parse links that it's titles contains `(1080 or 720 or 144p) and (mkv or mp4) and hevc` and doesn't conyain (flv or web) and xxx` words. You can add whatever you want.
@@ -0,0 +1,154 @@
+from aiofiles.os import stat as aiostat
+from asyncio import Task, shield
+from collections import OrderedDict
+from json import JSONDecodeError, loads
+from typing import Dict, List, Optional, Tuple
+
+from bot import bot_loop, LOGGER
+from bot.helper.ext_utils.bot_utils import cmd_exec
+
+ProbeKey = Tuple[str, int, int]
+
+MAX_ENTRIES = 512
+
+
+class ProbeResult:
+    """Parsed output of one `ffprobe -show_format -show_streams` run."""
+
+    __slots__ = ('streams', 'format', 'ok')
+
+    def __init__(self, streams: List[dict]=None, format: dict=None, ok: bool=False):
+        self.streams = streams or []
+        self.format = format or {}
+        self.ok = ok
+
+    @property
+    def tags(self) -> dict:
+        return self.format.get('tags', {})
+
+    @property
+    def duration(self) -> int:
+        try:
+            return round(float(self.format.get('duration', 0)))
+        except ValueError:
+            return 0
+
+    @property
+    def size(self) -> int:
+        return int(self.format.get('size', 0))
+
+    def _tag(self, name: str) -> Optional[str]:
+        tags = self.tags
+        return tags.get(name) or tags.get(name.upper()) or tags.get(name.capitalize())
+
+    @property
+    def artist(self) -> Optional[str]:
+        return self._tag('artist')
+
+    @property
+    def title(self) -> Optional[str]:
+        return self._tag('title')
+
+    def count(self, codec_type: str) -> int:
+        return sum(1 for stream in self.streams if stream.get('codec_type') == codec_type)
+
+    @property
+    def is_video(self) -> bool:
+        return self.count('video') > 0
+
+    @property
+    def is_audio(self) -> bool:
+        return not self.is_video and self.count('audio') > 0
+
+    @property
+    def multi_streams(self) -> bool:
+        return self.count('video') > 1 or self.count('audio') > 1
+
+
+class MediaProbe:
+    """LRU cache of ffprobe results keyed by (path, size, mtime), a rewritten file gets a new key and is probed again.
+    Concurrent probes of the same file share a single ffprobe run, links are probed every time."""
+
+    def __init__(self):
+        self._cache: OrderedDict[ProbeKey, ProbeResult] = OrderedDict()
+        self._mediainfo: OrderedDict[ProbeKey, str] = OrderedDict()
+        self._inflight: Dict[ProbeKey, Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    async def _key(path: str) -> Optional[ProbeKey]:
+        if path.startswith(('http://', 'https://')):
+            return None
+        try:
+            st = await aiostat(path)
+        except OSError:
+            return None
+        return path, st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _store(cache: OrderedDict, key: ProbeKey, value):
+        for old in [old for old in cache if old[0] == key[0]]:
+            del cache[old]
+        cache[key] = value
+        while len(cache) > MAX_ENTRIES:
+            cache.popitem(last=False)
+
+    async def probe(self, path: str) -> ProbeResult:
+        if (key := await self._key(path)) is None:
+            return await self._run(path)
+        if (result := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return result
+        if not (task := self._inflight.get(key)):
+            self.misses += 1
+            task = self._inflight[key] = bot_loop.create_task(self._load(key))
+        return await shield(task)
+
+    async def _load(self, key: ProbeKey) -> ProbeResult:
+        try:
+            result = await self._run(key[0])
+            if result.ok:
+                self._store(self._cache, key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    async def _run(path: str) -> ProbeResult:
+        try:
+            stdout, stderr, rcode = await cmd_exec(['ffprobe', '-hide_banner', '-loglevel', 'error', '-print_format', 'json',
+                                                    '-show_format', '-show_streams', path])
+        except Exception as e:
+            LOGGER.error('Probe: %s. Mostly File not found! Path: %s', e, path)
+            return ProbeResult()
+        if stderr:
+            LOGGER.warning('Probe: %s. Path: %s', stderr, path)
+        try:
+            data = loads(stdout) if rcode == 0 else {}
+        except JSONDecodeError:
+            data = {}
+        if not data:
+            LOGGER.error('Probe failed with code %s. Path: %s', rcode, path)
+            return ProbeResult()
+        return ProbeResult(data.get('streams'), data.get('format'), True)
+
+    async def mediainfo(self, path: str) -> str:
+        """Text report of the mediainfo tool, cached the same way as the ffprobe results."""
+        key = await self._key(path)
+        if key and (text := self._mediainfo.get(key)) is not None:
+            self._mediainfo.move_to_end(key)
+            return text
+        text = (await cmd_exec(['mediainfo', path]))[0]
+        if key and text:
+            self._store(self._mediainfo, key, text)
+        return text
+
+    def invalidate(self, path: str):
+        for cache in (self._cache, self._mediainfo):
+            for key in [key for key in cache if key[0] == path]:
+                del cache[key]
+
+
+media_probe = MediaProbe()
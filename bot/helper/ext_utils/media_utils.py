@@ -1,7 +1,6 @@
 from aiofiles.os import path as aiopath, makedirs
 from aioshutil import move
-from ast import literal_eval
-from asyncio import create_subprocess_exec, gather, sleep, wait_for
+from asyncio import create_subprocess_exec, gather, sleep
 from asyncio.subprocess import PIPE
 from os import path as ospath, cpu_count
 from PIL import Image
@@ -10,9 +9,11 @@ from re import search as re_search, findall as re_findall, split as re_split
 from time import time
 
 from bot import config_dict, subprocess_lock, LOGGER, DEFAULT_SPLIT_SIZE, FFMPEG_NAME
-from bot.helper.ext_utils.bot_utils import cmd_exec, sync_to_async, is_premium_user
-from bot.helper.ext_utils.files_utils import ARCH_EXT, get_mime_type, get_path_size, clean_target
+from bot.helper.ext_utils.bot_utils import sync_to_async, is_premium_user
+from bot.helper.ext_utils.files_utils import ARCH_EXT, get_mime_type, get_path_size, clean_target, SevenZipProgress
+from bot.helper.ext_utils.frame_extractor import frame_extractor
 from bot.helper.ext_utils.links_utils import get_url_name
+from bot.helper.ext_utils.media_probe import media_probe
 from bot.helper.ext_utils.status_utils import get_readable_file_size
 from bot.helper.ext_utils.telegraph_helper import TelePost
 
@@ -43,43 +44,12 @@ async def createThumb(msg: Message, _id: int=0):
 
 
 async def is_multi_streams(path):
-    try:
-        result = await cmd_exec(['ffprobe', '-hide_banner', '-loglevel', 'error', '-print_format', 'json', '-show_streams', path])
-        if res := result[1]:
-            LOGGER.warning('Get Video Streams: %s', res)
-    except Exception as e:
-        LOGGER.error('Get Video Streams: %s. Mostly File not found!', e)
-        return False
-    fields = literal_eval(result[0]).get('streams')
-    if fields is None:
-        LOGGER.error('Get Video Streams: %s', result)
-        return False
-    videos = audios = 0
-    for stream in fields:
-        if stream.get('codec_type') == 'video':
-            videos += 1
-        elif stream.get('codec_type') == 'audio':
-            audios += 1
-    return videos > 1 or audios > 1
+    return (await media_probe.probe(path)).multi_streams
 
 
 async def get_media_info(path):
-    try:
-        result = await cmd_exec(['ffprobe', '-hide_banner', '-loglevel', 'error', '-print_format', 'json', '-show_format', path])
-        if res := result[1]:
-            LOGGER.warning('Get Media Info: %s', res)
-    except Exception as e:
-        LOGGER.error('Get Media Info: %s. Mostly File not found!', e)
-        return 0, None, None
-    fields = literal_eval(result[0]).get('format')
-    if fields is None:
-        LOGGER.error('Get_media_info: %s', result)
-        return 0, None, None
-    duration = round(float(fields.get('duration', 0)))
-    tags = fields.get('tags', {})
-    artist = tags.get('artist') or tags.get('ARTIST') or tags.get('Artist')
-    title = tags.get('title') or tags.get('TITLE') or tags.get('Title')
-    return duration, artist, title
+    result = await media_probe.probe(path)
+    return result.duration, result.artist, result.title
 
 
 async def post_media_info(path: str, size: int, image=None, is_link=False):
@@ -98,7 +68,7 @@ async def post_media_info(path: str, size: int, image=None, is_link=False):
         except:
             pass
     try:
-        if metadata := (await cmd_exec(['mediainfo', path]))[0].replace(path, name):
+        if metadata := (await media_probe.mediainfo(path)).replace(path, name):
             metadata = f"<img src='{img_post}' /><b>{name}<br>Size: {size}</b><br><pre>{metadata}</pre>"
             return await sync_to_async(telepost.create_post, metadata)
     except Exception as e:
@@ -116,53 +86,8 @@ async def get_document_type(path):
         return False, True, False
     if not mime_type.startswith('video') and not mime_type.endswith('octet-stream'):
         return is_video, is_audio, is_image
-    try:
-        result = await cmd_exec(['ffprobe', '-hide_banner', '-loglevel', 'error', '-print_format', 'json', '-show_streams', path])
-        if res := result[1]:
-            LOGGER.warning('Get Document Type: %s', res)
-    except Exception as e:
-        LOGGER.error('Get Document Type: %s. Mostly File not found!', e)
-        return is_video, is_audio, is_image
-    fields = literal_eval(result[0]).get('streams')
-    if fields is None:
-        LOGGER.error('Get_document_type: %s', result)
-        return is_video, is_audio, is_image
-    for stream in fields:
-        if stream.get('codec_type') == 'video':
-            is_video = True
-        elif not is_video and stream.get('codec_type') == 'audio':
-            is_audio = True
-    return is_video, is_audio, is_image
-
-
-async def take_ss(video_file, ss_nb) -> list:
-    ss_nb = min(ss_nb, 10)
-    duration = (await get_media_info(video_file))[0]
-    if duration == 0:
-        LOGGER.error('Take SS: Can\'t get the duration of video')
-        return []
-    dirpath, name = video_file.rsplit('/', 1)
-    name, _ = ospath.splitext(name)
-    dirpath = f'{dirpath}/screenshots/'
-    await makedirs(dirpath, exist_ok=True)
-    interval = duration // (ss_nb + 1)
-    cap_time = interval
-    outputs, cmds = [], []
-    for i in range(ss_nb):
-        output = f'{dirpath}SS.{name}_{i:02}.png'
-        outputs.append(output)
-        cmd = [FFMPEG_NAME, '-hide_banner', '-loglevel', 'error', '-ss', f'{cap_time}', '-i', video_file, '-q:v', '1', '-frames:v', '1', output]
-        cap_time += interval
-        cmds.append(cmd_exec(cmd))
-    try:
-        results = await wait_for(gather(*cmds), timeout=15)
-        if results[0][2] != 0:
-            LOGGER.error('Error while creating sreenshots from video. Path: %s. stderr: %s', video_file, results[0][1])
-            return []
-    except:
-        LOGGER.error('Error while creating sreenshots from video. Path: %s. Error: Timeout some issues with ffmpeg with specific arch!', video_file)
-        return []
-    return outputs
+    result = await media_probe.probe(path)
+    return result.is_video, result.is_audio, is_image
 
 
 async def get_audio_thumb(audio_file):
@@ -178,24 +103,90 @@ async def get_audio_thumb(audio_file):
     return des_dir
 
 
-async def create_thumbnail(video_file, duration):
-    des_dir = 'thumbnails'
-    await makedirs(des_dir, exist_ok=True)
-    des_dir = ospath.join(des_dir, f'{time()}.jpg')
-    if duration is None:
-        duration = (await get_media_info(video_file))[0]
-    if duration == 0:
-        duration = 3
-    duration = duration // 2
-    cmd = [FFMPEG_NAME, '-hide_banner', '-loglevel', 'error', '-ss', f'{duration}', '-i', video_file, '-vf', 'thumbnail', '-frames:v', '1', des_dir]
-    try:
-        _, err, code = await wait_for(cmd_exec(cmd), timeout=15)
-        if code != 0 or not await aiopath.exists(des_dir):
-            LOGGER.error('Error while extracting thumbnail from video. Name: %s stderr: %s', video_file, err)
+async def get_keyframe_index(path, listener):
+    """Read every packet of the file in one ffprobe pass and return the keyframes of its main video
+    stream as (time, bytes before the keyframe) pairs together with the total packet bytes."""
+    cmd = ['ffprobe', '-hide_banner', '-loglevel', 'error', '-show_entries', 'packet=codec_type,stream_index,pts_time,dts_time,size,flags',
+           '-print_format', 'compact=p=0', path]
+    async with subprocess_lock:
+        if listener.suproc == 'cancelled':
             return None
-    except:
-        LOGGER.error('Error while extracting thumbnail from video. Name: %s. Error: Timeout some issues with ffmpeg with specific arch!', video_file)
-    return des_dir
+        listener.suproc = proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
+    keyframes, total, first_pts = {}, 0, None
+
+    async def _read_packets():
+        nonlocal total, first_pts
+        async for line in proc.stdout:
+            fields = dict(item.split('=', 1) for item in line.decode().strip().split('|') if '=' in item)
+            try:
+                pkt_size = int(fields['size'])
+                pts = float(fields['pts_time'] if fields.get('pts_time', 'N/A') != 'N/A' else fields['dts_time'])
+            except (KeyError, ValueError):
+                continue
+            first_pts = pts if first_pts is None else min(first_pts, pts)
+            if fields.get('codec_type') == 'video' and fields.get('flags', '').startswith('K'):
+                keyframes.setdefault(fields.get('stream_index'), []).append((pts, total))
+            total += pkt_size
+
+    _, stderr, code = await gather(_read_packets(), proc.stderr.read(), proc.wait())
+    if code == -9:
+        return None
+    if code != 0 or not keyframes:
+        LOGGER.warning('%s. Unable to index keyframes. Path: %s', stderr.decode().strip(), path)
+        return [], 0
+    keyframes = max(keyframes.values(), key=len)
+    return [(pts - first_pts, offset) for pts, offset in keyframes], total
+
+
+def get_split_points(keyframes, total, split_size):
+    points, start, prev = [], 0, None
+    for pts, offset in keyframes:
+        if offset - start > split_size and prev and prev[1] > start:
+            points.append(prev[0])
+            start = prev[1]
+        prev = (pts, offset)
+    if total - start > split_size and prev and prev[1] > start:
+        points.append(prev[0])
+    return points
+
+
+async def split_video_segments(path, split_size, listener, multi_streams):
+    """Split a video at precomputed keyframes with a single segment muxer run.
+    Returns None when cancelled and an empty list when the part by part splitter should be used."""
+    if (index := await get_keyframe_index(path, listener)) is None:
+        return None
+    keyframes, total = index
+    if not (points := get_split_points(keyframes, total, split_size * 99 // 100)):
+        return []
+    base_name, extension = ospath.splitext(path)
+    out_paths = [f'{base_name}.part{i:03}{extension}' for i in range(1, len(points) + 2)]
+    for map_streams in dict.fromkeys((multi_streams, False)):
+        cmd = [FFMPEG_NAME, '-hide_banner', '-loglevel', 'error', '-i', path, '-map', '0', '-map_chapters', '-1', '-strict', '-2', '-c', 'copy',
+               '-f', 'segment', '-segment_times', ','.join(f'{point:.3f}' for point in points), '-segment_time_delta', '0.05',
+               '-segment_start_number', '1', '-reset_timestamps', '1', f"{base_name.replace('%', '%%')}.part%03d{extension}"]
+        if not map_streams:
+            del cmd[6:8]
+        async with subprocess_lock:
+            if listener.suproc == 'cancelled':
+                return None
+            listener.suproc = await create_subprocess_exec(*cmd, stderr=PIPE)
+        _, stderr = await listener.suproc.communicate()
+        code = listener.suproc.returncode
+        if code == -9:
+            return None
+        if code == 0:
+            break
+        for out_path in out_paths:
+            await clean_target(out_path)
+        LOGGER.warning('%s. Segment split failed%s. Path: %s', stderr.decode().strip(), ', retrying without map' if map_streams else '', path)
+    else:
+        return []
+    for out_path in out_paths:
+        if not await aiopath.exists(out_path) or await get_path_size(out_path) > listener.maxSplitSize:
+            for part in out_paths:
+                await clean_target(part)
+            return []
+    return out_paths
 
 
 async def split_file(path, size, dirpath, split_size, listener, obj, start_time=0, i=1, inLoop=False, multi_streams=True):
@@ -212,6 +203,14 @@ async def split_file(path, size, dirpath, split_size, listener, obj, start_time=
         if multi_streams:
             multi_streams = await is_multi_streams(path)
         obj.state = 'video'
+        if not inLoop:
+            if (out_paths := await split_video_segments(path, split_size - 5000000, listener, multi_streams)) is None:
+                return False
+            if out_paths:
+                for out_path in out_paths:
+                    listener.total_size += await get_path_size(out_path)
+                return True
+            LOGGER.warning('Keyframe split not possible, splitting part by part. Path: %s', path)
         duration = (await get_media_info(path))[0]
         base_name, extension = ospath.splitext(path)
         split_size -= 5000000
@@ -390,7 +389,7 @@ class SampleVideo(FFProgress):
         return video_file
 
 
-async def createArchive(listener, scr_path, dest_path, size, pswd, mpart=False):
+async def createArchive(listener, scr_path, dest_path, size, pswd, mpart=False, progress=None):
     cmd = ['7z', f'-v{listener.splitSize}b', 'a', '-mx=0', f'-p{pswd}', dest_path, scr_path]
     cmd.extend(f'-xr!*.{ext}' for ext in listener.extensionFilter)
     if listener.isLeech and int(size) > listener.splitSize or mpart and int(size) > listener.splitSize:
@@ -402,19 +401,14 @@ async def createArchive(listener, scr_path, dest_path, size, pswd, mpart=False):
         if not pswd:
             del cmd[3]
         LOGGER.info('Zip: orig_path: %s, zip_path: %s', scr_path, dest_path)
-    async with subprocess_lock:
-        if listener.suproc == 'cancelled':
-            return
-        listener.suproc = await create_subprocess_exec(*cmd, stderr=PIPE)
-    _, stderr = await listener.suproc.communicate()
-    code = listener.suproc.returncode
-    if code == -9:
+    code, stderr = await (progress or SevenZipProgress()).run(listener, cmd, int(size))
+    if code is None or code == -9:
         return
     if code == 0:
         if not listener.seed:
             await clean_target(scr_path, True)
         return True
-    LOGGER.error('%s. Unable to zip this path: %s', stderr.decode().strip(), scr_path)
+    LOGGER.error('%s. Unable to zip this path: %s', stderr, scr_path)
     return True
 
 
@@ -423,7 +417,6 @@ class GenSS:
         self._message = message
         self._path = path
         self._images = f'genss_{self._message.id}.jpg'
-        self._ss_path = ospath.join('genss', str(self._message.id))
         self._name = ''
         self._error = False
 
@@ -439,43 +432,14 @@ class GenSS:
     def rimage(self):
         return self._images
 
-    async def _combine_image(self):
-        await cmd_exec([FFMPEG_NAME, '-hide_banner', '-loglevel', 'quiet', '-i', str(ospath.join(self._ss_path, '%1d.jpg')),
-                        '-filter_complex', 'scale=1920:-1,tile=3x3', self._images, '-y'])
-        if not await aiopath.exists(self._images):
-            self._images = ''
-
-    async def _run_genss(self, duration, index):
-        await makedirs(self._ss_path, exist_ok=True)
-        des_dir = ospath.join(self._ss_path, f'{index}.jpg')
-        cmds = [FFMPEG_NAME, '-hide_banner', '-loglevel', 'error', '-start_at_zero', '-copyts', '-ss', f'{duration}', '-i', self._path, '-vf',
-                "drawtext=fontfile=font.ttf:fontsize=70:fontcolor=white:box=1:boxcolor=black@0.7:x=(W-tw)/1.05:y=h-(2*lh):text='%{pts\:hms}'",
-                '-vframes', '1', des_dir, '-y']
-        await cmd_exec(cmds)
-        if await aiopath.exists(des_dir):
-            with Image.open(des_dir) as img:
-                img.convert('RGB').save(des_dir, 'JPEG')
-            return des_dir
-
     async def file_ss(self):
-        min_dur, max_photo = 5, 10
-        duration = (await get_media_info(self._path))[0]
-        if not duration:
+        if not (duration := (await media_probe.probe(self._path)).duration):
             self._error = 'Failed fetch info from url, something wrong with url or not video in url!'
             return
-        if duration > min_dur:
-            cur_step = duration // max_photo
-            current = cur_step
-            images = []
-            for x in range(max_photo):
-                images.append(await self._run_genss(current, str(x)))
-                current += cur_step
-            if any(images):
-                await self._combine_image()
+        self._images = (await frame_extractor.extract(self._path, duration, mosaic=self._images)).mosaic or ''
         if not self._images:
             self._error = 'Failed generated screenshot, something wrong with url or not video in url!'
             LOGGER.info('Failed Generating Screenshot: %s', ospath.basename(self._path))
-        await clean_target(self._ss_path)
 
     async def ddl_ss(self):
         self._name = get_url_name(self._path)
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from re import compile as re_compile, escape, IGNORECASE, DOTALL
+
+
+class RssFilter:
+    """Include/exclude filters of a feed compiled into one anchored regex.
+    Each include group becomes a lookahead, all exclude words share a single negative lookahead."""
+
+    def __init__(self, inf: tuple, exf: tuple, mode: str=''):
+        self.ignore_case = 'i' in mode
+        self.whole_word = 'w' in mode
+        pattern = '^'
+        if exf_words := [word for group in exf for word in group]:
+            pattern += f'(?!.*?(?:{self._alternation(exf_words)}))'
+        for group in inf:
+            pattern += f'(?=.*?(?:{self._alternation(group)}))'
+        self._pattern = re_compile(pattern, DOTALL | (IGNORECASE if self.ignore_case else 0))
+
+    def _alternation(self, words):
+        words = sorted({escape(word) for word in words}, key=len, reverse=True)
+        if self.whole_word:
+            words = [rf'(?<!\w){word}(?!\w)' for word in words]
+        return '|'.join(words)
+
+    def match(self, title: str) -> bool:
+        return self._pattern.match(title) is not None
+
+    def match_many(self, titles: list) -> list:
+        match = self._pattern.match
+        return [match(title) is not None for title in titles]
+
+
+@lru_cache(maxsize=1024)
+def _compile(inf: tuple, exf: tuple, mode: str) -> RssFilter:
+    return RssFilter(inf, exf, mode)
+
+
+def get_rss_filter(data: dict) -> RssFilter:
+    return _compile(tuple(tuple(group) for group in data.get('inf') or []),
+                    tuple(tuple(group) for group in data.get('exf') or []),
+                    data.get('fmode') or '')
+
+
+def parse_filter_mode(value: str) -> str:
+    if value.lower() == 'none':
+        return ''
+    return ''.join(flag for flag in 'iw' if flag in value.lower())
@@ -3,6 +3,7 @@ from psutil import virtual_memory, cpu_percent, disk_usage, net_io_counters
 from pyrogram.types import Message
 from time import time
 from pytz import timezone
+from threading import Lock
 
 from bot import bot_name, task_dict, task_dict_lock, botStartTime, config_dict
 from bot.helper.telegram_helper.bot_commands import BotCommands
@@ -11,6 +12,10 @@ from bot.helper.telegram_helper.button_build import ButtonMaker
 
 SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
 
+_snapshot = {'time': 0, 'entries': {}}
+_snapshot_lock = Lock()
+_metrics_cache = {'time': 0}
+
 
 class MirrorStatus:
     STATUS_ARCHIVING = 'Archiving'
@@ -124,16 +129,138 @@ def action(message: Message):
     return acts.replace('/', '#').replace(f'@{bot_name}', '').replace(str(config_dict['CMD_SUFFIX']), '').lower()
 
 
+def _host_metrics():
+    if time() - _metrics_cache['time'] >= config_dict['STATUS_UPDATE_INTERVAL']:
+        net_io = net_io_counters()
+        _metrics_cache.update({'time': time(),
+                               'cpu': cpu_percent(),
+                               'ram': virtual_memory().percent,
+                               'free': get_readable_file_size(disk_usage(config_dict['DOWNLOAD_DIR']).free),
+                               'recv': get_readable_file_size(net_io.bytes_recv),
+                               'sent': get_readable_file_size(net_io.bytes_sent)})
+    return _metrics_cache
+
+
+def _task_info(task):
+    """Sampled values of a task, the clock driven ones are returned apart so they never invalidate the cached text."""
+    tstatus = task.status()
+    info = {'status': tstatus, 'name': task.name(), 'dl_speed': 0, 'up_speed': 0}
+    if tstatus not in [MirrorStatus.STATUS_SEEDING, MirrorStatus.STATUS_METADATA, MirrorStatus.STATUS_SUBSYNC]:
+        info.update({'progress': task.progress(),
+                     'processed': task.processed_bytes(),
+                     'size': task.size(),
+                     'speed': task.speed()})
+        live = {'eta': task.eta() or '~', 'elapsed': task.elapsed() or '~'}
+        if tstatus == MirrorStatus.STATUS_WAIT:
+            live['timeout'] = task.timeout()
+        if hasattr(task, 'seeders_num'):
+            try:
+                info['sl'] = f'{task.seeders_num()}/{task.leechers_num()}'
+            except:
+                pass
+        if tstatus == MirrorStatus.STATUS_DOWNLOADING or task.engine() == 'JDownloader':
+            info['dl_speed'] = task.speed_raw()
+        elif tstatus == MirrorStatus.STATUS_UPLOADING:
+            info['up_speed'] = task.speed_raw()
+    elif tstatus == MirrorStatus.STATUS_SEEDING:
+        info.update({'size': task.size(),
+                     'speed': task.upload_speed(),
+                     'uploaded': task.uploaded_bytes(),
+                     'ratio': task.ratio(),
+                     'sl': f'{task.seeders_num()}/{task.leechers_num()}',
+                     'up_speed': task.upload_speed_raw()})
+        live = {'time': task.seeding_time()}
+    else:
+        info['size'] = task.size()
+        live = {'elapsed': task.elapsed() or '~'}
+    return info, live
+
+
+def _render_live(live):
+    msg = ''
+    if 'eta' in live:
+        msg += f'\n<b>├ ETA:</b> {live["eta"]}'
+    if 'elapsed' in live:
+        msg += f'\n<b>├ Elapsed:</b> {live["elapsed"]}'
+    if 'timeout' in live:
+        msg += f'\n<b>├ Timeout: </b>{live["timeout"]}'
+    if 'time' in live:
+        msg += f'\n<b>├ Time:</b> {live["time"]}'
+    return msg
+
+
+def _render_task(task, info):
+    """Text of a task split around the place of its clock driven lines."""
+    tstatus, tail = info['status'], ''
+    msg = f'<code>{escape(str(info["name"])) or "N/A"}</code>'
+    if task.listener.isSuperChat:
+        reply_to = task.listener.message.reply_to_message
+        link = task.listener.message.link if not reply_to or getattr(reply_to.from_user, 'is_bot', None) else reply_to.link
+        msg += f'\n\n<b>┌ <a href="{link}"><i>{tstatus}...</i></a></b>'
+    else:
+        msg += f'\n<b>┌ <i>{tstatus}...</i></b>'
+    ext_msg = (f'\n<b>├ Engine:<i> {task.engine()}</i></b>'
+               f'\n<b>├ By:</b> <a href="https://t.me/{task.listener.message.from_user.username}">{task.listener.message.from_user.first_name}</a>' if task.listener.isSuperChat else ''
+               f'\n<b>├ Action:</b> {action(task.listener.message)}')
+    if 'progress' in info:
+        msg += (f'\n<b>├ </b>{get_progress_bar_string(info["progress"])}'
+                f'\n<b>├ Progress:</b> {info["progress"]}')
+        if tstatus == MirrorStatus.STATUS_SPLITTING and task.listener.isLeech:
+            msg += f'\n<b>├ Split Size:</b> {get_readable_file_size(task.listener.splitSize)}'
+        msg += (f'\n<b>├ Processed:</b> {info["processed"]}'
+                f'\n<b>├ Total Size:</b> {info["size"]}'
+                f'\n<b>├ Speed:</b> {info["speed"]}')
+        if 'sl' in info:
+            tail = f'\n<b>├ S/L:</b> {info["sl"]}'
+    elif tstatus == MirrorStatus.STATUS_SEEDING:
+        msg += (f'\n<b>├ Size:</b> {info["size"]}'
+                f'\n<b>├ Speed:</b> {info["speed"]}'
+                f'\n<b>├ Uploaded:</b> {info["uploaded"]}'
+                f'\n<b>├ Ratio:</b> {info["ratio"]}')
+        tail = f'\n<b>├ S/L:</b> {info["sl"]}'
+    else:
+        msg += f'\n<b>├ Size:</b> {info["size"]}'
+    return msg, f'{tail}{ext_msg}\n<b>└ </b><code>/{BotCommands.CancelTaskCommand} {task.gid()}</code>\n\n'
+
+
+def _get_snapshot():
+    """Sample every task once per interval and share the result between all status messages.
+
+    Tasks whose status object changed since the last snapshot are sampled right away, and a
+    task's text block is only rebuilt when its sampled values differ from the cached ones.
+    ETA, elapsed and the other clock driven values are kept apart and formatted on render.
+    """
+    with _snapshot_lock:
+        tasks = list(task_dict.values())
+        expired = time() - _snapshot['time'] >= max(config_dict['STATUS_UPDATE_INTERVAL'] / 2, 1)
+        old_entries = _snapshot['entries']
+        entries = {}
+        for task in tasks:
+            if not expired and (entry := old_entries.get(id(task))):
+                entries[id(task)] = entry
+                continue
+            info, live = _task_info(task)
+            if (entry := old_entries.get(id(task))) and entry[1] == info:
+                entries[id(task)] = (task, info, live, entry[3])
+            else:
+                entries[id(task)] = (task, info, live, _render_task(task, info))
+        _snapshot['entries'] = entries
+        if expired:
+            _snapshot['time'] = time()
+        return [entries[id(task)] for task in tasks]
+
+
 def get_readable_message(sid: int, is_user: bool, page_no: int=1, status : str='All', page_step: int=1):
     msg = f'<a href="https://t.me/maheshsirop"><b><i>Bot By Mahesh Kadali</b></i></a>\n\n'
     dl_speed = up_speed = 0
 
+    snapshot = _get_snapshot()
     if status == 'All':
-        tasks = [tk for tk in task_dict.values() if tk.listener.user_id == sid] if is_user else list(task_dict.values())
+        tasks = [entry for entry in snapshot if entry[0].listener.user_id == sid] if is_user else snapshot
     elif is_user:
-        tasks = [tk for tk in task_dict.values() if tk.status() == status and tk.listener.user_id == sid]
+        tasks = [entry for entry in snapshot if entry[1]['status'] == status and entry[0].listener.user_id == sid]
     else:
-        tasks = [tk for tk in task_dict.values() if tk.status() == status]
+        tasks = [entry for entry in snapshot if entry[1]['status'] == status]
 
     STATUS_LIMIT = config_dict['STATUS_LIMIT']
     tasks_no = len(tasks)
@@ -143,60 +270,17 @@ def get_readable_message(sid: int, is_user: bool, page_no: int=1, status : str='
     elif page_no < 1:
         page_no = pages - (abs(page_no) % pages)
     start_position = (page_no - 1) * STATUS_LIMIT
-    for index, task in enumerate(tasks[start_position:STATUS_LIMIT + start_position], start=1):
-        tstatus = task.status()
-        msg += f'<b>{index+start_position}.</b> <code>{escape(str(task.name())) or "N/A"}</code>'
-        if task.listener.isSuperChat:
-            reply_to = task.listener.message.reply_to_message
-            link = task.listener.message.link if not reply_to or getattr(reply_to.from_user, 'is_bot', None) else reply_to.link
-            msg += f'\n\n<b>┌ <a href="{link}"><i>{tstatus}...</i></a></b>'
-        else:
-            msg += f'\n<b>┌ <i>{tstatus}...</i></b>'
-        ext_msg = (f'\n<b>├ Engine:<i> {task.engine()}</i></b>'
-                   f'\n<b>├ By:</b> <a href="https://t.me/{task.listener.message.from_user.username}">{task.listener.message.from_user.first_name}</a>' if task.listener.isSuperChat else ''
-                   f'\n<b>├ Action:</b> {action(task.listener.message)}')
-        if tstatus not in [MirrorStatus.STATUS_SEEDING, MirrorStatus.STATUS_METADATA, MirrorStatus.STATUS_SUBSYNC]:
-            msg += (f'\n<b>├ </b>{get_progress_bar_string(task.progress())}'
-                    f'\n<b>├ Progress:</b> {task.progress()}')
-            if tstatus == MirrorStatus.STATUS_SPLITTING and task.listener.isLeech:
-                msg += f'\n<b>├ Split Size:</b> {get_readable_file_size(task.listener.splitSize)}'
-            msg += (f'\n<b>├ Processed:</b> {task.processed_bytes()}'
-                    f'\n<b>├ Total Size:</b> {task.size()}'
-                    f'\n<b>├ Speed:</b> {task.speed()}'
-                    f'\n<b>├ ETA:</b> {task.eta() or "~"}'
-                    f'\n<b>├ Elapsed: </b>{task.elapsed() or "~"}')
-            if tstatus == MirrorStatus.STATUS_WAIT:
-                msg += f'\n<b>├ Timeout: </b>{task.timeout()}'
-            if hasattr(task, 'seeders_num'):
-                try:
-                    msg += f'\n<b>├ S/L:</b> {task.seeders_num()}/{task.leechers_num()}'
-                except:
-                    pass
-        elif tstatus == MirrorStatus.STATUS_SEEDING:
-            msg += (f'\n<b>├ Size:</b> {task.size()}'
-                    f'\n<b>├ Speed:</b> {task.upload_speed()}'
-                    f'\n<b>├ Uploaded:</b> {task.uploaded_bytes()}'
-                    f'\n<b>├ Ratio:</b> {task.ratio()}'
-                    f'\n<b>├ Time:</b> {task.seeding_time()}'
-                    f'\n<b>├ S/L:</b> {task.seeders_num()}/{task.leechers_num()}')
-        else:
-            msg += (f'\n<b>├ Size:</b> {task.size()}'
-                    f'\n<b>├ Elapsed:</b> {task.elapsed() or "~"}')
-        msg += f'{ext_msg}\n<b>└ </b><code>/{BotCommands.CancelTaskCommand} {task.gid()}</code>\n\n'
+    for index, (_, _, live, (head, tail)) in enumerate(tasks[start_position:STATUS_LIMIT + start_position], start=1):
+        msg += f'<b>{index+start_position}.</b> {head}{_render_live(live)}{tail}'
 
     if not msg:
         if status == 'All':
             return None, None
         msg = f'No Active {status} Task!\n'
 
-    for task in tasks:
-        tstatus = task.status()
-        if tstatus == MirrorStatus.STATUS_DOWNLOADING or task.engine() == 'JDownloader':
-            dl_speed += speed_string_to_bytes(task.speed())
-        elif tstatus == MirrorStatus.STATUS_UPLOADING:
-            up_speed += speed_string_to_bytes(task.speed())
-        elif tstatus == MirrorStatus.STATUS_SEEDING:
-            up_speed += speed_string_to_bytes(task.upload_speed())
+    for _, info, _, _ in tasks:
+        dl_speed += info['dl_speed']
+        up_speed += info['up_speed']
 
     buttons = ButtonMaker()
     if not is_user:
@@ -209,15 +293,16 @@ def get_readable_message(sid: int, is_user: bool, page_no: int=1, status : str='
         if tasks_no > 30:
             for i in [1, 2, 4, 6, 8, 10, 15, 20]:
                 buttons.button_data(i, f'status {sid} ps {i}', 'footer')
-    if len(task_dict) > STATUS_LIMIT or status != 'All':
+    if len(snapshot) > STATUS_LIMIT or status != 'All':
         for label, status_value in STATUS_VALUES:
             if status_value != status:
                 buttons.button_data(label, f'status {sid} st {status_value}')
     buttons.button_data('♻️', f'status {sid} ref', 'header')
     if is_user:
         buttons.button_data('✘', f'status {sid} cls', 'header')
+    metrics = _host_metrics()
     msg += ('▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬\n'
-            f'<b>CPU:</b> {cpu_percent()}% <b>| RAM:</b> {virtual_memory().percent}% <b>| FREE:</b> {get_readable_file_size(disk_usage(config_dict["DOWNLOAD_DIR"]).free)}\n'
-            f'<b>IN:</b> {get_readable_file_size(net_io_counters().bytes_recv)}<b> | OUT:</b> {get_readable_file_size(net_io_counters().bytes_sent)}\n'
+            f'<b>CPU:</b> {metrics["cpu"]}% <b>| RAM:</b> {metrics["ram"]}% <b>| FREE:</b> {metrics["free"]}\n'
+            f'<b>IN:</b> {metrics["recv"]}<b> | OUT:</b> {metrics["sent"]}\n'
             f'<b>DL:</b> {get_readable_file_size(dl_speed)}/s<b> | UL:</b> {get_readable_file_size(up_speed)}/s <b>|</b> {get_readable_time(time() - botStartTime)}')
     return msg, buttons.build_menu(6)
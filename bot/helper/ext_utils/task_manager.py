@@ -1,11 +1,16 @@
 from aiofiles.os import path as aiopath
-from asyncio import Event, sleep
+from asyncio import Event
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
 from os import path as ospath
+from time import time
 
-from bot import config_dict, queued_dl, queued_up, non_queued_up, non_queued_dl, queue_dict_lock, LOGGER
+from bot import config_dict, user_data, queued_dl, queued_up, non_queued_up, non_queued_dl, queue_dict_lock, LOGGER
 from bot.helper.ext_utils.bot_utils import sync_to_async, presuf_remname_name, is_premium_user
 from bot.helper.ext_utils.files_utils import get_base_name, check_storage_threshold
 from bot.helper.ext_utils.links_utils import is_gdrive_id, is_mega_link
+from bot.helper.mirror_utils.gdrive_utlis.drive_index import drive_index
 from bot.helper.mirror_utils.gdrive_utlis.search import gdSearch
 
 
@@ -25,7 +30,11 @@ async def stop_duplicate_check(listener):
     if name:
         if not listener.isRename and await aiopath.isfile(ospath.join(listener.dir, name)):
             name = presuf_remname_name(listener.user_dict, name)
-        count, file = await sync_to_async(gdSearch(stopDup=True, noMulti=listener.isClone).drive_list, name, listener.upDest, listener.user_id)
+        search = gdSearch(stopDup=True, noMulti=listener.isClone)
+        if config_dict['STOP_DUPLICATE_INDEX'] and await sync_to_async(drive_index.lookup, search, name, listener.upDest, listener.user_id, listener.isClone) is False:
+            LOGGER.info('Checking duplicate is passed...')
+            return None, ''
+        count, file = await sync_to_async(search.drive_list, name, listener.upDest, listener.user_id)
         if count:
             return file, name
     LOGGER.info('Checking duplicate is passed...')
@@ -57,72 +66,173 @@ async def check_limits_size(listener, size, playlist=False, play_count=False):
     return msgerr
 
 
-async def check_running_tasks(mid: int, state='dl'):
-    all_limit = config_dict['QUEUE_ALL']
-    state_limit = (config_dict['QUEUE_DOWNLOAD'] if state == 'dl' else config_dict['QUEUE_UPLOAD'])
-    event = None
-    is_over_limit = False
-    if all_limit or state_limit:
-        async with queue_dict_lock:
-            if state == 'up' and mid in non_queued_dl:
-                non_queued_dl.remove(mid)
-            dl_count, up_count = len(non_queued_dl), len(non_queued_up)
-            is_over_limit = (all_limit and dl_count + up_count >= all_limit and (not state_limit or dl_count >= state_limit)) or (state_limit and dl_count >= state_limit)
-            if is_over_limit:
-                event = Event()
-                if state == 'dl':
-                    queued_dl[mid] = event
-                else:
-                    queued_up[mid] = event
+class TaskScheduler:
+    """Admit queued tasks by priority class, per-user fairness and per-engine slots.
+
+    Every engine keeps its own heap of ``(class, vtime, seq, mid)`` entries per state, so
+    admission only compares the heads of a handful of heaps. Entries for tasks that left
+    the queue (cancelled or force started) are dropped lazily when they reach the head.
+    """
+    SUDO, PREMIUM, NORMAL = range(3)
+
+    def __init__(self):
+        self._heaps = {'dl': {}, 'up': {}}
+        self._vtime = {'dl': 0, 'up': 0}
+        self._user_vtime = {'dl': {}, 'up': {}}
+        self._added = {'dl': {}, 'up': {}}
+        self._waits = {'dl': deque(maxlen=100), 'up': deque(maxlen=100)}
+        self._engines = {}
+        self._seq = count()
+        self._limits_src = None
+        self._limits = {}
+
+    @staticmethod
+    def _queued(state):
+        return queued_dl if state == 'dl' else queued_up
+
+    @staticmethod
+    def _running(state):
+        return non_queued_dl if state == 'dl' else non_queued_up
+
+    def _priority(self, user_id):
+        if user_id == config_dict['OWNER_ID'] or user_data.get(user_id, {}).get('is_sudo'):
+            return self.SUDO
+        return self.PREMIUM if is_premium_user(user_id) else self.NORMAL
+
+    def engine_limits(self):
+        if (src := config_dict.get('QUEUE_ENGINES', '')) != self._limits_src:
+            limits = {}
+            for item in src.split():
+                engine, _, limit = item.partition(':')
+                if limit.isdigit():
+                    limits[engine.lower()] = int(limit)
+            self._limits_src, self._limits = src, limits
+        return self._limits
+
+    def free_slots(self, state):
+        all_limit = config_dict['QUEUE_ALL']
+        state_limit = config_dict['QUEUE_DOWNLOAD'] if state == 'dl' else config_dict['QUEUE_UPLOAD']
+        dl, up = len(non_queued_dl), len(non_queued_up)
+        free = float('inf')
+        if all_limit:
+            free = all_limit - dl - up
+        if state_limit:
+            free = min(free, state_limit - (dl if state == 'dl' else up))
+        return free
+
+    def has_slot(self, engine):
+        if not (limit := self.engine_limits().get(engine)):
+            return True
+        running = sum(self._engines.get(mid) == engine for mid in non_queued_dl | non_queued_up)
+        return running < limit
+
+    def enqueue(self, listener, state, engine):
+        mid, user_id = listener.mid, listener.user_id
+        self._engines[mid] = engine
+        event = self._queued(state)[mid] = Event()
+        vtime = max(self._vtime[state], self._user_vtime[state].get(user_id, 0)) + 1
+        self._user_vtime[state][user_id] = vtime
+        heap = self._heaps[state].setdefault(engine, [])
+        heappush(heap, (self._priority(user_id), vtime, next(self._seq), mid))
+        self._added[state][mid] = time()
+        self.admit(state)
+        return event if mid in self._queued(state) else None
+
+    def try_start(self, mid, state, engine):
+        """Take a free slot right away, never queueing and never passing tasks that are already waiting."""
+        if self._queued(state) or self.free_slots(state) <= 0 or not self.has_slot(engine):
+            return False
+        self._engines[mid] = engine
+        self._running(state).add(mid)
+        return True
+
+    def start(self, state, mid):
+        self._queued(state).pop(mid).set()
+        self._running(state).add(mid)
+        if added := self._added[state].pop(mid, None):
+            self._waits[state].append(time() - added)
+
+    def _head(self, state, engine):
+        heap, queued = self._heaps[state][engine], self._queued(state)
+        while heap and heap[0][3] not in queued:
+            heappop(heap)
+        return heap[0] if heap else None
+
+    def admit(self, state):
+        while self.free_slots(state) > 0:
+            best = None
+            for engine in self._heaps[state]:
+                if (head := self._head(state, engine)) and self.has_slot(engine) and (not best or head < best[0]):
+                    best = (head, engine)
+            if not best:
+                break
+            _, vtime, _, mid = heappop(self._heaps[state][best[1]])
+            self._vtime[state] = max(self._vtime[state], vtime)
+            self.start(state, mid)
+
+    def prune(self):
+        active = non_queued_dl | non_queued_up | queued_dl.keys() | queued_up.keys()
+        for mid in [mid for mid in self._engines if mid not in active]:
+            del self._engines[mid]
+        for state in ('dl', 'up'):
+            for mid in [mid for mid in self._added[state] if mid not in self._queued(state)]:
+                del self._added[state][mid]
+
+    def stats(self):
+        result = {}
+        for state in ('dl', 'up'):
+            now, queued, waits = time(), self._queued(state), self._waits[state]
+            engines = {}
+            for mid in queued:
+                engine = self._engines.get(mid, 'other')
+                engines[engine] = engines.get(engine, 0) + 1
+            result[state] = {'queued': len(queued),
+                             'running': len(self._running(state)),
+                             'engines': engines,
+                             'avg_wait': sum(waits) / len(waits) if waits else 0,
+                             'max_wait': max((now - added for added in self._added[state].values()), default=0)}
+        return result
+
+
+scheduler = TaskScheduler()
+
+
+def get_upload_engine(listener):
+    if listener.isLeech:
+        return 'telegram'
+    return 'gdrive' if is_gdrive_id(listener.upDest) else 'rclone'
+
+
+async def check_running_tasks(listener, state='dl', engine='aria2'):
+    async with queue_dict_lock:
+        if state == 'up' and listener.mid in non_queued_dl:
+            non_queued_dl.remove(listener.mid)
+        if state == 'up' and listener.mid in non_queued_up:
+            return False, None
+        event = scheduler.enqueue(listener, state, engine)
+    return event is not None, event
+
 
-    return is_over_limit, event
+async def take_upload_slot(listener):
+    """Upload slot for a task that is still downloading, only taken when one is free."""
+    async with queue_dict_lock:
+        return listener.mid in non_queued_up or scheduler.try_start(listener.mid, 'up', get_upload_engine(listener))
 
 
 async def start_dl_from_queued(mid: int):
-    queued_dl[mid].set()
-    del queued_dl[mid]
-    await sleep(0.7)
+    scheduler.start('dl', mid)
 
 
 async def start_up_from_queued(mid: int):
-    queued_up[mid].set()
-    del queued_up[mid]
-    await sleep(0.7)
+    scheduler.start('up', mid)
 
 
-async def start_task_from_queued(task_type, limit, non_queued, queued):
+async def start_from_queued():
     async with queue_dict_lock:
-        count = len(non_queued)
-        if queued and count < limit:
-            f_tasks = limit - count
-            for index, mid in enumerate(list(queued), start=1):
-                if task_type == 'up':
-                    await start_up_from_queued(mid)
-                else:
-                    await start_dl_from_queued(mid)
-                if index == f_tasks:
-                    break
+        scheduler.prune()
+        scheduler.admit('up')
+        scheduler.admit('dl')
 
-async def start_from_queued():
-    all_limit, dl_limit, up_limit = config_dict['QUEUE_ALL'], config_dict['QUEUE_DOWNLOAD'], config_dict['QUEUE_UPLOAD']
-
-    if all_limit:
-        async with queue_dict_lock:
-            dl, up = len(non_queued_dl), len(non_queued_up)
-            all_ = dl + up
-            if all_ < all_limit:
-                if queued_up and (not up_limit or up < up_limit):
-                    await start_task_from_queued('up', min(all_limit - all_, up_limit or all_limit), non_queued_up, queued_up)
-                if queued_dl and (not dl_limit or dl < dl_limit):
-                    await start_task_from_queued('dl', min(all_limit - all_, dl_limit or all_limit), non_queued_dl, queued_dl)
-        return
-
-    if up_limit:
-        await start_task_from_queued('up', up_limit, non_queued_up, queued_up)
-    else:
-        await start_task_from_queued('up', float('inf'), non_queued_up, queued_up)
-
-    if dl_limit:
-        await start_task_from_queued('dl', dl_limit, non_queued_dl, queued_dl)
-    else:
-        await start_task_from_queued('dl', float('inf'), non_queued_dl, queued_dl)
+
+def queue_stats():
+    return scheduler.stats()
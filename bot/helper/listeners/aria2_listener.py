@@ -7,6 +7,7 @@ from bot.helper.ext_utils.files_utils import clean_unwanted, clean_target
 from bot.helper.ext_utils.status_utils import get_readable_file_size, getTaskByGid
 from bot.helper.ext_utils.task_manager import stop_duplicate_check, check_limits_size
 from bot.helper.mirror_utils.status_utils.aria_status import Aria2Status
+from bot.helper.mirror_utils.upload_utils.early_upload import EarlyUpload
 from bot.helper.telegram_helper.message_utils import sendMessage, deleteMessage, sendingMessage, update_status_message
 
 
@@ -49,6 +50,14 @@ async def _onDownloadStarted(api, gid):
             LOGGER.info('File/folder size over the limit size!')
             await gather(task.listener.onDownloadError(f'{msg}. File/folder size is {get_readable_file_size(size)}.'),
                          sync_to_async(api.remove, [download], force=True, files=True))
+            return
+
+        if download.is_torrent and task.listener.canEarlyUpload():
+            async def _get_files():
+                files = (await sync_to_async(api.get_download, gid)).files
+                return [(str(f.path), f.completed_length == f.length) for f in files if f.selected]
+
+            task.listener.earlyUpload = EarlyUpload(task.listener, _get_files, size)
 
 
 @new_thread
@@ -1,5 +1,6 @@
 from asyncio import sleep, gather
 from os import path as ospath
+from qbittorrentapi import TorrentDictionary
 from time import time
 
 from bot import bot_loop, task_dict, task_dict_lock, Intervals, config_dict, QbTorrents, qb_listener_lock, get_client, LOGGER
@@ -8,6 +9,7 @@ from bot.helper.ext_utils.files_utils import clean_unwanted, clean_target
 from bot.helper.ext_utils.status_utils import get_readable_file_size, get_readable_time, getTaskByGid
 from bot.helper.ext_utils.task_manager import stop_duplicate_check, check_limits_size
 from bot.helper.mirror_utils.status_utils.qbit_status import QbittorrentStatus
+from bot.helper.mirror_utils.upload_utils.early_upload import EarlyUpload
 from bot.helper.telegram_helper.message_utils import update_status_message
 
 
@@ -59,6 +61,20 @@ async def _download_limits(tor):
         _onDownloadError(f'{msg}. File/folder size is {get_readable_file_size(tor.size)}.', tor)
 
 
+@new_task
+async def _early_upload(tor):
+    task = await getTaskByGid(tor.hash[:12])
+    if not hasattr(task, 'client') or not task.listener.canEarlyUpload():
+        return
+    listener, ext_hash = task.listener, tor.hash
+
+    async def _get_files():
+        files = await sync_to_async(task.client.torrents_files, torrent_hash=ext_hash)
+        return [(ospath.join(listener.dir, f.name), f.progress == 1) for f in files if f.priority != 0]
+
+    listener.earlyUpload = EarlyUpload(listener, _get_files, tor.size)
+
+
 @new_task
 async def _onDownloadComplete(tor):
     ext_hash = tor.hash
@@ -98,62 +114,108 @@ async def _onDownloadComplete(tor):
             await _remove_torrent(client, ext_hash, tag)
 
 
+def _sweep_torrents(client, torrents, tracked, TORRENT_TIMEOUT):
+    reannounce, recheck = [], []
+    for ext_hash in tracked:
+        info = torrents[ext_hash]
+        tag = info['tags']
+        state = info.get('state')
+        if state == 'metaDL':
+            QbTorrents[tag]['stalled_time'] = time()
+            if TORRENT_TIMEOUT and time() - info.get('added_on', 0) >= TORRENT_TIMEOUT:
+                _onDownloadError('Dead torrent!', TorrentDictionary(dict(info), client))
+            else:
+                reannounce.append(ext_hash)
+        elif state == 'downloading':
+            QbTorrents[tag]['stalled_time'] = time()
+        elif state == 'stalledDL':
+            if not QbTorrents[tag]['rechecked'] and 0.99989999999999999 < info.get('progress', 0) < 1:
+                LOGGER.warning('Force recheck - Name: %s Hash: %s Downloaded Bytes: %s Size: %s Total Size: %s',
+                               info.get('name'), ext_hash, info.get('downloaded'), info.get('size'), info.get('total_size'))
+                recheck.append(ext_hash)
+                QbTorrents[tag]['rechecked'] = True
+            elif TORRENT_TIMEOUT and time() - QbTorrents[tag]['stalled_time'] >= TORRENT_TIMEOUT:
+                _onDownloadError('Dead torrent!', TorrentDictionary(dict(info), client))
+            else:
+                reannounce.append(ext_hash)
+    return reannounce, recheck
+
+
+def _on_torrent_changed(tor_info, delta, recheck, STOP_DUPLICATE):
+    tag = tor_info.tags
+    if tag not in QbTorrents:
+        return
+    state = tor_info.state
+    if state == 'downloading':
+        if STOP_DUPLICATE and not QbTorrents[tag]['stop_dup_check']:
+            QbTorrents[tag]['stop_dup_check'] = True
+            _stop_duplicate(tor_info)
+        if 'size' in delta or 'state' in delta:
+            _download_limits(tor_info)
+        if config_dict['EARLY_UPLOAD'] and not QbTorrents[tag]['early_upload']:
+            QbTorrents[tag]['early_upload'] = True
+            _early_upload(tor_info)
+    elif state == 'missingFiles':
+        if 'state' in delta:
+            recheck.append(tor_info.hash)
+    elif state == 'error':
+        _onDownloadError('No enough space for this torrent on device', tor_info)
+    elif tor_info.completion_on != 0 and not QbTorrents[tag]['uploaded'] and state not in ['checkingUP', 'checkingDL', 'checkingResumeData', 'metaDL', 'stalledDL']:
+        QbTorrents[tag]['uploaded'] = True
+        _onDownloadComplete(tor_info)
+    elif state in ['pausedUP', 'pausedDL'] and QbTorrents[tag]['seeding']:
+        QbTorrents[tag]['seeding'] = False
+        _onSeedFinish(tor_info)
+
+
 async def _qb_listener():
+    """Follow qBittorrent through /sync/maindata deltas.
+
+    A local copy of every torrent is patched with the fields that changed since the last
+    ``rid``, so only changed torrents go through the event handlers while timeouts are
+    checked against the local copy. Reannounce and recheck calls are sent once per cycle
+    for all hashes that need them.
+    """
     client = await sync_to_async(get_client)
     TORRENT_TIMEOUT = config_dict['TORRENT_TIMEOUT']
     STOP_DUPLICATE = config_dict['STOP_DUPLICATE']
+    rid, torrents, tracked = 0, {}, set()
     while True:
         async with qb_listener_lock:
             try:
-                if len(await sync_to_async(client.torrents_info)) == 0:
+                data = await sync_to_async(client.sync_maindata, rid=rid)
+                rid = data.get('rid', 0)
+                if data.get('full_update'):
+                    torrents.clear()
+                for ext_hash in data.get('torrents_removed') or []:
+                    torrents.pop(ext_hash, None)
+                changed = dict(data.get('torrents') or {})
+                for ext_hash, delta in changed.items():
+                    torrents.setdefault(ext_hash, {'hash': ext_hash}).update(delta)
+                if not torrents:
                     Intervals['qb'] = ''
                     await sync_to_async(client.auth_log_out)
                     return
-                for tor_info in await sync_to_async(client.torrents_info):
-                    tag = tor_info.tags
-                    if tag not in QbTorrents:
-                        continue
-                    state = tor_info.state
-                    if state == 'metaDL':
-                        QbTorrents[tag]['stalled_time'] = time()
-                        if TORRENT_TIMEOUT and time() - tor_info.added_on >= TORRENT_TIMEOUT:
-                            _onDownloadError('Dead torrent!', tor_info)
-                        else:
-                            await sync_to_async(client.torrents_reannounce, torrent_hashes=tor_info.hash)
-                    elif state == 'downloading':
-                        QbTorrents[tag]['stalled_time'] = time()
-                        if STOP_DUPLICATE and not QbTorrents[tag]['stop_dup_check']:
-                            QbTorrents[tag]['stop_dup_check'] = True
-                            _stop_duplicate(tor_info)
-                        _download_limits(tor_info)
-                    elif state == 'stalledDL':
-                        if not QbTorrents[tag]['rechecked'] and 0.99989999999999999 < tor_info.progress < 1:
-                            msg = f'Force recheck - Name: {tor_info.name} Hash: {tor_info.hash} Downloaded Bytes: {tor_info.downloaded} Size: {tor_info.size} Total Size: {tor_info.total_size}'
-                            LOGGER.warning(msg)
-                            await sync_to_async(client.torrents_recheck, torrent_hashes=tor_info.hash)
-                            QbTorrents[tag]['rechecked'] = True
-                        elif TORRENT_TIMEOUT and time() - QbTorrents[tag]['stalled_time'] >= TORRENT_TIMEOUT:
-                            _onDownloadError('Dead torrent!', tor_info)
-                        else:
-                            await sync_to_async(client.torrents_reannounce, torrent_hashes=tor_info.hash)
-                    elif state == 'missingFiles':
-                        await sync_to_async(client.torrents_recheck, torrent_hashes=tor_info.hash)
-                    elif state == 'error':
-                        _onDownloadError('No enough space for this torrent on device', tor_info)
-                    elif tor_info.completion_on != 0 and not QbTorrents[tag]['uploaded'] and state not in ['checkingUP', 'checkingDL', 'checkingResumeData']:
-                        QbTorrents[tag]['uploaded'] = True
-                        _onDownloadComplete(tor_info)
-                    elif state in ['pausedUP', 'pausedDL'] and QbTorrents[tag]['seeding']:
-                        QbTorrents[tag]['seeding'] = False
-                        _onSeedFinish(tor_info)
+                new_tracked = {ext_hash for ext_hash, info in torrents.items() if info.get('tags') in QbTorrents}
+                for ext_hash in new_tracked - tracked:
+                    changed.setdefault(ext_hash, torrents[ext_hash])
+                tracked = new_tracked
+                reannounce, recheck = _sweep_torrents(client, torrents, tracked, TORRENT_TIMEOUT)
+                for ext_hash, delta in changed.items():
+                    _on_torrent_changed(TorrentDictionary(dict(torrents[ext_hash]), client), delta, recheck, STOP_DUPLICATE)
+                if reannounce:
+                    await sync_to_async(client.torrents_reannounce, torrent_hashes=reannounce)
+                if recheck:
+                    await sync_to_async(client.torrents_recheck, torrent_hashes=recheck)
             except Exception as e:
                 LOGGER.error(e)
                 client = await sync_to_async(get_client)
+                rid = 0
         await sleep(3)
 
 
 async def onDownloadStart(tag):
     async with qb_listener_lock:
-        QbTorrents[tag] = {'stalled_time': time(), 'stop_dup_check': False, 'rechecked': False, 'uploaded': False, 'seeding': False}
+        QbTorrents[tag] = {'stalled_time': time(), 'stop_dup_check': False, 'rechecked': False, 'uploaded': False, 'seeding': False, 'early_upload': False}
         if not Intervals['qb']:
             Intervals['qb'] = bot_loop.create_task(_qb_listener())
@@ -12,12 +12,13 @@ from bot import bot_loop, bot_name, task_dict, task_dict_lock, Intervals, aria2,
 from bot.helper.common import TaskConfig
 from bot.helper.ext_utils.bot_utils import is_premium_user, UserDaily, default_button, sync_to_async
 from bot.helper.ext_utils.db_handler import DbManager
-from bot.helper.ext_utils.files_utils import get_path_size, clean_download, clean_target, join_files
+from bot.helper.ext_utils.files_utils import get_path_size, clean_download, clean_target, join_files, ZipVolumeStream
 from bot.helper.ext_utils.links_utils import is_magnet, is_url, get_link, is_media, is_gdrive_link, get_stream_link, is_gdrive_id
 from bot.helper.ext_utils.shortenurl import short_url
 from bot.helper.ext_utils.status_utils import action, get_date_time, get_readable_file_size, get_readable_time
-from bot.helper.ext_utils.task_manager import start_from_queued, check_running_tasks
+from bot.helper.ext_utils.task_manager import start_from_queued, check_running_tasks, get_upload_engine
 from bot.helper.ext_utils.telegraph_helper import TelePost
+from bot.helper.mirror_utils.gdrive_utlis.drive_index import drive_index
 from bot.helper.mirror_utils.gdrive_utlis.upload import gdUpload
 from bot.helper.mirror_utils.rclone_utils.transfer import RcloneTransferHelper
 from bot.helper.mirror_utils.status_utils.gdrive_status import GdriveStatus
@@ -57,6 +58,8 @@ class TaskListener(TaskConfig):
             await DbManager().add_incomplete_task(self.message.chat.id, self.message.link, self.tag)
 
     async def onDownloadComplete(self):
+        if self.earlyUpload:
+            await self.earlyUpload.stop()
         multi_links = False
         if self.sameDir and self.mid in self.sameDir['tasks']:
             while not (self.sameDir['total'] in [1, 0] or self.sameDir['total'] > 1 and len(self.sameDir['tasks']) > 1):
@@ -135,6 +138,9 @@ class TaskListener(TaskConfig):
                     return
                 self.seed = False
 
+            if self._canPipelineCompress(size):
+                await self._pipelineCompress(up_path, gid)
+                return
             up_path = await self.proceedCompress(up_path, size, gid)
             if not up_path:
                 return
@@ -161,19 +167,8 @@ class TaskListener(TaskConfig):
                 if not result:
                     return
 
-        add_to_queue, event = await check_running_tasks(self.mid, "up")
-        await start_from_queued()
-        if add_to_queue:
-            LOGGER.info('Added to Queue/Upload: %s', self.name)
-            async with task_dict_lock:
-                task_dict[self.mid] = QueueStatus(self, size, gid, 'Up')
-            await event.wait()
-            async with task_dict_lock:
-                if self.mid not in task_dict:
-                    return
-            LOGGER.info('Start from Queued/Upload: %s', self.name)
-        async with queue_dict_lock:
-            non_queued_up.add(self.mid)
+        if not await self._waitUploadQueue(size, gid):
+            return
 
         size = await get_path_size(up_dir)
 
@@ -189,13 +184,13 @@ class TaskListener(TaskConfig):
             for s in m_size:
                 size -= s
             LOGGER.info('Leech Name: %s', self.name)
-            tg = TgUploader(self, up_dir, size)
+            tg = self.earlyUpload and self.earlyUpload.uploader or TgUploader(self, up_dir, size)
             async with task_dict_lock:
                 task_dict[self.mid] = TelegramStatus(self, tg, size, gid, 'up')
             await gather(update_status_message(self.message.chat.id), tg.upload(o_files, m_size))
         elif is_gdrive_id(self.upDest):
             LOGGER.info('GDrive Uploading: %s', self.name)
-            drive = gdUpload(self, up_path)
+            drive = self.earlyUpload and self.earlyUpload.uploader or gdUpload(self, up_path)
             async with task_dict_lock:
                 task_dict[self.mid] = GdriveStatus(self, drive, size, gid, 'up')
             await gather(update_status_message(self.message.chat.id), sync_to_async(drive.upload, size))
@@ -206,9 +201,64 @@ class TaskListener(TaskConfig):
                 task_dict[self.mid] = RcloneStatus(self, RCTransfer, gid, 'up')
             await gather(update_status_message(self.message.chat.id), RCTransfer.upload(up_path, size))
 
+    async def _waitUploadQueue(self, size, gid):
+        add_to_queue, event = await check_running_tasks(self, 'up', get_upload_engine(self))
+        await start_from_queued()
+        if add_to_queue:
+            LOGGER.info('Added to Queue/Upload: %s', self.name)
+            async with task_dict_lock:
+                task_dict[self.mid] = QueueStatus(self, size, gid, 'Up')
+            await event.wait()
+            async with task_dict_lock:
+                if self.mid not in task_dict:
+                    return False
+            LOGGER.info('Start from Queued/Upload: %s', self.name)
+        async with queue_dict_lock:
+            non_queued_up.add(self.mid)
+        return True
+
+    def _canPipelineCompress(self, size):
+        """Only modes that turn the whole task into one volume set can be pipelined: zfolder leech and zfpart mirror to
+        Drive. zpart, zeach and auto archive every file on its own and put the volumes back beside the other files, so
+        nothing can be uploaded before the whole folder is done and they keep the 7z path."""
+        if not config_dict['ZIP_PIPELINE_VOLUMES'] or self.seed or isinstance(self.compress, str) or size <= self.splitSize:
+            return False
+        zipmode = self.user_dict.get('zipmode', 'zfolder')
+        if self.isLeech:
+            return zipmode == 'zfolder'
+        return zipmode == 'zfpart' and not self.isGofile and is_gdrive_id(self.upDest)
+
+    async def _pipelineCompress(self, dl_path, gid):
+        dl_path = await self.preName(dl_path)
+        await self.editMetadata(dl_path, gid)
+        size = await get_path_size(dl_path)
+        if self.isLeech:
+            self.name = f'{ospath.basename(dl_path)}.zip'
+            zip_path = f'{dl_path}.zip'
+        else:
+            self.newDir = f'{self.dir}10000'
+            self.name = ospath.basename(dl_path).rsplit('.', 1)[0] if await aiopath.isfile(dl_path) else ospath.basename(dl_path)
+            await makedirs(ospath.join(self.newDir, self.name), exist_ok=True)
+            zip_path = ospath.join(self.newDir, self.name, f'{ospath.basename(dl_path)}.zip')
+        if not await self._waitUploadQueue(size, gid):
+            return
+        LOGGER.info('Zip and upload: %s, volumes of %s bytes', dl_path, self.splitSize)
+        stream = ZipVolumeStream(zip_path, self.splitSize, config_dict['ZIP_PIPELINE_VOLUMES'])
+        if self.isLeech:
+            uploader = TgUploader(self, ospath.dirname(dl_path), size)
+            status, upload = TelegramStatus(self, uploader, size, gid, 'up'), uploader.upload_volumes(stream)
+        else:
+            uploader = gdUpload(self, ospath.dirname(zip_path))
+            status, upload = GdriveStatus(self, uploader, size, gid, 'up'), sync_to_async(uploader.upload_volumes, stream, size)
+        async with task_dict_lock:
+            task_dict[self.mid] = status
+        await gather(update_status_message(self.message.chat.id), sync_to_async(stream.build, dl_path, self.extensionFilter), upload)
+
     async def onUploadComplete(self, link, size, files, folders, mime_type, rclonePath='', dir_id=''):
         if self.isSuperChat and config_dict['INCOMPLETE_TASK_NOTIFIER'] and DATABASE_URL:
             await DbManager().rm_complete_task(self.message.link)
+        if dir_id and isinstance(self.upDest, str) and is_gdrive_id(self.upDest):
+            drive_index.add(self.upDest, dir_id, self.name, 'application/vnd.google-apps.folder' if mime_type == 'Folder' else mime_type)
 
         LOGGER.info('Task Done: %s', self.name)
         dt_date, dt_time = get_date_time(self.message)
@@ -435,6 +485,8 @@ class TaskListener(TaskConfig):
             bot_loop.create_task(auto_delete_message(self.message, uploadmsg, reply_to, stime=stime))
 
     async def onDownloadError(self, error, listfile=None):
+        if self.earlyUpload:
+            await self.earlyUpload.cancel()
         async with task_dict_lock:
             task_dict.pop(self.mid, None)
             count = len(task_dict)
@@ -508,6 +560,8 @@ class TaskListener(TaskConfig):
             bot_loop.create_task(auto_delete_message(self.message, reply_to, stime=stime))
 
     async def onUploadError(self, error):
+        if self.earlyUpload:
+            await self.earlyUpload.cancel()
         async with task_dict_lock:
             task_dict.pop(self.mid, None)
             count = len(task_dict)
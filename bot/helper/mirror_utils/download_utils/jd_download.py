@@ -183,7 +183,7 @@ async def add_jd_download(listener: task.TaskListener, path: str):
 
     await deleteMessage(listener.editable)
 
-    add_to_queue, event = await check_running_tasks(listener.mid)
+    add_to_queue, event = await check_running_tasks(listener, engine='jdownloader')
     if add_to_queue:
         LOGGER.info('Added to Queue/Download: %s', listener.name)
         async with task_dict_lock:
@@ -60,7 +60,7 @@ async def add_rclone_download(listener: task.TaskListener, path: str):
         await listener.onDownloadError(f'{msg}. File/folder size is {get_readable_file_size(size)}.')
         return
 
-    add_to_queue, event = await check_running_tasks(listener.mid)
+    add_to_queue, event = await check_running_tasks(listener, engine='rclone')
     if add_to_queue:
         LOGGER.info('Added to Queue/Download: %s', listener.name)
         async with task_dict_lock:
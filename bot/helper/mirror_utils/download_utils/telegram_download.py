@@ -1,23 +1,30 @@
 from __future__ import annotations
-from asyncio import Lock, gather
+from aiofiles.os import makedirs, rename as aiorename
+from asyncio import Lock, Semaphore, gather, sleep
 from logging import getLogger, ERROR
-from os import path as ospath
+from os import close as osclose, open as osopen, path as ospath, posix_fallocate, pwrite, O_WRONLY
 from pyrogram import Client
+from pyrogram.errors import FileReferenceExpired, FloodWait
+from pyrogram.file_id import FileId
 from time import time
 
-from bot import bot, task_dict, task_dict_lock, non_queued_dl, queue_dict_lock, LOGGER
+from bot import bot, bot_loop, config_dict, task_dict, task_dict_lock, non_queued_dl, queue_dict_lock, LOGGER
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.files_utils import clean_target
 from bot.helper.ext_utils.links_utils import is_media
 from bot.helper.ext_utils.status_utils import get_readable_file_size
 from bot.helper.ext_utils.task_manager import check_running_tasks, stop_duplicate_check, check_limits_size
 from bot.helper.listeners import tasks_listener as task
 from bot.helper.mirror_utils.status_utils.queue_status import QueueStatus
 from bot.helper.mirror_utils.status_utils.telegram_status import TelegramStatus
+from bot.helper.stream_utils.custom_dl import get_streamer
 from bot.helper.telegram_helper.message_utils import sendStatusMessage
 
 
 global_lock = Lock()
 GLOBAL_GID = set()
 getLogger('pyrogram').setLevel(ERROR)
+CHUNK_SIZE = 1024 * 1024
 
 
 class TelegramDownloadHelper:
@@ -29,6 +36,8 @@ class TelegramDownloadHelper:
         self._id = ''
         self._is_cancelled = False
         self._client: Client = bot
+        self._location = None
+        self._location_lock = Lock()
 
     @property
     def speed(self):
@@ -75,18 +84,109 @@ class TelegramDownloadHelper:
 
     async def _download(self, message, path):
         try:
-            download = await self._client.download_media(message, file_name=path, progress=self._onDownloadProgress)
+            media = is_media(message)
+            if config_dict['TG_DOWNLOAD_SESSIONS'] > 1 and media.file_size > 10 * CHUNK_SIZE:
+                download = await self._segmented_download(message, media, path)
+            else:
+                download = await self._client.download_media(message, file_name=path, progress=self._onDownloadProgress)
             if self._is_cancelled:
                 return
         except Exception as e:
             LOGGER.error(e)
-            self._onDownloadError(str(e))
+            await self._onDownloadError(str(e))
             return
         if download:
             await self._onDownloadComplete()
         elif not self._is_cancelled:
             await self._onDownloadError('Internal error occurred')
 
+    async def _segmented_download(self, message, media, path):
+        """Fetch the file in 1MB ranges, TG_DOWNLOAD_PARTS at a time over TG_DOWNLOAD_SESSIONS media sessions,
+        each range is written at its own offset and retried on its own. Falls back to `download_media` on failure."""
+        streamer = get_streamer(self._client)
+        try:
+            return await self._download_ranges(streamer, message, media, path)
+        finally:
+            if not streamer.kept:
+                await streamer.close()
+
+    async def _download_ranges(self, streamer, message, media, path):
+        file_id = FileId.decode(media.file_id)
+        sessions = await streamer.get_download_sessions(file_id, config_dict['TG_DOWNLOAD_SESSIONS'])
+        self._location = await streamer.get_location(file_id)
+        size, temp_path = media.file_size, f'{path}.temp'
+        await makedirs(ospath.dirname(path), exist_ok=True)
+        await sync_to_async(self._preallocate, temp_path, size)
+        in_flight = Semaphore(max(config_dict['TG_DOWNLOAD_PARTS'], 1))
+        tasks, error = [], None
+        try:
+            for index, offset in enumerate(range(0, size, CHUNK_SIZE)):
+                await in_flight.acquire()
+                if self._is_cancelled:
+                    break
+                if failed := next((task for task in tasks if task.done() and not task.cancelled() and task.exception()), None):
+                    raise failed.exception()
+                task = bot_loop.create_task(self._fetch_range(streamer, sessions[index % len(sessions)], message, temp_path, offset, min(CHUNK_SIZE, size - offset)))
+                task.add_done_callback(lambda _: in_flight.release())
+                tasks.append(task)
+            if not self._is_cancelled:
+                await gather(*tasks)
+        except Exception as e:
+            error = e
+        finally:
+            for task in tasks:
+                task.cancel()
+        if self._is_cancelled or error:
+            await clean_target(temp_path)
+        if self._is_cancelled:
+            return None
+        if error:
+            LOGGER.warning('Segmented download failed, retrying on one connection: %s', error)
+            self._processed_bytes = 0
+            return await self._client.download_media(message, file_name=path, progress=self._onDownloadProgress)
+        await aiorename(temp_path, path)
+        return path
+
+    async def _fetch_range(self, streamer, session, message, path, offset, length):
+        for attempt in range(1, 6):
+            location = self._location
+            try:
+                chunk = await streamer.get_chunk(session, location, offset, CHUNK_SIZE)
+                if len(chunk) < length:
+                    raise ValueError(f'Got {len(chunk)} of {length} bytes at offset {offset}')
+                await sync_to_async(self._write_range, path, offset, chunk[:length])
+                self._processed_bytes += length
+                return
+            except FloodWait as f:
+                await sleep(f.value)
+            except FileReferenceExpired:
+                async with self._location_lock:
+                    if self._location is location:
+                        message = await self._client.get_messages(message.chat.id, message.id)
+                        self._location = await streamer.get_location(FileId.decode(is_media(message).file_id))
+            except Exception as e:
+                if attempt == 5 or self._is_cancelled:
+                    raise
+                LOGGER.warning('Retrying range at offset %s: %s', offset, e)
+                await sleep(attempt)
+        raise Exception(f'Unable to download range at offset {offset}')
+
+    @staticmethod
+    def _preallocate(path, size):
+        with open(path, 'wb') as f:
+            try:
+                posix_fallocate(f.fileno(), 0, size)
+            except OSError:
+                f.truncate(size)
+
+    @staticmethod
+    def _write_range(path, offset, chunk):
+        fd = osopen(path, O_WRONLY)
+        try:
+            pwrite(fd, chunk, offset)
+        finally:
+            osclose(fd)
+
     async def add_download(self, message, path):
         if self._listener.session and self._listener.session != bot:
             self._client = self._listener.session
@@ -113,7 +213,7 @@ class TelegramDownloadHelper:
                     await self._onDownloadError(f'{msg}. File/folder size is {get_readable_file_size(size)}.')
                     return
 
-                add_to_queue, event = await check_running_tasks(self._listener.mid)
+                add_to_queue, event = await check_running_tasks(self._listener, engine='telegram')
                 if add_to_queue:
                     LOGGER.info('Added to Queue/Download: %s', self._listener.name)
                     async with task_dict_lock:
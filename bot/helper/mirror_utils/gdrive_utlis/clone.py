@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googleapiclient.errors import HttpError
 from logging import getLogger
 from os import path as ospath
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, RetryError
+from threading import Lock
 from time import time
 
+from bot import config_dict
 from bot.helper.ext_utils.bot_utils import async_to_sync
 from bot.helper.mirror_utils.gdrive_utlis.helper import GoogleDriveHelper
 
@@ -14,6 +17,7 @@ class gdClone(GoogleDriveHelper):
     def __init__(self, listener):
         self.listener = listener
         self._start_time = time()
+        self._count_lock = Lock()
         super().__init__()
         self.is_cloning = True
         self.user_setting()
@@ -80,23 +84,54 @@ class gdClone(GoogleDriveHelper):
             return None, None, None, None, None, None
 
     def _cloneFolder(self, folder_name, folder_id, dest_id):
-        LOGGER.info('Syncing: %s', folder_name)
-        files = self.getFilesByFolderId(folder_id)
-        if len(files) == 0:
-            return dest_id
-        for file in files:
-            if file.get('mimeType') == self.G_DRIVE_DIR_MIME_TYPE:
-                self.total_folders += 1
-                file_path = ospath.join(folder_name, file.get('name'))
-                current_dir_id = self.create_directory(file.get('name'), dest_id)
-                self._cloneFolder(file_path, file.get('id'), current_dir_id)
-            elif not file.get('name').lower().endswith(tuple(self.listener.extensionFilter)):
+        level = [(folder_name, folder_id, dest_id)]
+        copies = []
+        with ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS']) as list_pool, ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS']) as copy_pool:
+            try:
+                while level and not self.is_cancelled:
+                    listings = list(list_pool.map(self._list_folder, level))
+                    subfolders = []
+                    for (path, _, current_dest), files in zip(level, listings):
+                        for file in files:
+                            if file.get('mimeType') == self.G_DRIVE_DIR_MIME_TYPE:
+                                subfolders.append((ospath.join(path, file.get('name')), file.get('id'), file.get('name'), current_dest))
+                            elif not file.get('name').lower().endswith(tuple(self.listener.extensionFilter)):
+                                copies.append(copy_pool.submit(self._copy_worker, file.get('id'), current_dest, file.get('name'), int(file.get('size', 0))))
+                    if self.is_cancelled or not subfolders:
+                        break
+                    new_ids = self.create_directories([(name, parent) for _, _, name, parent in subfolders])
+                    self.total_folders += len(subfolders)
+                    level = [(path, src_id, new_id) for (path, src_id, _, _), new_id in zip(subfolders, new_ids)]
+                for future in as_completed(copies):
+                    future.result()
+            except:
+                self.is_cancelled = True
+                raise
+
+    def _list_folder(self, folder):
+        path, folder_id, _ = folder
+        LOGGER.info('Syncing: %s', path)
+        return self.getFilesByFolderId(folder_id, service=self.thread_service())
+
+    @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=retry_if_exception_type(Exception))
+    def _copy_worker(self, file_id, dest_id, name, size):
+        body = {'parents': [dest_id], 'name': name}
+        while not self.is_cancelled:
+            try:
+                self.thread_service().files().copy(fileId=file_id, body=body, supportsAllDrives=True, fields='id').execute()
+            except HttpError as err:
+                reason = self.get_error_reason(err)
+                if reason == 'cannotCopyFile':
+                    LOGGER.error(err)
+                    return
+                if reason in ['userRateLimitExceeded', 'dailyLimitExceeded'] and self.switch_thread_service_account():
+                    continue
+                raise err
+            with self._count_lock:
                 self.total_files += 1
-                self._copyFile(file.get('id'), dest_id, file.get('name'))
-                self.proc_bytes += int(file.get('size', 0))
+                self.proc_bytes += size
                 self.total_time = int(time() - self._start_time)
-            if self.is_cancelled:
-                break
+            return
 
     @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=retry_if_exception_type(Exception))
     def _copyFile(self, file_id, dest_id, name):
@@ -1,9 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
 from tenacity import RetryError
+from threading import Lock
+from time import time
 
+from bot import config_dict
 from bot.helper.mirror_utils.gdrive_utlis.helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
+COUNT_CACHE_TTL = 600
+COUNT_CACHE_LIMIT = 20000
+count_cache = {}
+count_cache_lock = Lock()
 
 
 class gdCount(GoogleDriveHelper):
@@ -57,20 +65,37 @@ class gdCount(GoogleDriveHelper):
         self.proc_bytes += size
 
     def _gDrive_directory(self, drive_folder):
-        files = self.getFilesByFolderId(drive_folder['id'])
-        if len(files) == 0:
-            return
-        for filee in files:
-            shortcut_details = filee.get('shortcutDetails')
-            if shortcut_details is not None:
-                mime_type = shortcut_details['targetMimeType']
-                file_id = shortcut_details['targetId']
-                filee = self.getFileMetadata(file_id)
-            else:
-                mime_type = filee.get('mimeType')
-            if mime_type == self.G_DRIVE_DIR_MIME_TYPE:
-                self.total_folders += 1
-                self._gDrive_directory(filee)
-            else:
-                self.total_files += 1
-                self._gDrive_file(filee)
+        level = [drive_folder]
+        with ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS']) as pool:
+            while level:
+                next_level = []
+                for files in pool.map(self._list_folder, level):
+                    for filee in files:
+                        if filee.get('mimeType') == self.G_DRIVE_DIR_MIME_TYPE:
+                            self.total_folders += 1
+                            next_level.append(filee)
+                        else:
+                            self.total_files += 1
+                            self._gDrive_file(filee)
+                level = next_level
+
+    def _list_folder(self, drive_folder):
+        key = (drive_folder['id'], drive_folder.get('modifiedTime'))
+        with count_cache_lock:
+            if (cached := count_cache.get(key)) and cached[0] > time():
+                return cached[1]
+        service = self.thread_service()
+        files = self.getFilesByFolderId(drive_folder['id'], service=service)
+        if shortcuts := [filee['shortcutDetails']['targetId'] for filee in files if filee.get('shortcutDetails')]:
+            targets = self.get_files_metadata(shortcuts, service)
+            files = [targets[filee['shortcutDetails']['targetId']] if filee.get('shortcutDetails') else filee for filee in files]
+        files = [{field: filee[field] for field in ('id', 'mimeType', 'size', 'modifiedTime') if field in filee} for filee in files]
+        with count_cache_lock:
+            now = time()
+            if len(count_cache) >= COUNT_CACHE_LIMIT:
+                for old_key in [k for k, v in count_cache.items() if v[0] <= now]:
+                    del count_cache[old_key]
+                while len(count_cache) >= COUNT_CACHE_LIMIT:
+                    del count_cache[next(iter(count_cache))]
+            count_cache[key] = (now + COUNT_CACHE_TTL, files)
+        return files
@@ -1,14 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
 from io import FileIO
 from logging import getLogger
-from os import makedirs, path as ospath
+from math import ceil
+from os import makedirs, path as ospath, open as osopen, close as osclose, pwrite, O_WRONLY
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, RetryError
+from threading import Lock
+from time import sleep
 
+from bot import config_dict
 from bot.helper.ext_utils.bot_utils import async_to_sync, setInterval
 from bot.helper.mirror_utils.gdrive_utlis.helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
+SEGMENT_THRESHOLD = 64 * 1024 * 1024
+SEGMENT_CHUNK = 16 * 1024 * 1024
 
 
 class gdDownload(GoogleDriveHelper):
@@ -17,6 +24,10 @@ class gdDownload(GoogleDriveHelper):
         self.listener = listener
         self._updater = None
         self._path = path
+        self._progress_lock = Lock()
+        self._inflight = {}
+        self._done_bytes = 0
+        self._segment_pool = ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS'])
         super().__init__()
         self.is_downloading = True
 
@@ -35,7 +46,7 @@ class gdDownload(GoogleDriveHelper):
                 self._download_folder(file_id, self._path, self.listener.name)
             else:
                 makedirs(self._path, exist_ok=True)
-                self._download_file(file_id, self._path, self.listener.name, meta.get('mimeType'))
+                self._download_file(file_id, self._path, self.listener.name, meta.get('mimeType'), int(meta.get('size', 0)))
         except Exception as err:
             if isinstance(err, RetryError):
                 LOGGER.info('Total Attempts: %s', err.last_attempt.attempt_number)
@@ -55,38 +66,45 @@ class gdDownload(GoogleDriveHelper):
             self.is_cancelled = True
         finally:
             self._updater.cancel()
+            self._segment_pool.shutdown(wait=False)
             if self.is_cancelled:
                 return
             async_to_sync(self.listener.onDownloadComplete)
 
+    async def progress(self):
+        with self._progress_lock:
+            self.proc_bytes = self._done_bytes + sum(self._inflight.values())
+        self.total_time += self.update_interval
+
     def _download_folder(self, folder_id, path, folder_name):
-        folder_name = folder_name.replace('/', '')
-        dir_path = ospath.join(path, folder_name)
-        makedirs(dir_path, exist_ok=True)
-        path += f'/{folder_name}'
-        result = self.getFilesByFolderId(folder_id)
-        if len(result) == 0:
-            return
-        result = sorted(result, key=lambda k: k['name'])
-        for item in result:
-            file_id = item['id']
-            filename = item['name']
-            shortcut_details = item.get('shortcutDetails')
-            if shortcut_details is not None:
-                file_id = shortcut_details['targetId']
-                mime_type = shortcut_details['targetMimeType']
-            else:
-                mime_type = item.get('mimeType')
-            if mime_type == self.G_DRIVE_DIR_MIME_TYPE:
-                self._download_folder(file_id, path, filename)
-            elif not ospath.isfile(f'{path}{filename}') and not filename.lower().endswith(tuple(self.listener.extensionFilter)):
-                self._download_file(file_id, path, filename, mime_type)
-            if self.is_cancelled:
-                break
+        level, downloads = [(folder_id, path, folder_name)], []
+        with ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS']) as pool:
+            try:
+                while level and not self.is_cancelled:
+                    subfolders = []
+                    for current_id, current_path, current_name in level:
+                        current_path = ospath.join(current_path, current_name.replace('/', ''))
+                        makedirs(current_path, exist_ok=True)
+                        for item in sorted(self.getFilesByFolderId(current_id), key=lambda k: k['name']):
+                            file_id, filename = item['id'], item['name']
+                            if (shortcut_details := item.get('shortcutDetails')) is not None:
+                                file_id = shortcut_details['targetId']
+                                mime_type = shortcut_details['targetMimeType']
+                            else:
+                                mime_type = item.get('mimeType')
+                            if mime_type == self.G_DRIVE_DIR_MIME_TYPE:
+                                subfolders.append((file_id, current_path, filename))
+                            elif not ospath.isfile(ospath.join(current_path, filename)) and not filename.lower().endswith(tuple(self.listener.extensionFilter)):
+                                size = int(item['size']) if 'size' in item else None
+                                downloads.append(pool.submit(self._download_file, file_id, current_path, filename, mime_type, size))
+                    level = subfolders
+                for future in as_completed(downloads):
+                    future.result()
+            except:
+                self.is_cancelled = True
+                raise
 
-    @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=(retry_if_exception_type(Exception)))
-    def _download_file(self, file_id, path, filename, mime_type):
-        request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+    def _download_file(self, file_id, path, filename, mime_type, size=None):
         filename = filename.replace('/', '')
         if len(filename.encode()) > 255:
             ext = ospath.splitext(filename)[1]
@@ -95,37 +113,95 @@ class gdDownload(GoogleDriveHelper):
                 self.listener.name = filename
         if self.is_cancelled:
             return
-        fh = FileIO(f'{path}/{filename}', 'wb')
+        if size is None:
+            size = int(self.getFileMetadata(file_id, service=self.thread_service()).get('size', 0))
+        file_path = f'{path}/{filename}'
+        if size >= SEGMENT_THRESHOLD and config_dict['GD_WORKERS'] > 1:
+            self._download_segments(file_id, file_path, size)
+        else:
+            self._download_stream(file_id, file_path)
+        if not self.is_cancelled:
+            with self._progress_lock:
+                self._done_bytes += size
+
+    @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=(retry_if_exception_type(Exception)))
+    def _download_stream(self, file_id, file_path):
+        request = self.thread_service().files().get_media(fileId=file_id, supportsAllDrives=True)
+        fh = FileIO(file_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request, chunksize=100 * 1024 * 1024)
         done = False
         retries = 0
-        while not done:
-            if self.is_cancelled:
-                fh.close()
-                break
+        try:
+            while not done and not self.is_cancelled:
+                try:
+                    status, done = downloader.next_chunk()
+                    with self._progress_lock:
+                        self._inflight[file_path] = status.resumable_progress
+                except HttpError as err:
+                    if err.resp.status in [500, 502, 503, 504, 429] and retries < 10:
+                        retries += 1
+                        continue
+                    if (reason := self.get_error_reason(err)) in ['downloadQuotaExceeded', 'dailyLimitExceeded'] and self.switch_thread_service_account():
+                        LOGGER.info('Got: %s, Trying Again...', reason)
+                        request = self.thread_service().files().get_media(fileId=file_id, supportsAllDrives=True)
+                        fh.seek(0)
+                        fh.truncate()
+                        downloader = MediaIoBaseDownload(fh, request, chunksize=100 * 1024 * 1024)
+                        continue
+                    raise err
+        finally:
+            fh.close()
+            with self._progress_lock:
+                self._inflight.pop(file_path, None)
+
+    def _download_segments(self, file_id, file_path, size):
+        with open(file_path, 'wb') as f:
+            f.truncate(size)
+        segment_size = max(ceil(size / config_dict['GD_WORKERS']), SEGMENT_CHUNK)
+        fd = osopen(file_path, O_WRONLY)
+        try:
+            segments = [self._segment_pool.submit(self._download_segment, file_id, fd, (file_path, start), start, min(start + segment_size, size) - 1)
+                        for start in range(0, size, segment_size)]
             try:
-                self.status, done = downloader.next_chunk()
+                for future in as_completed(segments):
+                    future.result()
+            except:
+                self.is_cancelled = True
+                raise
+        finally:
+            for start in range(0, size, segment_size):
+                with self._progress_lock:
+                    self._inflight.pop((file_path, start), None)
+            osclose(fd)
+
+    def _download_segment(self, file_id, fd, key, start, end):
+        offset = start
+        retries = 0
+        while offset <= end and not self.is_cancelled:
+            chunk_end = min(offset + SEGMENT_CHUNK, end + 1) - 1
+            request = self.thread_service().files().get_media(fileId=file_id, supportsAllDrives=True)
+            headers = dict(request.headers)
+            headers['range'] = f'bytes={offset}-{chunk_end}'
+            try:
+                resp, content = request.http.request(request.uri, method='GET', headers=headers)
+                if resp.status != 206 or len(content) != chunk_end - offset + 1:
+                    raise HttpError(resp, content, uri=request.uri)
             except HttpError as err:
                 if err.resp.status in [500, 502, 503, 504, 429] and retries < 10:
                     retries += 1
+                    sleep(min(2 ** retries, 30))
                     continue
-                if err.resp.get('content-type', '').startswith('application/json'):
-                    reason = eval(err.content).get('error').get('errors')[0].get('reason')
-                    if reason not in ('downloadQuotaExceeded', 'dailyLimitExceeded'):
-                        raise err
-                    if self.use_sa:
-                        if self.sa_count >= self.sa_number:
-                            LOGGER.info('Reached maximum number of service accounts switching, which is %s', self.sa_count)
-                            raise err
-
-                        if self.is_cancelled:
-                            return
-
-                        self.switchServiceAccount()
-                        LOGGER.info('Got: %s, Trying Again...', reason)
-                        return self._download_file(file_id, path, filename, mime_type)
-
-                    LOGGER.error('Got: %s', reason)
-                    raise err
-
-        self.file_processed_bytes = 0
+                if (reason := self.get_error_reason(err)) in ['downloadQuotaExceeded', 'dailyLimitExceeded'] and self.switch_thread_service_account():
+                    LOGGER.info('Got: %s, Trying Again...', reason)
+                    continue
+                raise err
+            except Exception:
+                if retries < 10:
+                    retries += 1
+                    sleep(min(2 ** retries, 30))
+                    continue
+                raise
+            pwrite(fd, content, offset)
+            offset += len(content)
+            with self._progress_lock:
+                self._inflight[key] = offset - start
@@ -0,0 +1,197 @@
+from logging import getLogger
+from os import makedirs, path as ospath, remove, replace
+from pickle import dump as pdump, load as pload
+from threading import Lock
+from time import time
+
+from bot import config_dict
+from bot.helper.ext_utils.bot_utils import THREADPOOL
+from bot.helper.mirror_utils.gdrive_utlis.helper import GoogleDriveHelper
+
+LOGGER = getLogger(__name__)
+INDEX_DIR = 'drive_index'
+
+
+class DriveNameIndex(GoogleDriveHelper):
+    """Names of the files and folders under one destination, kept fresh from the Drive changes feed.
+    A shared drive id covers the whole drive, a folder id only covers its direct children."""
+
+    def __init__(self, dir_id, use_sa, token_path):
+        super().__init__()
+        self.dir_id = dir_id
+        self.use_sa = use_sa
+        self.token_path = token_path
+        self.recursive = len(dir_id) == 19
+        self.ready = False
+        self._lock = Lock()
+        self._files = {}
+        self._names = {}
+        self._drive_id = None
+        self._page_token = None
+        self._synced = 0
+
+    @property
+    def _file_path(self):
+        return ospath.join(INDEX_DIR, f'{self.dir_id}.pkl')
+
+    def _put(self, file):
+        self._drop(file['id'])
+        self._files[file['id']] = {'id': file['id'], 'name': file['name'], 'mimeType': file.get('mimeType'), 'size': file.get('size')}
+        self._names.setdefault(file['name'], set()).add(file['id'])
+
+    def _drop(self, file_id):
+        if (old := self._files.pop(file_id, None)) and (ids := self._names.get(old['name'])):
+            ids.discard(file_id)
+            if not ids:
+                del self._names[old['name']]
+
+    def _in_scope(self, file):
+        return self.recursive or self.dir_id in file.get('parents', [])
+
+    def load(self):
+        if not ospath.exists(self._file_path):
+            return False
+        try:
+            with open(self._file_path, 'rb') as f:
+                data = pload(f)
+            self._drive_id, self._page_token = data['drive_id'], data['page_token']
+            for file in data['files']:
+                self._put(file)
+            self.ready = True
+            return True
+        except Exception as e:
+            LOGGER.error('Failed to load drive index for %s: %s', self.dir_id, e)
+            return False
+
+    def discard(self):
+        try:
+            remove(self._file_path)
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        makedirs(INDEX_DIR, exist_ok=True)
+        with open(f'{self._file_path}.tmp', 'wb') as f:
+            pdump({'drive_id': self._drive_id, 'page_token': self._page_token, 'files': list(self._files.values())}, f)
+        replace(f'{self._file_path}.tmp', self._file_path)
+
+    def seed(self):
+        service = self.authorize()
+        if self.recursive:
+            self._drive_id = self.dir_id
+            kwargs = {'corpora': 'drive', 'driveId': self.dir_id, 'q': 'trashed = false'}
+        else:
+            self._drive_id = service.files().get(fileId=self.dir_id, supportsAllDrives=True, fields='driveId').execute().get('driveId')
+            kwargs = {'q': f"'{self.dir_id}' in parents and trashed = false"}
+        token_kwargs = {'driveId': self._drive_id} if self._drive_id else {}
+        page_token = service.changes().getStartPageToken(supportsAllDrives=True, **token_kwargs).execute()['startPageToken']
+        files, list_token = [], None
+        while True:
+            response = service.files().list(supportsAllDrives=True, includeItemsFromAllDrives=True, spaces='drive', pageSize=1000,
+                                            fields='nextPageToken, files(id, name, mimeType, size)', pageToken=list_token, **kwargs).execute()
+            files.extend(response.get('files', []))
+            if (list_token := response.get('nextPageToken')) is None:
+                break
+        with self._lock:
+            self._files.clear()
+            self._names.clear()
+            for file in files:
+                self._put(file)
+            self._page_token = page_token
+            self._synced = time()
+            self.ready = True
+            self.save()
+        LOGGER.info('Drive index seeded for %s with %s items', self.dir_id, len(files))
+
+    def sync(self):
+        service = self.authorize()
+        token_kwargs = {'driveId': self._drive_id, 'includeItemsFromAllDrives': True} if self._drive_id else {}
+        page_token, changed = self._page_token, False
+        while page_token:
+            response = service.changes().list(pageToken=page_token, supportsAllDrives=True, spaces='drive', pageSize=1000,
+                                              fields='nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, size, trashed, parents))',
+                                              **token_kwargs).execute()
+            with self._lock:
+                for change in response.get('changes', []):
+                    file = change.get('file')
+                    if change.get('removed') or not file or file.get('trashed') or not self._in_scope(file):
+                        if change['fileId'] in self._files:
+                            self._drop(change['fileId'])
+                            changed = True
+                    else:
+                        self._put(file)
+                        changed = True
+            if new_token := response.get('newStartPageToken'):
+                page_token = new_token
+                break
+            page_token = response.get('nextPageToken')
+        with self._lock:
+            self._page_token = page_token
+            self._synced = time()
+            if changed:
+                self.save()
+
+    def add(self, file_id, name, mime_type):
+        with self._lock:
+            self._put({'id': file_id, 'name': name, 'mimeType': mime_type})
+
+    def find(self, name):
+        if time() - self._synced > config_dict['STOP_DUPLICATE_INDEX_SYNC']:
+            self.sync()
+        with self._lock:
+            return [self._files[file_id] for file_id in self._names.get(name, ())]
+
+
+class DriveIndexManager:
+    def __init__(self):
+        self._lock = Lock()
+        self._indexes = {}
+
+    def get(self, dir_id, use_sa, token_path):
+        with self._lock:
+            if (index := self._indexes.get(dir_id)) is None:
+                index = self._indexes[dir_id] = DriveNameIndex(dir_id, use_sa, token_path)
+                if index.load():
+                    LOGGER.info('Drive index loaded for %s', dir_id)
+                else:
+                    THREADPOOL.submit(self._seed, index)
+            return index
+
+    def _seed(self, index):
+        try:
+            index.seed()
+        except Exception as e:
+            LOGGER.error('Failed to seed drive index for %s: %s', index.dir_id, e)
+            with self._lock:
+                self._indexes.pop(index.dir_id, None)
+
+    def lookup(self, search, name, target_id, user_id, noMulti=False):
+        """Return True when a name exists in any checked drive, False when none has it
+        and None when a drive is not indexed yet and the live query has to be used."""
+        for _, dir_id, _ in search.get_drives(target_id, user_id):
+            if not dir_id:
+                continue
+            if len(dir_id) not in (19, 33):
+                return None
+            index = self.get(dir_id, search.use_sa, search.token_path)
+            if not index.ready:
+                return None
+            try:
+                if index.find(name):
+                    return True
+            except Exception as e:
+                LOGGER.error('Drive index sync failed for %s: %s', dir_id, e)
+                with self._lock:
+                    self._indexes.pop(dir_id, None)
+                index.discard()
+                return None
+            if noMulti:
+                break
+        return False
+
+    def add(self, dir_id, file_id, name, mime_type):
+        if index := self._indexes.get(dir_id.split(':', 1)[-1]):
+            index.add(file_id, name, mime_type)
+
+
+drive_index = DriveIndexManager()
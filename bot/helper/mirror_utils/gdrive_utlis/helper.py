@@ -1,17 +1,102 @@
 from __future__ import annotations
+from json import loads
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from os import path as ospath, listdir
 from pickle import load as pload
 from random import randrange
 from re import search as re_search
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+from threading import Lock, local
 from urllib.parse import parse_qs, urlparse
 
 from bot import config_dict, user_data, LOGGER
 from bot.helper.ext_utils.links_utils import is_gdrive_id
 
 
+class DriveServicePool:
+    """Process-wide cache of Drive credentials, the discovery document and per-thread service objects.
+    Credentials are keyed by file path and modification time, so a replaced token or
+    service account file is picked up on next use. Expired tokens are refreshed lazily
+    by the authorized http of each service. The document is parsed once and every service
+    is built from it, so a service costs no more than its own http. That http is not thread
+    safe, so a per-thread service from `get` must never leave the thread that asked for it."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._local = local()
+        self._credentials = {}
+        self._sa_files = []
+        self._sa_mtime = None
+        self._sa_cursor = None
+        self._document = None
+
+    def service_accounts(self):
+        with self._lock:
+            try:
+                mtime = ospath.getmtime('accounts')
+            except OSError:
+                return []
+            if mtime != self._sa_mtime:
+                self._sa_files = sorted(listdir('accounts'))
+                self._sa_mtime = mtime
+            return self._sa_files
+
+    def next_sa_index(self, sa_number):
+        with self._lock:
+            if self._sa_cursor is None:
+                self._sa_cursor = randrange(sa_number)
+            index = self._sa_cursor % sa_number
+            self._sa_cursor += 1
+            return index
+
+    def _get_credentials(self, key, scopes):
+        with self._lock:
+            if (credentials := self._credentials.get(key)) is None:
+                path = key[0]
+                if path.startswith('accounts/'):
+                    credentials = service_account.Credentials.from_service_account_file(path, scopes=scopes)
+                else:
+                    with open(path, 'rb') as f:
+                        credentials = pload(f)
+                for old_key in [k for k in self._credentials if k[0] == path]:
+                    del self._credentials[old_key]
+                self._credentials[key] = credentials
+            return credentials
+
+    def _build(self, key, scopes):
+        credentials = self._get_credentials(key, scopes)
+        with self._lock:
+            if self._document is None:
+                document = loads(get_static_doc('drive', 'v3'))
+                self._prime(build_from_document(document, credentials=credentials), document)
+                self._document = document
+        return build_from_document(self._document, credentials=credentials)
+
+    def _prime(self, resource, desc):
+        """Create every sub-resource once, the client library fills in method parameters on the
+        document the first time, which must not happen while other threads read it."""
+        for name, sub_desc in desc.get('resources', {}).items():
+            self._prime(getattr(resource, name)(), sub_desc)
+
+    def build(self, path, scopes):
+        """A new service on the cached credentials, owned by the caller."""
+        return self._build((path, ospath.getmtime(path)), scopes)
+
+    def get(self, path, scopes):
+        key = (path, ospath.getmtime(path))
+        services = self._local.__dict__.setdefault('services', {})
+        if (service := services.get(key)) is None:
+            for old_key in [k for k in services if k[0] == path]:
+                del services[old_key]
+            service = services[key] = self._build(key, scopes)
+        return service
+
+
+drive_pool = DriveServicePool()
+
+
 class GoogleDriveHelper:
 
     def __init__(self):
@@ -37,6 +122,7 @@ class GoogleDriveHelper:
         self.status = None
         self.update_interval = 3
         self.use_sa = config_dict['USE_SERVICE_ACCOUNTS']
+        self._thread_state = local()
 
     @property
     def speed(self):
@@ -57,20 +143,50 @@ class GoogleDriveHelper:
             self.total_time += self.update_interval
 
     def authorize(self):
-        credentials = None
         if self.use_sa:
-            json_files = listdir('accounts')
+            json_files = drive_pool.service_accounts()
             self.sa_number = len(json_files)
-            self.sa_index = randrange(self.sa_number)
+            if self.sa_count == 1:
+                self.sa_index = drive_pool.next_sa_index(self.sa_number)
             LOGGER.info('Authorizing with %s service account', json_files[self.sa_index])
-            credentials = service_account.Credentials.from_service_account_file(f'accounts/{json_files[self.sa_index]}', scopes=self._OAUTH_SCOPE)
-        elif ospath.exists(self.token_path):
+            return drive_pool.build(f'accounts/{json_files[self.sa_index]}', self._OAUTH_SCOPE)
+        if ospath.exists(self.token_path):
             LOGGER.info('Authorize with %s', self.token_path)
-            with open(self.token_path, 'rb') as f:
-                credentials = pload(f)
-        else:
-            LOGGER.error('Token.pickle not found!')
-        return build('drive', 'v3', credentials=credentials, cache_discovery=False)
+            return drive_pool.build(self.token_path, self._OAUTH_SCOPE)
+        LOGGER.error('Token.pickle not found!')
+        return build('drive', 'v3', credentials=None, cache_discovery=False)
+
+    def thread_service(self):
+        state = self._thread_state.__dict__
+        if 'service' not in state:
+            state['sa_count'] = 1
+            if self.use_sa:
+                json_files = drive_pool.service_accounts()
+                self.sa_number = len(json_files)
+                state['sa_index'] = drive_pool.next_sa_index(self.sa_number)
+                state['service'] = drive_pool.get(f'accounts/{json_files[state["sa_index"]]}', self._OAUTH_SCOPE)
+            else:
+                state['service'] = self.authorize()
+        return state['service']
+
+    def switch_thread_service_account(self):
+        state = self._thread_state.__dict__
+        if not self.use_sa or state.get('sa_count', 1) >= self.sa_number:
+            LOGGER.info('Reached maximum number of service accounts switching, which is %s', state.get('sa_count', 1))
+            return False
+        json_files = drive_pool.service_accounts()
+        state['sa_index'] = (state['sa_index'] + 1) % len(json_files)
+        state['sa_count'] += 1
+        LOGGER.info('Worker switching to %s index', state['sa_index'])
+        state['service'] = drive_pool.get(f'accounts/{json_files[state["sa_index"]]}', self._OAUTH_SCOPE)
+        return True
+
+    @staticmethod
+    def get_error_reason(err):
+        try:
+            return loads(err.content).get('error').get('errors')[0].get('reason')
+        except:
+            return ''
 
     def switchServiceAccount(self):
         if self.sa_index == self.sa_number - 1:
@@ -108,19 +224,20 @@ class GoogleDriveHelper:
         return parse_qs(parsed.query)['id'][0]
 
     @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=retry_if_exception_type(Exception))
-    def set_permission(self, file_id):
+    def set_permission(self, file_id, service=None):
         permissions = {'role': 'reader',
                        'type': 'anyone',
                        'value': None,
                        'withLink': True}
-        return self.service.permissions().create(fileId=file_id, body=permissions, supportsAllDrives=True).execute()
+        return (service or self.service).permissions().create(fileId=file_id, body=permissions, supportsAllDrives=True).execute()
 
     @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=retry_if_exception_type(Exception))
-    def getFileMetadata(self, file_id):
-        return self.service.files().get(fileId=file_id, supportsAllDrives=True, fields='name, id, mimeType, size').execute()
+    def getFileMetadata(self, file_id, service=None):
+        return (service or self.service).files().get(fileId=file_id, supportsAllDrives=True, fields='name, id, mimeType, size, modifiedTime').execute()
 
     @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=retry_if_exception_type(Exception))
-    def getFilesByFolderId(self, folder_id, item_type=''):
+    def getFilesByFolderId(self, folder_id, item_type='', service=None):
+        service = service or self.service
         page_token = None
         files = []
         if not item_type:
@@ -130,9 +247,9 @@ class GoogleDriveHelper:
         else:
             q = f"'{folder_id}' in parents and mimeType != '{self.G_DRIVE_DIR_MIME_TYPE}' and trashed = false"
         while True:
-            response = self.service.files().list(supportsAllDrives=True, includeItemsFromAllDrives=True,
+            response = service.files().list(supportsAllDrives=True, includeItemsFromAllDrives=True,
                                                  q=q, spaces='drive', pageSize=200,
-                                                 fields='nextPageToken, files(id, name, mimeType, size, shortcutDetails)',
+                                                 fields='nextPageToken, files(id, name, mimeType, size, modifiedTime, shortcutDetails)',
                                                  orderBy='folder, name', pageToken=page_token).execute()
             files.extend(response.get('files', []))
             page_token = response.get('nextPageToken')
@@ -154,6 +271,58 @@ class GoogleDriveHelper:
         LOGGER.info('Created G-Drive Folder:\nName: %s\nID: %s', file.get('name'), file_id)
         return file_id
 
+    def get_files_metadata(self, file_ids, service=None):
+        """Fetch metadata of many files with batched requests, returns a dict keyed by id."""
+        service = service or self.service
+        result = {}
+
+        def _on_get(request_id, response, exception):
+            if exception is None:
+                result[request_id] = response
+
+        file_ids = list(dict.fromkeys(file_ids))
+        for start in range(0, len(file_ids), 100):
+            batch = service.new_batch_http_request(callback=_on_get)
+            for file_id in file_ids[start:start + 100]:
+                batch.add(service.files().get(fileId=file_id, supportsAllDrives=True, fields='name, id, mimeType, size, modifiedTime'), request_id=file_id)
+            batch.execute()
+        for file_id in file_ids:
+            if file_id not in result:
+                result[file_id] = service.files().get(fileId=file_id, supportsAllDrives=True, fields='name, id, mimeType, size, modifiedTime').execute()
+        return result
+
+    def create_directories(self, folders):
+        """Create (name, parent_id) folders with batched requests, returns their ids in order."""
+        ids = [None] * len(folders)
+
+        def _on_create(request_id, response, exception):
+            if exception is None:
+                ids[int(request_id)] = response['id']
+
+        for start in range(0, len(folders), 100):
+            batch = self.service.new_batch_http_request(callback=_on_create)
+            for index, (name, dest_id) in enumerate(folders[start:start + 100], start=start):
+                file_metadata = {'name': name,
+                                 'description': config_dict['GD_INFO'],
+                                 'mimeType': self.G_DRIVE_DIR_MIME_TYPE,
+                                 'parents': [dest_id]}
+                batch.add(self.service.files().create(body=file_metadata, supportsAllDrives=True, fields='id'), request_id=str(index))
+            batch.execute()
+        if not config_dict['IS_TEAM_DRIVE']:
+            created, failed = [file_id for file_id in ids if file_id], []
+            for start in range(0, len(created), 100):
+                batch = self.service.new_batch_http_request(callback=lambda request_id, _, exception: exception and failed.append(request_id))
+                for file_id in created[start:start + 100]:
+                    batch.add(self.service.permissions().create(fileId=file_id, body={'role': 'reader', 'type': 'anyone', 'value': None, 'withLink': True},
+                                                                supportsAllDrives=True), request_id=file_id)
+                batch.execute()
+            for file_id in failed:
+                self.set_permission(file_id)
+        for index, file_id in enumerate(ids):
+            if file_id is None:
+                ids[index] = self.create_directory(*folders[index])
+        return ids
+
     @staticmethod
     def escapes(estr):
         chars = ['\\', ''', ''', r'\a', r'\b', r'\f', r'\n', r'\r', r'\t']
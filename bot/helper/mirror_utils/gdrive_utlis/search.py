@@ -69,7 +69,7 @@ class gdSearch(GoogleDriveHelper):
             LOGGER.error(err)
             return {'files': []}
 
-    def drive_list(self, fileName, target_id='', user_id='', style='html'):
+    def get_drives(self, target_id, user_id):
         user_dict: dict = user_data.get(user_id, {})
         use_sa = user_dict.get('use_sa')
         if target_id.startswith('mtp:') or target_id == user_dict.get('gdrive_id') and not use_sa:
@@ -83,12 +83,16 @@ class gdSearch(GoogleDriveHelper):
                 drives = [('From Owner', target_id, INDEX_URLS[0] if INDEX_URLS else '')]
         else:
             drives = zip(DRIVES_NAMES, DRIVES_IDS, INDEX_URLS)
+        if not target_id.startswith('mtp:') and len(DRIVES_IDS) > 1 and not use_sa or target_id.startswith('tp:'):
+            self.use_sa = False
+        return list(drives)
+
+    def drive_list(self, fileName, target_id='', user_id='', style='html'):
+        drives = self.get_drives(target_id, user_id)
         msg = ''
         fileName = self.escapes(str(fileName))
         index, contents_count, contents_data = 1, 0, []
         Title = False
-        if not target_id.startswith('mtp:') and len(DRIVES_IDS) > 1 and not use_sa or target_id.startswith('tp:'):
-            self.use_sa = False
         self.service = self.authorize()
         for drive_name, dir_id, index_url in drives:
             isRecur = False if self._isRecursive and len(dir_id) > 23 else self._isRecursive
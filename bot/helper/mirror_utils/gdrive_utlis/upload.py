@@ -1,8 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from logging import getLogger
 from os import path as ospath, listdir
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, RetryError
+from threading import Lock
 
 from bot import config_dict
 from bot.helper.ext_utils.bot_utils import async_to_sync, setInterval
@@ -10,6 +12,7 @@ from bot.helper.ext_utils.files_utils import get_mime_type, clean_target
 from bot.helper.mirror_utils.gdrive_utlis.helper import GoogleDriveHelper
 
 LOGGER = getLogger(__name__)
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
 
 
 class gdUpload(GoogleDriveHelper):
@@ -19,6 +22,13 @@ class gdUpload(GoogleDriveHelper):
         self._updater = None
         self._path = path
         self._is_errored = False
+        self._folder_mode = False
+        self._progress_lock = Lock()
+        self._inflight = {}
+        self._done_bytes = 0
+        self._root_id = None
+        self._dir_ids = {}
+        self._streamed = set()
         super().__init__()
         self.is_uploading = True
 
@@ -35,14 +45,84 @@ class gdUpload(GoogleDriveHelper):
             self.listener.upDest = self.listener.upDest.replace('sa:', '', 1)
             self.use_sa = True
 
-    def upload(self, size):
+    def upload_file(self, file_path, rel_dir, orig_path):
+        """Upload a finished file of a download that is still running into its folder under the task folder,
+        `orig_path` is skipped by the final upload."""
+        if self._root_id is None:
+            self.user_setting()
+            self.service = self.authorize()
+            self._root_id = self.create_directory(ospath.basename(ospath.abspath(self.listener.name)), self.listener.upDest)
+            self._dir_ids[''] = self._root_id
+        self._folder_mode = True
+        self._streamed.add(orig_path)
+        parent_id, current = self._root_id, ''
+        for part in [] if rel_dir in ('', '.') else rel_dir.split(ospath.sep):
+            current = ospath.join(current, part)
+            if (dir_id := self._dir_ids.get(current)) is None:
+                dir_id = self._dir_ids[current] = self.create_directory(part, parent_id)
+                self.total_folders += 1
+            parent_id = dir_id
+        try:
+            self._upload_worker(file_path, ospath.basename(file_path), parent_id)
+        except Exception as err:
+            if isinstance(err, RetryError):
+                err = err.last_attempt.exception()
+            LOGGER.error('%s. Path: %s', err, file_path)
+            self._streamed.discard(orig_path)
+
+    def cancel_streamed(self):
+        if self._root_id:
+            LOGGER.info('Deleting uploaded data from Drive...')
+            self.thread_service().files().delete(fileId=self._root_id, supportsAllDrives=True).execute()
+
+    def upload_volumes(self, stream, size):
+        """Upload the volumes of a ZipVolumeStream into the task folder as soon as each one is closed."""
         self.user_setting()
+        self._folder_mode = True
+        self._updater = setInterval(self.update_interval, self.progress)
         try:
             self.service = self.authorize()
-        except Exception as e:
-            LOGGER.error(e)
-            async_to_sync(self.listener.onUploadError, e)
+            self._root_id = self.create_directory(ospath.basename(ospath.abspath(self.listener.name)), self.listener.upDest)
+            while volume := async_to_sync(stream.volumes.get):
+                try:
+                    if not self.is_cancelled:
+                        self._upload_worker(volume, ospath.basename(volume), self._root_id)
+                finally:
+                    async_to_sync(clean_target, volume)
+                    stream.volume_done()
+                if self.is_cancelled:
+                    break
+            if stream.error and not self.is_cancelled:
+                raise Exception(f'Unable to zip {self.listener.name}: {stream.error}')
+        except Exception as err:
+            stream.cancel()
+            if isinstance(err, RetryError):
+                LOGGER.info('Total Attempts: %s', err.last_attempt.attempt_number)
+                err = err.last_attempt.exception()
+            if not self.is_cancelled:
+                async_to_sync(self.listener.onUploadError, str(err).replace('>', '').replace('<', ''))
+                self._is_errored = True
+        finally:
+            self._updater.cancel()
+        if self.is_cancelled:
+            stream.cancel()
+            self.cancel_streamed()
             return
+        if self._is_errored:
+            return
+        link = self.G_DRIVE_DIR_BASE_DOWNLOAD_URL.format(self._root_id)
+        LOGGER.info('Uploaded to GDrive: %s', self.listener.name)
+        async_to_sync(self.listener.onUploadComplete, link, size, self.total_files, self.total_folders, 'Folder', dir_id=self._root_id)
+
+    def upload(self, size):
+        if self._root_id is None:
+            self.user_setting()
+            try:
+                self.service = self.authorize()
+            except Exception as e:
+                LOGGER.error(e)
+                async_to_sync(self.listener.onUploadError, e)
+                return
         LOGGER.info('Uploading: %s', self._path)
         self._updater = setInterval(self.update_interval, self.progress)
         try:
@@ -58,7 +138,7 @@ class gdUpload(GoogleDriveHelper):
                 LOGGER.info('Uploaded to GDrive: %s', self._path)
             else:
                 mime_type = 'Folder'
-                dir_id = self.create_directory(ospath.basename(ospath.abspath(self.listener.name)), self.listener.upDest)
+                dir_id = self._root_id or self.create_directory(ospath.basename(ospath.abspath(self.listener.name)), self.listener.upDest)
                 result = self._upload_dir(self._path, dir_id)
                 if result is None:
                     raise Exception('Upload has been manually cancelled!')
@@ -84,30 +164,91 @@ class gdUpload(GoogleDriveHelper):
                 return
             async_to_sync(self.listener.onUploadComplete, link, size, self.total_files, self.total_folders, mime_type, dir_id=self.getIdFromUrl(link, self.listener.user_id))
 
+    async def progress(self):
+        if not self._folder_mode:
+            return await super().progress()
+        with self._progress_lock:
+            self.proc_bytes = self._done_bytes + sum(self._inflight.values())
+        self.total_time += self.update_interval
+
     def _upload_dir(self, input_directory, dest_id):
-        list_dirs = listdir(input_directory)
-        if len(list_dirs) == 0:
-            return dest_id
-        new_id = None
-        for item in list_dirs:
-            current_file_name = ospath.join(input_directory, item)
-            if ospath.isdir(current_file_name):
-                current_dir_id = self.create_directory(item, dest_id)
-                new_id = self._upload_dir(current_file_name, current_dir_id)
-                self.total_folders += 1
-            elif not item.lower().endswith(tuple(self.listener.extensionFilter)):
-                mime_type = get_mime_type(current_file_name)
-                file_name = current_file_name.split('/')[-1]
-                self._upload_file(current_file_name, file_name, mime_type, dest_id)
+        self._folder_mode = True
+        folder_ids, level, uploads = {input_directory: dest_id}, [input_directory], []
+        with ThreadPoolExecutor(max_workers=config_dict['GD_WORKERS']) as pool:
+            try:
+                while level and not self.is_cancelled:
+                    subfolders = []
+                    for current_dir in level:
+                        for item in sorted(listdir(current_dir)):
+                            current_file_name = ospath.join(current_dir, item)
+                            if current_file_name in self._streamed:
+                                async_to_sync(clean_target, current_file_name)
+                            elif ospath.isdir(current_file_name):
+                                subfolders.append(current_file_name)
+                            elif not item.lower().endswith(tuple(self.listener.extensionFilter)):
+                                uploads.append(pool.submit(self._upload_worker, current_file_name, item, folder_ids[current_dir]))
+                            elif not self.listener.seed or self.listener.newDir:
+                                async_to_sync(clean_target, current_file_name)
+                    if not subfolders:
+                        break
+                    for path in subfolders:
+                        if (dir_id := self._dir_ids.get(ospath.relpath(path, input_directory))) is not None:
+                            folder_ids[path] = dir_id
+                    if new_folders := [path for path in subfolders if path not in folder_ids]:
+                        new_ids = self.create_directories([(ospath.basename(path), folder_ids[ospath.dirname(path)]) for path in new_folders])
+                        folder_ids.update(zip(new_folders, new_ids))
+                        self.total_folders += len(new_folders)
+                    level = subfolders
+                for future in as_completed(uploads):
+                    future.result()
+            except:
+                self.is_cancelled = True
+                raise
+        return dest_id
+
+    @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=(retry_if_exception_type(Exception)))
+    def _upload_worker(self, file_path, file_name, dest_id):
+        file_metadata = {'name': file_name,
+                         'description': config_dict['GD_INFO'],
+                         'mimeType': get_mime_type(file_path),
+                         'parents': [dest_id]}
+        file_size = ospath.getsize(file_path)
+        retries = 0
+        while not self.is_cancelled:
+            service = self.thread_service()
+            try:
+                if file_size <= SIMPLE_UPLOAD_LIMIT:
+                    media_body = MediaFileUpload(file_path, mimetype=file_metadata['mimeType'], resumable=False)
+                    response = service.files().create(body=file_metadata, media_body=media_body, supportsAllDrives=True, fields='id').execute()
+                else:
+                    media_body = MediaFileUpload(file_path, mimetype=file_metadata['mimeType'], resumable=True, chunksize=100 * 1024 * 1024)
+                    request, response = service.files().create(body=file_metadata, media_body=media_body, supportsAllDrives=True, fields='id'), None
+                    while response is None and not self.is_cancelled:
+                        status, response = request.next_chunk()
+                        if status:
+                            with self._progress_lock:
+                                self._inflight[file_path] = status.resumable_progress
+                    if self.is_cancelled:
+                        return
+            except HttpError as err:
+                if err.resp.status in [500, 502, 503, 504, 429] and retries < 10:
+                    retries += 1
+                    continue
+                if (reason := self.get_error_reason(err)) in ['userRateLimitExceeded', 'dailyLimitExceeded'] and self.switch_thread_service_account():
+                    LOGGER.info('Got: %s, Trying again.', reason)
+                    continue
+                raise err
+            finally:
+                with self._progress_lock:
+                    self._inflight.pop(file_path, None)
+            if not config_dict['IS_TEAM_DRIVE']:
+                self.set_permission(response['id'], service)
+            with self._progress_lock:
+                self._done_bytes += file_size
                 self.total_files += 1
-                new_id = dest_id
-            else:
-                if not self.listener.seed or self.listener.newDir:
-                    async_to_sync(clean_target, current_file_name)
-                new_id = 'filter'
-            if self.is_cancelled:
-                break
-        return new_id
+            if not self.listener.seed or self.listener.newDir:
+                async_to_sync(clean_target, file_path)
+            return
 
     @retry(wait=wait_exponential(multiplier=2, min=3, max=6), stop=stop_after_attempt(3), retry=(retry_if_exception_type(Exception)))
     def _upload_file(self, file_path, file_name, mime_type, dest_id, is_dir=True):
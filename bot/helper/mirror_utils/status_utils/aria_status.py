@@ -41,12 +41,18 @@ class Aria2Status:
             self._gid = self._download.followed_by_ids[0]
             self._download = get_download(self._gid)
 
+    def progress_raw(self):
+        return self._download.progress
+
     def progress(self):
         return self._download.progress_string()
 
     def processed_bytes(self):
         return self._download.completed_length_string()
 
+    def speed_raw(self):
+        return self._download.download_speed
+
     def speed(self):
         return self._download.download_speed_string()
 
@@ -78,6 +84,9 @@ class Aria2Status:
     def uploaded_bytes(self):
         return self._download.upload_length_string()
 
+    def upload_speed_raw(self):
+        return self._download.upload_speed
+
     def upload_speed(self):
         self._update()
         return self._download.upload_speed_string()
@@ -29,8 +29,11 @@ class DirectStatus:
     def progress(self):
         return f'{round(self.progress_raw(), 2)}%'
 
+    def speed_raw(self):
+        return self._obj.speed
+
     def speed(self):
-        return f'{get_readable_file_size(self._obj.speed)}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def name(self):
         return self.listener.name
@@ -2,7 +2,7 @@ from time import time
 
 from bot import subprocess_lock, LOGGER
 from bot.helper.ext_utils.bot_utils import async_to_sync
-from bot.helper.ext_utils.files_utils import get_path_size
+from bot.helper.ext_utils.files_utils import get_path_size, SevenZipProgress
 from bot.helper.ext_utils.status_utils import get_readable_file_size, MirrorStatus, get_readable_time
 
 
@@ -12,6 +12,7 @@ class ExtractStatus:
         self._gid = gid
         self._start_time = time()
         self.listener = listener
+        self.archive = SevenZipProgress()
 
     @staticmethod
     def engine():
@@ -58,6 +59,8 @@ class ExtractStatus:
         return get_readable_file_size(self.processed_raw())
 
     def processed_raw(self):
+        if self.archive.active:
+            return min(self.archive.processed, self._size)
         return (async_to_sync(get_path_size, self.listener.newDir) if self.listener.newDir
                 else async_to_sync(get_path_size, self.listener.dir) - self._size)
 
@@ -67,8 +70,9 @@ class ExtractStatus:
     async def cancel_task(self):
         LOGGER.info('Cancelling Extract: %s', self.name())
         async with subprocess_lock:
-            if self.listener.suproc and self.listener.suproc.returncode is None:
-                self.listener.suproc.kill()
-            else:
-                self.listener.suproc = 'cancelled'
+            if not self.archive.kill():
+                if self.listener.suproc and self.listener.suproc.returncode is None:
+                    self.listener.suproc.kill()
+                else:
+                    self.listener.suproc = 'cancelled'
         await self.listener.onUploadError('Extracting stopped by user!')
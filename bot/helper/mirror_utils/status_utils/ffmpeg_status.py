@@ -27,17 +27,24 @@ class FFMpegStatus:
     def gid(self):
         return self._gid
 
+    def progress_raw(self):
+        try:
+            if self._status != 'direct':
+                return float(self._obj.percentage.rstrip('%'))
+            return self._obj.processed_bytes / self._obj.size * 100
+        except:
+            return 0
+
     def progress(self):
         if self._status != 'direct':
             return self._obj.percentage
-        try:
-            progress_raw = self._obj.processed_bytes / self._obj.size * 100
-        except:
-            progress_raw = 0
-        return f'{round(progress_raw, 2)}%'
+        return f'{round(self.progress_raw(), 2)}%'
+
+    def speed_raw(self):
+        return self._obj.speed if self._obj else 0
 
     def speed(self):
-        return f'{get_readable_file_size(self._obj.speed)}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def name(self):
         return self._obj.name if self._obj else self.listener.name
@@ -40,8 +40,11 @@ class GofileUploadStatus:
     def progress(self):
         return f'{round(self.progress_raw(), 2)}%'
 
+    def speed_raw(self):
+        return self._obj.speed
+
     def speed(self):
-        return f'{get_readable_file_size(self._obj.speed)}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def eta(self):
         try:
@@ -66,17 +66,23 @@ class JDownloaderStatus:
     def _update(self):
         self._info = get_download(int(self._gid), self._info, self._start_time)
 
-    def progress(self):
+    def progress_raw(self):
         try:
-            return f'{round((self._info.get("bytesLoaded", 0) / self._info.get("bytesTotal", 0)) * 100, 2)}%'
+            return self._info.get('bytesLoaded', 0) / self._info.get('bytesTotal', 0) * 100
         except:
-            return '0%'
+            return 0
+
+    def progress(self):
+        return f'{round(self.progress_raw(), 2)}%'
 
     def processed_bytes(self):
         return get_readable_file_size(self._info.get('bytesLoaded', 0))
 
+    def speed_raw(self):
+        return self._info.get('speed', 0)
+
     def speed(self):
-        return f'{get_readable_file_size(self._info.get("speed", 0))}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def name(self):
         return self._info.get('name') or self.listener.name
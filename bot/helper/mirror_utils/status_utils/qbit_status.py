@@ -36,12 +36,18 @@ class QbittorrentStatus:
     def elapsed(self):
         return get_readable_time(time() - self._elapsed)
 
+    def progress_raw(self):
+        return self._info.progress * 100
+
     def progress(self):
-        return f'{round(self._info.progress*100, 2)}%'
+        return f'{round(self.progress_raw(), 2)}%'
 
     def processed_bytes(self):
         return get_readable_file_size(self._info.downloaded)
 
+    def speed_raw(self):
+        return self._info.dlspeed
+
     def speed(self):
         return f'{get_readable_file_size(self._info.dlspeed)}/s'
 
@@ -78,6 +84,9 @@ class QbittorrentStatus:
     def uploaded_bytes(self):
         return get_readable_file_size(self._info.uploaded)
 
+    def upload_speed_raw(self):
+        return self._info.upspeed
+
     def upload_speed(self):
         return f'{get_readable_file_size(self._info.upspeed)}/s'
 
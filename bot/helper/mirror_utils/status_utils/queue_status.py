@@ -35,10 +35,18 @@ class QueueStatus:
     def processed_bytes():
         return 0
 
+    @staticmethod
+    def progress_raw():
+        return 0
+
     @staticmethod
     def progress():
         return '0%'
 
+    @staticmethod
+    def speed_raw():
+        return 0
+
     @staticmethod
     def speed():
         return '0B/s'
@@ -1,6 +1,6 @@
 from time import time
 
-from bot.helper.ext_utils.status_utils import MirrorStatus, get_readable_time
+from bot.helper.ext_utils.status_utils import MirrorStatus, get_readable_time, speed_string_to_bytes
 
 
 class RcloneStatus:
@@ -21,9 +21,18 @@ class RcloneStatus:
     def gid(self):
         return self._gid
 
+    def progress_raw(self):
+        try:
+            return float(self._obj.percentage.rstrip('%'))
+        except:
+            return 0
+
     def progress(self):
         return self._obj.percentage
 
+    def speed_raw(self):
+        return speed_string_to_bytes(self._obj.speed.replace(' ', '').replace('i', '').rstrip('/s'))
+
     def speed(self):
         return self._obj.speed
 
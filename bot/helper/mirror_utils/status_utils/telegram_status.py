@@ -31,15 +31,20 @@ class TelegramStatus:
     def name(self):
         return self.listener.name
 
-    def progress(self):
+    def progress_raw(self):
         try:
-            progress_raw = self._obj.processed_bytes / self._size * 100
+            return self._obj.processed_bytes / self._size * 100
         except:
-            progress_raw = 0
-        return f'{round(progress_raw, 2)}%'
+            return 0
+
+    def progress(self):
+        return f'{round(self.progress_raw(), 2)}%'
+
+    def speed_raw(self):
+        return self._obj.speed
 
     def speed(self):
-        return f'{get_readable_file_size(self._obj.speed)}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def eta(self):
         try:
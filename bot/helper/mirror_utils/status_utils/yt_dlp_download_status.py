@@ -38,11 +38,17 @@ class YtDlpDownloadStatus:
     def name(self):
         return self.listener.name
 
+    def progress_raw(self):
+        return self._obj.progress
+
     def progress(self):
-        return f'{round(self._obj.progress, 2)}%'
+        return f'{round(self.progress_raw(), 2)}%'
+
+    def speed_raw(self):
+        return self._obj.download_speed
 
     def speed(self):
-        return f'{get_readable_file_size(self._obj.download_speed)}/s'
+        return f'{get_readable_file_size(self.speed_raw())}/s'
 
     def eta(self):
         if self._obj.eta != '~':
@@ -3,7 +3,7 @@ from os import path as ospath
 
 from bot import subprocess_lock, LOGGER
 from bot.helper.ext_utils.bot_utils import async_to_sync
-from bot.helper.ext_utils.files_utils import get_path_size
+from bot.helper.ext_utils.files_utils import get_path_size, SevenZipProgress
 from bot.helper.ext_utils.status_utils import get_readable_file_size, MirrorStatus, get_readable_time
 
 
@@ -14,7 +14,9 @@ class ZipStatus:
         self._zpath = zpath
         self._start_time = time()
         self._iszpath = False
+        self._zsize = None
         self.listener = listener
+        self.archive = SevenZipProgress()
 
     @staticmethod
     def engine():
@@ -44,8 +46,9 @@ class ZipStatus:
     def name(self):
         if self._zpath and (zname := ospath.basename(self._zpath)) != self.listener.name:
             self._iszpath = True
-            zsize = get_readable_file_size(async_to_sync(get_path_size, self.listener.dir))
-            return f'{self.listener.name} ({zsize}) ~ {zname}.zip'
+            if self._zsize is None:
+                self._zsize = get_readable_file_size(async_to_sync(get_path_size, self.listener.dir))
+            return f'{self.listener.name} ({self._zsize}) ~ {zname}.zip'
         return self.listener.name
 
     def size(self):
@@ -62,6 +65,8 @@ class ZipStatus:
         return MirrorStatus.STATUS_ARCHIVING
 
     def processed_raw(self):
+        if self.archive.active:
+            return min(self.archive.processed, self._size)
         return async_to_sync(get_path_size, self.listener.newDir) if self.listener.newDir or self._zpath else async_to_sync(get_path_size, self.listener.dir) - self._size
 
     def processed_bytes(self):
@@ -73,8 +78,9 @@ class ZipStatus:
     async def cancel_task(self):
         LOGGER.info('Cancelling Archive: %s', self.name())
         async with subprocess_lock:
-            if self.listener.suproc and self.listener.suproc.returncode is None:
-                self.listener.suproc.kill()
-            else:
-                self.listener.suproc = 'cancelled'
+            if not self.archive.kill():
+                if self.listener.suproc and self.listener.suproc.returncode is None:
+                    self.listener.suproc.kill()
+                else:
+                    self.listener.suproc = 'cancelled'
         await self.listener.onUploadError('Archiving stopped by user!')
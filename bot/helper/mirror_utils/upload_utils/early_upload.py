@@ -0,0 +1,101 @@
+from aiofiles.os import makedirs, path as aiopath
+from asyncio import Event, TimeoutError, wait_for
+from os import link, path as ospath
+
+from bot import bot_loop, LOGGER
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.files_utils import clean_target
+from bot.helper.ext_utils.task_manager import take_upload_slot
+from bot.helper.mirror_utils.gdrive_utlis.upload import gdUpload
+from bot.helper.mirror_utils.upload_utils.telegram_uploader import TgUploader
+
+CHECK_INTERVAL = 10
+
+
+class EarlyUpload:
+    """Upload the files of a multi-file torrent while the rest is still downloading.
+    Each finished file is hard linked into a staging folder, so renaming or deleting it after the upload
+    never touches the torrent, and the same uploader finishes the task later skipping what it already sent.
+    Nothing is uploaded until the task holds an upload slot, which it only takes when one is free."""
+
+    def __init__(self, listener, get_files, size):
+        self._listener = listener
+        self._get_files = get_files
+        self._size = size
+        self._stage_dir = f'{listener.dir}_early'
+        self._seen = set()
+        self._stop_event = Event()
+        self._done = False
+        self.uploader = None
+        self._task = bot_loop.create_task(self._watch())
+
+    async def _watch(self):
+        while not self._stop_event.is_set():
+            try:
+                await wait_for(self._stop_event.wait(), CHECK_INTERVAL)
+                return
+            except TimeoutError:
+                pass
+            try:
+                files = await self._get_files()
+            except Exception as e:
+                LOGGER.error('Early upload: %s', e)
+                continue
+            pending = [path for path, completed in files if completed and path not in self._seen]
+            if len(files) < 2 or not pending or not await take_upload_slot(self._listener):
+                continue
+            for path in pending:
+                if self._stop_event.is_set():
+                    return
+                if await aiopath.isfile(path):
+                    self._seen.add(path)
+                    await self._upload(path)
+
+    async def _upload(self, path):
+        listener, root = self._listener, ospath.join(self._listener.dir, self._listener.name)
+        file_ = ospath.basename(path)
+        if not path.startswith(f'{root}/') or file_.lower().endswith(tuple(listener.extensionFilter)) or file_.startswith('Thumb'):
+            return
+        if listener.isLeech and not 0 < await aiopath.getsize(path) <= listener.splitSize:
+            return
+        stage_path = ospath.join(self._stage_dir, ospath.relpath(path, listener.dir))
+        try:
+            await makedirs(ospath.dirname(stage_path), exist_ok=True)
+            await sync_to_async(link, path, stage_path)
+        except Exception as e:
+            LOGGER.warning('Unable to stage %s for early upload: %s', path, e)
+            return
+        LOGGER.info('Early upload: %s', path)
+        try:
+            if listener.isLeech:
+                if self.uploader is None:
+                    self.uploader = TgUploader(listener, listener.dir, self._size)
+                await self.uploader.upload_file(stage_path, path)
+            else:
+                if self.uploader is None:
+                    self.uploader = gdUpload(listener, root)
+                await sync_to_async(self.uploader.upload_file, stage_path, ospath.relpath(ospath.dirname(path), root), path)
+        except Exception as e:
+            LOGGER.error('Early upload failed: %s. Path: %s', e, path)
+            await clean_target(stage_path)
+
+    async def stop(self):
+        """Wait for the file being uploaded, the uploader then continues with the full task."""
+        self._done = True
+        self._stop_event.set()
+        await self._task
+        await clean_target(self._stage_dir)
+
+    async def cancel(self):
+        if self._done:
+            return
+        self._done = True
+        self._stop_event.set()
+        self._task.cancel()
+        if isinstance(self.uploader, gdUpload):
+            self.uploader.is_cancelled = True
+            try:
+                await sync_to_async(self.uploader.cancel_streamed)
+            except Exception as e:
+                LOGGER.error('Early upload: %s', e)
+        await clean_target(self._stage_dir)
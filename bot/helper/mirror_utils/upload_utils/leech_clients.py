@@ -0,0 +1,191 @@
+from asyncio import Lock, Semaphore, sleep
+from logging import getLogger
+from math import ceil
+from os import path as ospath, SEEK_END
+from pyrogram import Client, raw, types, utils
+from pyrogram.errors import FloodWait
+from pyrogram.session import Session
+from time import time
+
+from bot import bot_loop, config_dict
+
+PART_SIZE = 512 * 1024
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+LOGGER = getLogger(__name__)
+
+
+class _ClientState:
+    def __init__(self):
+        self.active = 0
+        self.assigned = 0
+        self.delay = 0
+        self.resume_at = 0
+
+    def flood(self, seconds):
+        self.delay = min(max(self.delay * 2, 1), 30)
+        self.resume_at = time() + seconds + self.delay
+
+    def success(self):
+        self.delay = self.delay / 2 if self.delay > 0.5 else 0
+        self.resume_at = max(self.resume_at, time() + self.delay)
+
+
+class LeechClients:
+    """Pacing of the clients used by leech uploads. A FloodWait pauses only the client that got it and
+    doubles its delay between calls, every successful call halves it again."""
+
+    def __init__(self):
+        self._states = {}
+        self._sessions = {}
+        self._session_lock = Lock()
+
+    def _state(self, client: Client) -> _ClientState:
+        return self._states.setdefault(id(client), _ClientState())
+
+    def pick(self, clients: list) -> Client:
+        """Client with the fewest items assigned, counted from the pick so items still being prepared are spread too.
+        Every pick has to be given back with `release` once the item is sent or dropped."""
+        client = min(clients, key=lambda client: (self._state(client).assigned, self._state(client).resume_at))
+        self._state(client).assigned += 1
+        return client
+
+    def release(self, client: Client):
+        if state := self._states.get(id(client)):
+            state.assigned = max(state.assigned - 1, 0)
+
+    async def run(self, client: Client, func, *args, **kwargs):
+        state = self._state(client)
+        while True:
+            if (wait := state.resume_at - time()) > 0:
+                await sleep(wait)
+            state.active += 1
+            try:
+                result = await func(*args, **kwargs)
+            except FloodWait as f:
+                state.flood(f.value)
+                LOGGER.warning('FloodWait of %ss on %s, next call in %ss', f.value, client.name, round(state.resume_at - time()))
+                continue
+            finally:
+                state.active -= 1
+            state.success()
+            return result
+
+    async def _get_sessions(self, client: Client) -> list:
+        async with self._session_lock:
+            owner, sessions = self._sessions.get(id(client), (None, []))
+            if owner is not client:
+                sessions = []
+                self._sessions[id(client)] = (client, sessions)
+            while len(sessions) < max(config_dict['LEECH_UPLOAD_SESSIONS'], 1):
+                try:
+                    session = Session(client, await client.storage.dc_id(), await client.storage.auth_key(), await client.storage.test_mode(), is_media=True)
+                    await session.start()
+                    sessions.append(session)
+                except Exception as e:
+                    LOGGER.error('Failed to create upload session for %s: %s', client.name, e)
+                    if not sessions:
+                        raise
+                    break
+            return sessions
+
+    async def drop(self, client: Client):
+        """Stop the upload sessions of a client that is about to be stopped."""
+        async with self._session_lock:
+            self._states.pop(id(client), None)
+            _, sessions = self._sessions.pop(id(client), (None, []))
+        for session in sessions:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+
+    async def save_file(self, client: Client, path, file_id: int=None, file_part: int=0, progress=None, progress_args: tuple=()):
+        """Like `Client.save_file` but big files go up LEECH_UPLOAD_PARTS parts at a time over the kept upload sessions
+        of the client, a failed part is sent again on its own instead of restarting the whole file."""
+        fp = open(path, 'rb') if isinstance(path, str) else path
+        try:
+            file_size = fp.seek(0, SEEK_END)
+            if file_size <= BIG_FILE_SIZE:
+                fp.seek(0)
+                return await client.save_file(fp, file_id=file_id, file_part=file_part, progress=progress, progress_args=progress_args)
+            sessions = await self._get_sessions(client)
+            file_total_parts = ceil(file_size / PART_SIZE)
+            file_id = file_id or client.rnd_id()
+            in_flight = Semaphore(max(config_dict['LEECH_UPLOAD_PARTS'], 1))
+            tasks, uploaded = [], file_part * PART_SIZE
+            fp.seek(uploaded)
+
+            def _part_done(task):
+                nonlocal uploaded
+                in_flight.release()
+                if not task.cancelled() and task.exception() is None:
+                    uploaded += task.result()
+
+            try:
+                for part in range(file_part, file_total_parts):
+                    await in_flight.acquire()
+                    if failed := next((task for task in tasks if task.done() and not task.cancelled() and task.exception()), None):
+                        raise failed.exception()
+                    chunk = fp.read(PART_SIZE)
+                    task = bot_loop.create_task(self._save_part(sessions[part % len(sessions)], file_id, part, file_total_parts, chunk))
+                    task.add_done_callback(_part_done)
+                    tasks.append(task)
+                    if progress:
+                        await progress(min(uploaded, file_size), file_size, *progress_args)
+                for task in tasks:
+                    await task
+                    if progress:
+                        await progress(min(uploaded, file_size), file_size, *progress_args)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            name = ospath.basename(path) if isinstance(path, str) else getattr(fp, 'name', 'file')
+            return raw.types.InputFileBig(id=file_id, parts=file_total_parts, name=name)
+        finally:
+            if isinstance(path, str):
+                fp.close()
+
+    @staticmethod
+    async def _save_part(session: Session, file_id: int, part: int, file_total_parts: int, chunk: bytes) -> int:
+        for attempt in range(1, 6):
+            try:
+                if await session.invoke(raw.functions.upload.SaveBigFilePart(file_id=file_id, file_part=part, file_total_parts=file_total_parts, bytes=chunk)):
+                    return len(chunk)
+                raise Exception(f'Telegram refused part {part}')
+            except FloodWait as f:
+                await sleep(f.value)
+            except Exception as e:
+                if attempt == 5:
+                    raise
+                LOGGER.warning('Retrying part %s of %s: %s', part, file_total_parts, e)
+                await sleep(attempt)
+        raise Exception(f'Unable to upload part {part}')
+
+
+async def send_uploaded_media(client: Client, chat_id: int, reply_to_id: int, caption: str, kind: str, file_name: str, file, thumb=None,
+                              duration=0, width=0, height=0, performer=None, title=None) -> types.Message:
+    """Send a file uploaded with `save_file` of the same client, the upload and the message can be done apart."""
+    if kind == 'photos':
+        media = raw.types.InputMediaUploadedPhoto(file=file)
+    else:
+        attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+        if kind == 'videos':
+            attributes.insert(0, raw.types.DocumentAttributeVideo(supports_streaming=True, duration=duration, w=width, h=height))
+        elif kind == 'audios':
+            attributes.insert(0, raw.types.DocumentAttributeAudio(duration=duration, performer=performer, title=title))
+        default_mime = {'videos': 'video/mp4', 'audios': 'audio/mpeg'}.get(kind, 'application/zip')
+        media = raw.types.InputMediaUploadedDocument(mime_type=client.guess_mime_type(file_name) or default_mime, file=file, thumb=thumb,
+                                                     attributes=attributes)
+    r = await client.invoke(raw.functions.messages.SendMedia(peer=await client.resolve_peer(chat_id),
+                                                             media=media,
+                                                             silent=True,
+                                                             reply_to=raw.types.InputReplyToMessage(reply_to_msg_id=reply_to_id),
+                                                             random_id=client.rnd_id(),
+                                                             **await utils.parse_text_entities(client, caption, None, None)))
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(client, update.message, {u.id: u for u in r.users}, {c.id: c for c in r.chats})
+
+
+leech_clients = LeechClients()
@@ -1,23 +1,27 @@
 from __future__ import annotations
 from aiofiles.os import path as aiopath, rename as aiorename, makedirs
 from aioshutil import copy
-from asyncio import sleep, gather
+from asyncio import gather, Semaphore
+from contextlib import nullcontext
 from logging import getLogger
 from natsort import natsorted
 from os import path as ospath, walk
 from PIL import Image
-from pyrogram.errors import FloodWait, RPCError
+from pyrogram.errors import FilePartMissing, RPCError
 from pyrogram.types import InputMediaVideo, InputMediaDocument, InputMediaPhoto, Message
 from re import match as re_match
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, RetryError
 from time import time
 
-from bot import bot, bot_dict, bot_lock, config_dict, DEFAULT_SPLIT_SIZE, LOGGER
+from bot import bot, bot_dict, bot_lock, bot_loop, config_dict, DEFAULT_SPLIT_SIZE, LOGGER
 from bot.helper.ext_utils.bot_utils import sync_to_async, default_button
-from bot.helper.ext_utils.files_utils import clean_unwanted, clean_target, get_path_size, is_archive, get_base_name
-from bot.helper.ext_utils.media_utils import create_thumbnail, take_ss, get_document_type, get_media_info, get_audio_thumb, post_media_info, GenSS
+from bot.helper.ext_utils.files_utils import clean_unwanted, clean_target, get_path_size, is_archive, get_base_name, get_file_parts, FileSlice, ZipVolumeStream
+from bot.helper.ext_utils.frame_extractor import frame_extractor
+from bot.helper.ext_utils.media_probe import media_probe
+from bot.helper.ext_utils.media_utils import get_document_type, get_audio_thumb, post_media_info
 from bot.helper.ext_utils.shortenurl import short_url
 from bot.helper.listeners import tasks_listener as task
+from bot.helper.mirror_utils.upload_utils.leech_clients import leech_clients, send_uploaded_media
 from bot.helper.stream_utils.file_properties import gen_link
 from bot.helper.telegram_helper.button_build import ButtonMaker
 from bot.helper.telegram_helper.message_utils import deleteMessage, handle_message
@@ -26,9 +30,38 @@ from bot.helper.telegram_helper.message_utils import deleteMessage, handle_messa
 LOGGER = getLogger(__name__)
 
 
+class _LeechItem:
+    """One message of a leech, staged by the upload workers and sent in the order it was listed."""
+
+    def __init__(self, up_path: str, file: str, caption: str, part: tuple=None, last: bool=True):
+        self.up_path = up_path
+        self.file = file
+        self.caption = caption
+        self.part = part
+        self.last = last
+        self.client = None
+        self.picked = None
+        self.kind = 'documents'
+        self.media_info = False
+        self.thumb = None
+        self.ss_image = None
+        self.screenshots = []
+        self.attrs = {}
+        self.input_file = None
+        self.input_thumb = None
+        self.uploaded = 0
+
+    @property
+    def name(self):
+        return self.file if self.part else ospath.basename(self.up_path)
+
+    @property
+    def group_path(self):
+        return ospath.join(ospath.dirname(self.up_path), self.file) if self.part else self.up_path
+
+
 class TgUploader:
     def __init__(self, listener: task.TaskListener, path: str, size: int):
-        self._last_uploaded = 0
         self._processed_bytes = 0
         self._listener = listener
         self._path = path
@@ -40,75 +73,120 @@ class TgUploader:
         self._size = size
         self._media_dict = {'videos': {}, 'documents': {}}
         self._last_msg_in_group = False
-        self._client = None
+        self._clients = []
         self._send_msg = None
         self._up_path = ''
         self._leech_log = config_dict['LEECH_LOG']
+        self._prepared = False
+        self._streamed = set()
+        self._streamed_files = 0
+        self._streamed_corrupted = 0
 
-    async def _upload_progress(self, current, _):
+    async def _upload_progress(self, current, _, item: _LeechItem):
         if self._is_cancelled:
-            self._client.stop_transmission()
-        chunk_size = current - self._last_uploaded
-        self._last_uploaded = current
-        self._processed_bytes += chunk_size
+            item.client.stop_transmission()
+        self._processed_bytes += current - item.uploaded
+        item.uploaded = current
+
+    async def _prepare(self):
+        if not self._prepared:
+            self._prepared = True
+            await self._user_settings()
+            await self._msg_to_reply()
+            async with bot_lock:
+                userbot = bot_dict['USERBOT']
+                self._clients = [userbot if userbot and config_dict['USERBOT_LEECH'] else bot]
+                if self._send_msg and self._send_msg.chat.id == self._leech_log:
+                    self._clients.extend(client for client in (userbot, *bot_dict.get('LEECH_BOTS', [])) if client and client not in self._clients)
+
+    async def upload_file(self, path, orig_path):
+        """Upload a finished file of a download that is still running, `orig_path` is skipped by the final upload."""
+        await self._prepare()
+        self._streamed.add(orig_path)
+        up_path, caption = await self._prepare_file(path)
+        sent, failed = await self._upload_items([_LeechItem(up_path, ospath.basename(up_path), caption)], self._clean_item)
+        self._streamed_files += sent
+        self._streamed_corrupted += failed
 
     async def upload(self, o_files, m_size):
-        await self._user_settings()
-        await self._msg_to_reply()
-        corrupted_files = total_files = 0
+        await self._prepare()
+        corrupted_files, total_files = self._streamed_corrupted, self._streamed_files
+        items = []
         for dirpath, _, files in sorted(await sync_to_async(walk, self._path)):
             if dirpath.endswith('/yt-dlp-thumb'):
                 continue
             for file_ in natsorted(files):
-                self._up_path = ospath.join(dirpath, file_)
+                up_path = ospath.join(dirpath, file_)
+                if up_path in self._streamed:
+                    await clean_target(up_path)
+                    continue
                 if file_.lower().endswith(tuple(self._listener.extensionFilter)) or file_.startswith('Thumb'):
                     if not file_.startswith('Thumb'):
-                        await clean_target(self._up_path)
+                        await clean_target(up_path)
                     continue
+                if self._is_cancelled:
+                    return
                 try:
-                    f_size = await get_path_size(self._up_path)
+                    f_size = await get_path_size(up_path)
                     if self._listener.seed and file_ in o_files and f_size in m_size:
                         continue
                     if f_size == 0:
                         corrupted_files += 1
-                        LOGGER.error('%s size is zero, telegram don\'t upload zero size files', self._up_path)
+                        LOGGER.error('%s size is zero, telegram don\'t upload zero size files', up_path)
                         continue
-                    if self._is_cancelled:
-                        return
-                    caption = await self._prepare_file(file_, dirpath)
-                    if self._last_msg_in_group:
-                        group_lists = [x for v in self._media_dict.values() for x in v.keys()]
-                        match = re_match(r'.+(?=\.0*\d+$)|.+(?=\.part\d+\..+$)', self._up_path)
-                        if not match or match and match.group(0) not in group_lists:
-                            for key, value in list(self._media_dict.items()):
-                                for subkey, msgs in list(value.items()):
-                                    if len(msgs) > 1:
-                                        await self._send_media_group(msgs, subkey, key)
-                    self._last_msg_in_group = False
-                    self._last_uploaded = 0
-                    await self._upload_file(caption, file_)
-                    total_files += 1
-                    if self._is_cancelled:
-                        return
-                    if not self._is_corrupted and (self._listener.isSuperChat or self._leech_log):
-                        self._msgs_dict[self._send_msg.link] = file_
-                    await sleep(3)
+                    part_size = self._listener.virtualSplits.get(up_path)
+                    up_path, caption = await self._prepare_file(up_path)
+                    if part_size:
+                        base_name = ospath.basename(up_path)
+                        parts = get_file_parts(f_size, part_size)
+                        for i, part in enumerate(parts, 1):
+                            part_name = f'{base_name}.{i:03}'
+                            items.append(_LeechItem(up_path, part_name, self._caption_mode(part_name), part, i == len(parts)))
+                    else:
+                        items.append(_LeechItem(up_path, ospath.basename(up_path), caption))
                 except Exception as err:
-                    if isinstance(err, RetryError):
-                        LOGGER.info('Total Attempts: %s', err.last_attempt.attempt_number, exc_info=True)
-                        corrupted_files += 1
-                        self._is_corrupted = True
-                        err = err.last_attempt.exception()
-                    LOGGER.error('%s. Path: %s', err, self._up_path)
-                    corrupted_files += 1
-                    if self._is_cancelled:
-                        return
-                    continue
-                finally:
-                    if not self._is_cancelled and await aiopath.exists(self._up_path) and (not self._listener.seed or self._listener.newDir or
-                        dirpath.endswith('/splited_files_mltb') or '/copied_mltb/' in self._up_path):
-                        await clean_target(self._up_path)
+                    corrupted_files += self._upload_error(err, up_path)
+        sent, failed = await self._upload_items(items, self._clean_leeched)
+        if self._is_cancelled:
+            return
+        await self._finalize(total_files + sent, corrupted_files + failed)
 
+    async def upload_volumes(self, stream: ZipVolumeStream):
+        await self._prepare()
+        corrupted_files = total_files = 0
+        while up_path := await stream.volumes.get():
+            try:
+                if not self._is_cancelled:
+                    up_path, caption = await self._prepare_file(up_path)
+                    sent, failed = await self._upload_items([_LeechItem(up_path, ospath.basename(up_path), caption)])
+                    total_files += sent
+                    corrupted_files += failed
+            except Exception as err:
+                corrupted_files += self._upload_error(err, up_path)
+            finally:
+                await clean_target(up_path)
+                stream.volume_done()
+            if self._is_cancelled:
+                stream.cancel()
+                return
+        if self._is_cancelled:
+            return
+        if stream.error:
+            await self._listener.onUploadError(f'Unable to zip {self._listener.name}: {stream.error}')
+            return
+        await self._finalize(total_files, corrupted_files)
+
+    def _upload_error(self, err, path=None):
+        corrupted = 1
+        if isinstance(err, RetryError):
+            LOGGER.info('Total Attempts: %s', err.last_attempt.attempt_number, exc_info=True)
+            corrupted += 1
+            self._is_corrupted = True
+            err = err.last_attempt.exception()
+        LOGGER.error('%s. Path: %s', err, path or self._up_path)
+        return corrupted
+
+    async def _finalize(self, total_files, corrupted_files):
         for key, value in list(self._media_dict.items()):
             for subkey, msgs in list(value.items()):
                 if len(msgs) > 1:
@@ -126,136 +204,197 @@ class TgUploader:
         LOGGER.info('Leech Completed: %s', self._listener.name)
         await self._listener.onUploadComplete(None, self._size, self._msgs_dict, total_files, corrupted_files)
 
+    async def _upload_items(self, items: list[_LeechItem], on_done=None):
+        """Upload up to LEECH_UPLOAD_WORKERS items at once over the leech clients, each message is sent
+        as soon as the ones listed before it are out so the reply chain keeps the listed order."""
+        sent = failed = 0
+        lookahead = Semaphore(max(config_dict['LEECH_UPLOAD_WORKERS'], 1))
+        stages = [bot_loop.create_task(self._stage(item, lookahead)) for item in items]
+        try:
+            for item, stage in zip(items, stages):
+                try:
+                    await stage
+                    if self._is_cancelled:
+                        break
+                    await self._commit(item)
+                    if self._is_cancelled:
+                        break
+                    sent += 1
+                except Exception as err:
+                    if self._is_cancelled:
+                        break
+                    failed += self._upload_error(err, item.up_path)
+                finally:
+                    lookahead.release()
+                    await self._drop_item(item)
+                    if on_done and item.last:
+                        await on_done(item)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            for item in items:
+                self._release_client(item)
+        return sent, failed
+
+    async def _stage(self, item: _LeechItem, lookahead: Semaphore):
+        await lookahead.acquire()
+        await self._stage_item(item)
+
     @retry(wait=wait_exponential(multiplier=2, min=4, max=8), stop=stop_after_attempt(4), retry=retry_if_exception_type(Exception))
-    async def _upload_file(self, caption, file, force_document=False):
+    async def _stage_item(self, item: _LeechItem):
+        if self._is_cancelled:
+            return
+        await self._prepare_media(item)
+        if self._is_cancelled:
+            return
+        await self._save_source(item)
+        if item.input_file is None and not self._is_cancelled:
+            raise Exception(f'Unable to upload {item.name}')
+        if item.thumb and item.kind != 'photos':
+            item.input_thumb = await leech_clients.run(item.client, item.client.save_file, item.thumb)
+
+    async def _prepare_media(self, item: _LeechItem):
         if self._thumb and not await aiopath.exists(self._thumb):
             self._thumb = None
-        thumb, ss_image = self._thumb, None
+        thumb = self._thumb
+        is_video, is_audio, is_image = (False, False, False) if item.part else await get_document_type(item.up_path)
+        self._release_client(item)
+        async with bot_lock:
+            if is_image:
+                item.client = bot
+            elif bot_dict['IS_PREMIUM'] and (item.part[1] if item.part else await get_path_size(item.up_path)) > DEFAULT_SPLIT_SIZE:
+                item.client = bot_dict['USERBOT']
+            else:
+                item.client = item.picked = leech_clients.pick(self._clients)
+        if not is_image and thumb is None:
+            file_name = ospath.splitext(item.file)[0]
+            thumb_path = ospath.join(self._path, 'yt-dlp-thumb', f'{file_name}.jpg')
+            if await aiopath.isfile(thumb_path):
+                thumb = thumb_path
+            elif is_audio and not is_video:
+                thumb = await get_audio_thumb(item.up_path)
+        if is_video:
+            item.attrs['duration'] = (await media_probe.probe(item.up_path)).duration
+            frames = await self._extract_frames(item.up_path, item.attrs['duration'], not thumb)
+            item.ss_image, item.screenshots = frames.mosaic, frames.screenshots
+            if not thumb:
+                thumb = frames.thumbnail
+        item.thumb, item.media_info = thumb, is_video or is_audio
+
+        if self._listener.as_doc or (not is_video and not is_audio and not is_image):
+            item.kind = 'documents'
+        elif is_video:
+            item.kind = 'videos'
+            if thumb:
+                with Image.open(thumb) as img:
+                    item.attrs['width'], item.attrs['height'] = img.size
+            else:
+                item.attrs['width'], item.attrs['height'] = 480, 320
+            if not item.up_path.upper().endswith(('.MKV', '.MP4')):
+                dirpath, file_ = ospath.split(item.up_path)
+                if self._listener.seed and not self._listener.newDir and not dirpath.endswith('/splited_files_mltb'):
+                    dirpath = ospath.join(dirpath, 'copied_mltb')
+                    await makedirs(dirpath, exist_ok=True)
+                    new_path = ospath.join(dirpath, f'{ospath.splitext(file_)[0]}.mp4')
+                    item.up_path = await copy(item.up_path, new_path)
+                else:
+                    new_path = f'{ospath.splitext(item.up_path)[0]}.mp4'
+                    await aiorename(item.up_path, new_path)
+                    item.up_path = new_path
+        elif is_audio:
+            item.kind = 'audios'
+            probe = await media_probe.probe(item.up_path)
+            item.attrs.update(duration=probe.duration, performer=probe.artist, title=probe.title)
+        else:
+            item.kind = 'photos'
+
+    async def _save_source(self, item: _LeechItem, file_id=None, file_part=0):
+        with FileSlice(item.up_path, *item.part, item.file) if item.part else nullcontext(item.up_path) as document:
+            item.input_file = await leech_clients.run(item.client, self._save_file, item, document, file_id, file_part)
+
+    async def _save_file(self, item: _LeechItem, document, file_id, file_part):
+        self._processed_bytes -= item.uploaded
+        item.uploaded = 0
+        return await leech_clients.save_file(item.client, document, file_id, file_part, self._upload_progress, (item,))
+
+    async def _commit(self, item: _LeechItem):
+        self._up_path = item.up_path
+        if self._last_msg_in_group:
+            group_lists = [x for v in self._media_dict.values() for x in v.keys()]
+            match = re_match(r'.+(?=\.0*\d+$)|.+(?=\.part\d+\..+$)', item.group_path)
+            if not match or match and match.group(0) not in group_lists:
+                for key, value in list(self._media_dict.items()):
+                    for subkey, msgs in list(value.items()):
+                        if len(msgs) > 1:
+                            await self._send_media_group(msgs, subkey, key)
+        self._last_msg_in_group = False
+        if item.screenshots:
+            await self._send_screenshots(item.screenshots)
+        msg = await self._send_item(item)
         if self._is_cancelled:
             return
-        try:
-            async with bot_lock:
-                self._client = (bot_dict['USERBOT'] if bot_dict['IS_PREMIUM'] and await get_path_size(self._up_path) > DEFAULT_SPLIT_SIZE
-                                or bot_dict['USERBOT'] and config_dict['USERBOT_LEECH'] else bot)
-            is_video, is_audio, is_image = await get_document_type(self._up_path)
-            if not is_image and thumb is None:
-                file_name = ospath.splitext(file)[0]
-                thumb_path = ospath.join(self._path, 'yt-dlp-thumb', f'{file_name}.jpg')
-                if await aiopath.isfile(thumb_path):
-                    thumb = thumb_path
-                elif is_audio and not is_video:
-                    thumb = await get_audio_thumb(self._up_path)
-            if is_video:
-                duration = (await get_media_info(self._up_path))[0]
-                ss_image = await self._gen_ss(self._up_path)
-                if self._listener.screenShots:
-                    await self._send_screenshots()
-                if not thumb:
-                    thumb = await create_thumbnail(self._up_path, duration)
-
-            if self._listener.as_doc or force_document or (not is_video and not is_audio and not is_image):
-                key = 'documents'
-                if self._is_cancelled:
-                    return
-                self._send_msg = await self._client.send_document(chat_id=self._send_msg.chat.id,
-                                                                  document=self._up_path,
-                                                                  thumb=thumb,
-                                                                  caption=caption,
-                                                                  disable_notification=True,
-                                                                  progress=self._upload_progress,
-                                                                  reply_to_message_id=self._send_msg.id)
-            elif is_video:
-                key = 'videos'
-                if thumb:
-                    with Image.open(thumb) as img:
-                        width, height = img.size
+        self._send_msg = msg
+        await self._final_message(item.client, item.ss_image, item.media_info)
+
+        await self._copy_Leech(self._listener.user_id, self._send_msg)
+        if self._listener.upDest:
+            await self._copy_Leech(self._listener.upDest, self._send_msg)
+
+        if not self._is_cancelled and self._media_group and (self._send_msg.video or self._send_msg.document):
+            if match := re_match(r'.+(?=\.0*\d+$)|.+(?=\.part\d+\..+$)', item.group_path):
+                subkey, key = match.group(0), 'videos' if self._send_msg.video else 'documents'
+                if subkey in self._media_dict[key].keys():
+                    self._media_dict[key][subkey].append(self._send_msg)
                 else:
-                    width, height = 480, 320
-                if not self._up_path.upper().endswith(('.MKV', '.MP4')):
-                    dirpath, file_ = ospath.split(self._up_path)
-                    if self._listener.seed and not self._listener.newDir and not dirpath.endswith('/splited_files_mltb'):
-                        dirpath = ospath.join(dirpath, 'copied_mltb')
-                        await makedirs(dirpath, exist_ok=True)
-                        new_path = ospath.join(dirpath, f'{ospath.splitext(file_)[0]}.mp4')
-                        self._up_path = await copy(self._up_path, new_path)
-                    else:
-                        new_path = f'{ospath.splitext(self._up_path)[0]}.mp4'
-                        await aiorename(self._up_path, new_path)
-                        self._up_path = new_path
-                if self._is_cancelled:
-                    return
-                self._send_msg = await self._client.send_video(chat_id=self._send_msg.chat.id,
-                                                               video=self._up_path,
-                                                               caption=caption,
-                                                               duration=duration,
-                                                               width=width,
-                                                               height=height,
-                                                               thumb=thumb,
-                                                               supports_streaming=True,
-                                                               disable_notification=True,
-                                                               progress=self._upload_progress,
-                                                               reply_to_message_id=self._send_msg.id)
-            elif is_audio:
-                key = 'audios'
-                duration, artist, title = await get_media_info(self._up_path)
-                if self._is_cancelled:
-                    return
-                self._send_msg = await self._client.send_audio(chat_id=self._send_msg.chat.id,
-                                                               audio=self._up_path,
-                                                               caption=caption,
-                                                               duration=duration,
-                                                               performer=artist,
-                                                               title=title,
-                                                               thumb=thumb,
-                                                               disable_notification=True,
-                                                               progress=self._upload_progress,
-                                                               reply_to_message_id=self._send_msg.id)
-            else:
-                key = 'photos'
-                if self._is_cancelled:
-                    return
-                self._send_msg = await bot.send_photo(chat_id=self._send_msg.chat.id,
-                                                      photo=self._up_path,
-                                                      caption=caption,
-                                                      disable_notification=True,
-                                                      progress=self._upload_progress,
-                                                      reply_to_message_id=self._send_msg.id)
-            if self._is_cancelled:
-                return
-            await self._final_message(ss_image, bool(is_video or is_audio))
-            
-            await self._copy_Leech(self._listener.user_id, self._send_msg)
-            if self._listener.upDest:
-                await self._copy_Leech(self._listener.upDest, self._send_msg)
-
-            if not self._is_cancelled and self._media_group and (self._send_msg.video or self._send_msg.document):
-                if match := re_match(r'.+(?=\.0*\d+$)|.+(?=\.part\d+\..+$)', self._up_path):
-                    subkey = match.group(0)
-                    if subkey in self._media_dict[key].keys():
-                        self._media_dict[key][subkey].append(self._send_msg)
-                    else:
-                        self._media_dict[key][subkey] = [self._send_msg]
-                    msgs = self._media_dict[key][subkey]
-                    if len(msgs) == 10:
-                        await self._send_media_group(msgs, subkey, key)
-                    else:
-                        self._last_msg_in_group = True
+                    self._media_dict[key][subkey] = [self._send_msg]
+                msgs = self._media_dict[key][subkey]
+                if len(msgs) == 10:
+                    await self._send_media_group(msgs, subkey, key)
+                else:
+                    self._last_msg_in_group = True
+        if not self._is_corrupted and (self._listener.isSuperChat or self._leech_log):
+            self._msgs_dict[self._send_msg.link] = item.file
 
-            if not self._thumb and thumb:
-                await clean_target(thumb)
-        except FloodWait as f:
-            LOGGER.warning(f, exc_info=True)
-            await sleep(f.value * 1.2)
+    @retry(wait=wait_exponential(multiplier=2, min=4, max=8), stop=stop_after_attempt(4), retry=retry_if_exception_type(Exception))
+    async def _send_item(self, item: _LeechItem, force_document=False):
+        if self._is_cancelled:
+            return
+        kind = 'documents' if force_document else item.kind
+        try:
+            return await leech_clients.run(item.client, send_uploaded_media, item.client, self._send_msg.chat.id, self._send_msg.id, item.caption,
+                                           kind, item.name, item.input_file, item.input_thumb, **item.attrs)
+        except FilePartMissing as e:
+            LOGGER.warning('Reuploading part %s of %s', e.value, item.up_path)
+            await self._save_source(item, item.input_file.id, e.value)
+            raise
         except Exception as err:
-            if not self._thumb and thumb:
-                await clean_target(thumb)
             err_type = 'RPCError: ' if isinstance(err, RPCError) else ''
-            LOGGER.error('%s%s. Path: %s', err_type, err, self._up_path)
-            if 'Telegram says: [400' in str(err) and key != 'documents':
-                LOGGER.error('Retrying As Document. Path: %s', self._up_path, exc_info=True)
-                return await self._upload_file(caption, file, True)
+            LOGGER.error('%s%s. Path: %s', err_type, err, item.up_path)
+            if 'Telegram says: [400' in str(err) and kind != 'documents':
+                LOGGER.error('Retrying As Document. Path: %s', item.up_path, exc_info=True)
+                return await self._send_item(item, True)
             raise err
 
+    @staticmethod
+    def _release_client(item: _LeechItem):
+        if item.picked:
+            leech_clients.release(item.picked)
+            item.picked = None
+
+    async def _drop_item(self, item: _LeechItem):
+        self._release_client(item)
+        await gather(*[clean_target(path) for path in (*item.screenshots, item.ss_image) if path])
+        if not self._thumb and item.thumb:
+            await clean_target(item.thumb)
+
+    async def _clean_item(self, item: _LeechItem):
+        await clean_target(item.up_path)
+
+    async def _clean_leeched(self, item: _LeechItem):
+        if not self._is_cancelled and await aiopath.exists(item.up_path) and (not self._listener.seed or self._listener.newDir or
+            ospath.dirname(item.up_path).endswith('/splited_files_mltb') or '/copied_mltb/' in item.up_path):
+            await clean_target(item.up_path)
+
     async def _user_settings(self):
         self._media_group = self._listener.user_dict.get('media_group', False) or ('media_group' not in self._listener.user_dict and config_dict['MEDIA_GROUP'])
         self._cap_mode = self._listener.user_dict.get('caption_style', 'mono')
@@ -289,7 +428,8 @@ class TgUploader:
         await self._listener.onUploadError('Upload stopped by user!')
 
     # ================================================== UTILS ==================================================
-    async def _prepare_file(self, file_, dirpath):
+    async def _prepare_file(self, up_path):
+        dirpath, file_ = ospath.split(up_path)
         caption = self._caption_mode(file_)
         if len(file_) > 60:
             if is_archive(file_):
@@ -307,12 +447,12 @@ class TgUploader:
                 dirpath = ospath.join(dirpath, 'copied_mltb')
                 await makedirs(dirpath, exist_ok=True)
                 new_path = ospath.join(dirpath, f'{name}{ext}')
-                self._up_path = await copy(self._up_path, new_path)
+                up_path = await copy(up_path, new_path)
             else:
                 new_path = ospath.join(dirpath, f'{name}{ext}')
-                await aiorename(self._up_path, new_path)
-                self._up_path = new_path
-        return caption
+                await aiorename(up_path, new_path)
+                up_path = new_path
+        return up_path, caption
 
     def _caption_mode(self, file):
         match self._cap_mode:
@@ -328,14 +468,12 @@ class TgUploader:
             caption = f'''{caption}\n\n{self._user_caption}''' if self._user_fnamecap else self._user_caption
         return caption
 
-    async def _gen_ss(self, vid_path):
-        if not self._enable_ss or self._is_cancelled:
-            return
-        ss = GenSS(self._listener.message, vid_path)
-        await ss.file_ss()
-        if ss.error:
-            return
-        return ss.rimage
+    async def _extract_frames(self, vid_path, duration, thumbnail):
+        ss_nb = 0
+        if self._listener.screenShots:
+            ss_nb = int(self._listener.screenShots) if isinstance(self._listener.screenShots, str) else 10
+        mosaic = ospath.join('thumbnails', f'{time()}_genss.jpg') if self._enable_ss and not self._is_cancelled else ''
+        return await frame_extractor.extract(vid_path, duration, ss_nb, ospath.join(ospath.dirname(vid_path), 'screenshots'), thumbnail, mosaic)
     # ===========================================================================================================
 
     # ================================================= MESSAGE =================================================
@@ -374,28 +512,14 @@ class TgUploader:
         self._send_msg = msgs_list[-1]
 
     @handle_message
-    async def _send_screenshots(self):
-        if isinstance(self._listener.screenShots, str):
-            ss_nb = int(self._listener.screenShots)
-        else:
-            ss_nb = 10
-        outputs = await take_ss(self._up_path, ss_nb)
-        inputs = []
-        if outputs:
-            for m in outputs:
-                if await aiopath.exists(m):
-                    cap = m.rsplit('/', 1)[-1]
-                    inputs.append(InputMediaPhoto(m, cap))
-                else:
-                    outputs.remove(m)
-        if outputs:
-            msgs_list = await self._send_msg.reply_media_group(media=inputs, quote=True, disable_notification=True)
-        #    if self._send_pm:
-            await self._copy_media_group(self._listener.user_id, msgs_list)
-            if self._listener.upDest:
-                await self._copy_media_group(self._listener.upDest, msgs_list)
-            self._send_msg = msgs_list[-1]
-            await gather(*[clean_target(m) for m in outputs])
+    async def _send_screenshots(self, outputs: list):
+        inputs = [InputMediaPhoto(m, m.rsplit('/', 1)[-1]) for m in outputs]
+        msgs_list = await self._send_msg.reply_media_group(media=inputs, quote=True, disable_notification=True)
+    #    if self._send_pm:
+        await self._copy_media_group(self._listener.user_id, msgs_list)
+        if self._listener.upDest:
+            await self._copy_media_group(self._listener.upDest, msgs_list)
+        self._send_msg = msgs_list[-1]
 
     @handle_message
     async def _copy_media_group(self, chat_id: int, msgs: list[Message]):
@@ -409,7 +533,7 @@ class TgUploader:
                                   reply_to_message_id=message.reply_to_message.id if chat_id == message.chat.id else None)
 
     @handle_message
-    async def _final_message(self, ss_image, media_info: bool=False):
+    async def _final_message(self, client, ss_image, media_info: bool=False):
         self._buttons = ButtonMaker()
         media_result = await post_media_info(self._up_path, self._size, ss_image) if media_info else None
         await clean_target(ss_image)
@@ -420,8 +544,14 @@ class TgUploader:
         for mode, link in zip(['Stream', 'Download'], await gen_link(self._send_msg)):
             if link:
                 self._buttons.button_link(mode, await sync_to_async(short_url, link, self._listener.user_id), 'header')
-        self._send_msg = await bot.get_messages(self._send_msg.chat.id, self._send_msg.id)
-        if (buttons := self._buttons.build_menu(2)) and (cmsg := await self._send_msg.edit_reply_markup(buttons)):
+        chat_id, msg_id = self._send_msg.chat.id, self._send_msg.id
+        self._send_msg = await bot.get_messages(chat_id, msg_id)
+        if not (buttons := self._buttons.build_menu(2)):
+            return
+        if client is not bot and client.me.is_bot:
+            await client.edit_message_reply_markup(chat_id, msg_id, buttons)
+            self._send_msg = await bot.get_messages(chat_id, msg_id)
+        elif cmsg := await self._send_msg.edit_reply_markup(buttons):
             self._send_msg = cmsg
 
     def _get_input_media(self, subkey: str, key: str):
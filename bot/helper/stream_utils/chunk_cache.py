@@ -0,0 +1,189 @@
+from aiofiles.os import makedirs
+from asyncio import Lock, Task, shield
+from collections import OrderedDict
+from glob import glob
+from mmap import mmap, ACCESS_READ
+from os import path as ospath, remove, replace
+from time import time
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from bot import bot_loop, config_dict, LOGGER
+from bot.helper.ext_utils.bot_utils import sync_to_async
+
+ChunkKey = Tuple[int, int]
+
+
+class ChunkCache:
+    """Chunk-aligned LRU cache for stream server reads, keyed by (media_id, offset).
+    Chunks evicted from memory are demoted to an optional on-disk tier which is
+    read back through mmap and expires after STREAM_CACHE_TTL seconds."""
+
+    def __init__(self):
+        self._memory: OrderedDict[ChunkKey, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[ChunkKey, Tuple[str, int, float]] = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_ready = ''
+        self._dir_lock = Lock()
+        self._inflight: Dict[ChunkKey, Task] = {}
+        self._writing: Set[ChunkKey] = set()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    @staticmethod
+    def _memory_limit() -> int:
+        return config_dict['STREAM_CACHE_SIZE'] * 1024 * 1024
+
+    @staticmethod
+    def _disk_limit() -> int:
+        if not config_dict['STREAM_CACHE_DIR']:
+            return 0
+        return config_dict['STREAM_CACHE_DISK_SIZE'] * 1024 * 1024
+
+    async def get(self, key: ChunkKey, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        if (chunk := self._memory.get(key)) is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return chunk
+        if task := self._inflight.get(key):
+            self.joined += 1
+        else:
+            task = self._inflight[key] = bot_loop.create_task(self._load(key, fetch))
+        return await shield(task)
+
+    async def _load(self, key: ChunkKey, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        try:
+            if (chunk := await self._disk_get(key)) is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                chunk = await fetch()
+            if chunk:
+                self._memory_put(key, chunk)
+            return chunk
+        finally:
+            del self._inflight[key]
+
+    def _memory_put(self, key: ChunkKey, chunk: bytes):
+        limit = self._memory_limit()
+        if len(chunk) > limit:
+            self._disk_put(key, chunk)
+            return
+        self._memory[key] = chunk
+        self._memory_bytes += len(chunk)
+        while self._memory_bytes > limit:
+            old_key, old_chunk = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_chunk)
+            self._disk_put(old_key, old_chunk)
+
+    def _disk_put(self, key: ChunkKey, chunk: bytes):
+        if not (limit := self._disk_limit()) or key in self._disk or key in self._writing or len(chunk) > limit:
+            return
+        file_path = ospath.join(config_dict['STREAM_CACHE_DIR'], f'{key[0]}_{key[1]}.chunk')
+        self._writing.add(key)
+        bot_loop.create_task(self._disk_write(key, file_path, chunk))
+
+    async def _disk_write(self, key: ChunkKey, file_path: str, chunk: bytes):
+        """The chunk is registered only once its file is complete, a read never sees a partly written file."""
+        try:
+            await self._prepare_dir()
+            await sync_to_async(self._write_file, file_path, chunk)
+        except Exception as e:
+            LOGGER.error('Stream cache write failed for %s: %s', file_path, e)
+            return
+        finally:
+            self._writing.discard(key)
+        if not (limit := self._disk_limit()) or key in self._disk:
+            await sync_to_async(self._remove_file, file_path)
+            return
+        self._disk[key] = (file_path, len(chunk), time() + config_dict['STREAM_CACHE_TTL'])
+        self._disk_bytes += len(chunk)
+        while self._disk_bytes > limit:
+            self._disk_drop(next(iter(self._disk)))
+
+    async def _prepare_dir(self):
+        async with self._dir_lock:
+            if self._disk_ready != (cache_dir := config_dict['STREAM_CACHE_DIR']):
+                await makedirs(cache_dir, exist_ok=True)
+                known = {entry[0] for entry in self._disk.values()}
+                for file_path in await sync_to_async(glob, ospath.join(cache_dir, '*.chunk*')):
+                    if file_path not in known:
+                        await sync_to_async(self._remove_file, file_path)
+                self._disk_ready = cache_dir
+
+    async def _disk_get(self, key: ChunkKey):
+        if not (entry := self._disk.get(key)):
+            return None
+        file_path, size, expires = entry
+        if expires < time():
+            self._disk_drop(key)
+            return None
+        try:
+            chunk = await sync_to_async(self._read_file, file_path)
+        except Exception:
+            chunk = None
+        if self._disk.get(key) is not entry:
+            return chunk if chunk is not None and len(chunk) == size else None
+        if chunk is None or len(chunk) != size:
+            self._disk_drop(key)
+            return None
+        self._disk.move_to_end(key)
+        return chunk
+
+    def _disk_drop(self, key: ChunkKey):
+        file_path, size, _ = self._disk.pop(key)
+        self._disk_bytes -= size
+        bot_loop.create_task(sync_to_async(self._remove_file, file_path))
+
+    @staticmethod
+    def _write_file(file_path: str, chunk: bytes):
+        temp_path = f'{file_path}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(chunk)
+            replace(temp_path, file_path)
+        except Exception:
+            ChunkCache._remove_file(temp_path)
+            raise
+
+    @staticmethod
+    def _read_file(file_path: str) -> bytes:
+        with open(file_path, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+            return mm[:]
+
+    @staticmethod
+    def _remove_file(file_path: str):
+        try:
+            remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    def expire(self):
+        now = time()
+        for key in [key for key, (_, _, expires) in self._disk.items() if expires < now]:
+            self._disk_drop(key)
+        limit = self._memory_limit()
+        while self._memory_bytes > limit:
+            _, old_chunk = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_chunk)
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_bytes = 0
+        for key in list(self._disk):
+            self._disk_drop(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses + self.joined
+        return {'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'joined': self.joined,
+                'hit_ratio': (lookups - self.misses) / lookups * 100 if lookups else 0,
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes}
+
+
+chunk_cache = ChunkCache()
@@ -1,19 +1,27 @@
-from asyncio import sleep
-from pyrogram import utils, raw
+from asyncio import Lock, Task, sleep
+from collections import deque
+from functools import partial
+from pyrogram import Client, utils, raw
 from pyrogram.errors import AuthBytesInvalid
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
 from pyrogram.session import Session, Auth
-from typing import Dict, Union
+from typing import Deque, Dict, List, Union
 
-from bot import bot, bot_loop, LOGGER
+from bot import bot, bot_dict, bot_loop, config_dict, LOGGER
 from bot.helper.ext_utils.exceptions import FIleNotFound
+from bot.helper.stream_utils.chunk_cache import chunk_cache
 from bot.helper.stream_utils.file_properties import get_file_ids
 
 
 class ByteStreamer:
-    def __init__(self):
+    def __init__(self, client: Client=bot, kept: bool=True):
+        self._client = client
+        self.kept = kept
         self._cached_file_ids: Dict[int, FileId] = {}
-        bot_loop.create_task(self._clean_cache())
+        self._media_sessions: Dict[int, List[Session]] = {}
+        self._download_sessions: Dict[int, List[Session]] = {}
+        self._session_lock = Lock()
+        self._cleaner = bot_loop.create_task(self._clean_cache()) if kept else None
 
     async def get_file_properties(self, message_id: int) -> FileId:
         if message_id not in self._cached_file_ids:
@@ -25,65 +33,108 @@ class ByteStreamer:
         return self._cached_file_ids[message_id]
 
     async def yield_file(self, file_id: FileId, offset: int, first_part_cut: int, last_part_cut: int, part_count: int, chunk_size: int) -> Union[str, None]:
-        media_session = await self._generate_media_session(file_id)
-        current_part = 1
-        location = await self._get_location(file_id)
+        sessions = await self.get_media_sessions(file_id)
+        location = await self.get_location(file_id)
+        prefetch = max(config_dict['STREAM_PREFETCH'], 1)
+        pending: Deque[Task] = deque()
+        next_part = 0
         try:
-            r = await media_session.invoke(raw.functions.upload.GetFile(location=location, offset=offset, limit=chunk_size))
-            if isinstance(r, raw.types.upload.File):
-                while current_part <= part_count:
-                    chunk = r.bytes
-                    if not chunk:
-                        break
-                    offset += chunk_size
-                    if part_count == 1:
-                        yield chunk[first_part_cut:last_part_cut]
-                        break
-                    if current_part == 1:
-                        yield chunk[first_part_cut:]
-                    if 1 < current_part <= part_count:
-                        yield chunk
-                    r = await media_session.invoke(raw.functions.upload.GetFile(location=location, offset=offset, limit=chunk_size))
-                    current_part += 1
+            for current_part in range(1, part_count + 1):
+                while next_part < part_count and len(pending) < prefetch:
+                    session, part_offset = sessions[next_part % len(sessions)], offset + next_part * chunk_size
+                    fetch = partial(self.get_chunk, session, location, part_offset, chunk_size)
+                    pending.append(bot_loop.create_task(chunk_cache.get((file_id.media_id, part_offset), fetch)))
+                    next_part += 1
+                chunk = await pending.popleft()
+                if not chunk:
+                    break
+                if part_count == 1:
+                    yield chunk[first_part_cut:last_part_cut]
+                elif current_part == 1:
+                    yield chunk[first_part_cut:]
+                elif current_part == part_count:
+                    yield chunk[:last_part_cut]
+                else:
+                    yield chunk
         except (TimeoutError, AttributeError) as e:
             LOGGER.error(e, exc_info=True)
         except Exception:
             pass
+        finally:
+            for task in pending:
+                task.cancel()
 
     @staticmethod
-    async def _generate_media_session(file_id: FileId) -> Session:
-        media_session = bot.media_sessions.get(file_id.dc_id, None)
+    async def get_chunk(media_session: Session, location, offset: int, chunk_size: int) -> bytes:
+        for attempt in range(3):
+            try:
+                r = await media_session.invoke(raw.functions.upload.GetFile(location=location, offset=offset, limit=chunk_size))
+                return r.bytes if isinstance(r, raw.types.upload.File) else b''
+            except TimeoutError:
+                if attempt == 2:
+                    raise
+        return b''
+
+    async def get_media_sessions(self, file_id: FileId) -> List[Session]:
+        return await self._get_sessions(self._media_sessions, file_id, config_dict['STREAM_SESSIONS'])
+
+    async def get_download_sessions(self, file_id: FileId, count: int) -> List[Session]:
+        """Sessions of Telegram downloads, kept apart from the stream ones so STREAM_SESSIONS still sizes streaming."""
+        return await self._get_sessions(self._download_sessions, file_id, count)
+
+    async def _get_sessions(self, pool: Dict[int, List[Session]], file_id: FileId, count: int) -> List[Session]:
+        async with self._session_lock:
+            sessions = pool.setdefault(file_id.dc_id, [])
+            main_session = await self._generate_media_session(file_id)
+            if not sessions or sessions[0] is not main_session:
+                await self._stop_sessions(sessions[1:])
+                sessions[:] = [main_session]
+            while len(sessions) < max(count, 1):
+                try:
+                    sessions.append(await self._create_media_session(file_id.dc_id))
+                except Exception as e:
+                    LOGGER.error('Failed to create extra media session for DC %s: %s', file_id.dc_id, e)
+                    break
+            return sessions
+
+    async def _generate_media_session(self, file_id: FileId) -> Session:
+        media_session = self._client.media_sessions.get(file_id.dc_id, None)
         if media_session is None:
-            if file_id.dc_id != await bot.storage.dc_id():
-                media_session = Session(bot,
-                                        file_id.dc_id,
-                                        await Auth(bot, file_id.dc_id, await bot.storage.test_mode()).create(),
-                                        await bot.storage.test_mode(),
-                                        is_media=True)
-                await media_session.start()
-                for _ in range(6):
-                    exported_auth = await bot.invoke(raw.functions.auth.ExportAuthorization(dc_id=file_id.dc_id))
-                    try:
-                        await media_session.invoke(raw.functions.auth.ImportAuthorization(id=exported_auth.id, bytes=exported_auth.bytes))
-                        break
-                    except AuthBytesInvalid:
-                        LOGGER.info('Invalid authorization bytes for DC %s!', file_id.dc_id)
-                        continue
-                else:
-                    await media_session.stop()
-                    raise AuthBytesInvalid
+            media_session = await self._create_media_session(file_id.dc_id)
+            self._client.media_sessions[file_id.dc_id] = media_session
+        return media_session
+
+    async def _create_media_session(self, dc_id: int) -> Session:
+        client = self._client
+        if dc_id != await client.storage.dc_id():
+            media_session = Session(client,
+                                    dc_id,
+                                    await Auth(client, dc_id, await client.storage.test_mode()).create(),
+                                    await client.storage.test_mode(),
+                                    is_media=True)
+            await media_session.start()
+            for _ in range(6):
+                exported_auth = await client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc_id))
+                try:
+                    await media_session.invoke(raw.functions.auth.ImportAuthorization(id=exported_auth.id, bytes=exported_auth.bytes))
+                    break
+                except AuthBytesInvalid:
+                    LOGGER.info('Invalid authorization bytes for DC %s!', dc_id)
+                    continue
             else:
-                media_session = Session(bot,
-                                        file_id.dc_id,
-                                        await bot.storage.auth_key(),
-                                        await bot.storage.test_mode(),
-                                        is_media=True)
-                await media_session.start()
-            bot.media_sessions[file_id.dc_id] = media_session
+                await media_session.stop()
+                raise AuthBytesInvalid
+        else:
+            media_session = Session(client,
+                                    dc_id,
+                                    await client.storage.auth_key(),
+                                    await client.storage.test_mode(),
+                                    is_media=True)
+            await media_session.start()
         return media_session
 
     @staticmethod
-    async def _get_location(file_id: FileId) -> Union[raw.types.InputPhotoFileLocation, raw.types.InputDocumentFileLocation, raw.types.InputPeerPhotoFileLocation]:
+    async def get_location(file_id: FileId) -> Union[raw.types.InputPhotoFileLocation, raw.types.InputDocumentFileLocation, raw.types.InputPeerPhotoFileLocation]:
         match file_id.file_type:
             case FileType.CHAT_PHOTO:
                 if file_id.chat_id > 0:
@@ -120,7 +171,47 @@ class ByteStreamer:
                 )
         return location
 
+    @staticmethod
+    async def _stop_sessions(sessions: List[Session]):
+        for session in sessions:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+
+    async def close(self):
+        """Stop the extra sessions, the main session of each DC belongs to the client and stops with it."""
+        if self._cleaner:
+            self._cleaner.cancel()
+        async with self._session_lock:
+            for pool in (self._media_sessions, self._download_sessions):
+                for sessions in pool.values():
+                    await self._stop_sessions(sessions[1:])
+                pool.clear()
+
     async def _clean_cache(self) -> None:
         while True:
             await sleep(30 * 60)
             self._cached_file_ids.clear()
+            chunk_cache.expire()
+
+
+def get_streamer(client: Client=bot) -> ByteStreamer:
+    """The streamers of the bot and the userbot are kept, so the stream server and Telegram downloads share their
+    media sessions. Any other client gets a new one that the caller has to `close`."""
+    if client is not bot and client is not bot_dict.get('USERBOT'):
+        return ByteStreamer(client, False)
+    if (streamer := _streamers.get(id(client))) is None or streamer._client is not client:
+        if streamer:
+            bot_loop.create_task(streamer.close())
+        streamer = _streamers[id(client)] = ByteStreamer(client)
+    return streamer
+
+
+async def drop_streamer(client: Client):
+    """Stop the streamer of a client that is about to be stopped."""
+    if streamer := _streamers.pop(id(client), None):
+        await streamer.close()
+
+
+_streamers: Dict[int, ByteStreamer] = {}
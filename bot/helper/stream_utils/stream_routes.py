@@ -7,7 +7,7 @@ from re import search as re_search
 
 from bot import LOGGER
 from bot.helper.ext_utils.exceptions import FIleNotFound, InvalidHash
-from bot.helper.stream_utils.custom_dl import ByteStreamer
+from bot.helper.stream_utils.custom_dl import get_streamer
 from bot.helper.stream_utils.render_template import render_page
 
 client_cache = {}
@@ -88,7 +88,7 @@ async def download_handler(request: web.Request):
 
 async def media_streamer(request: web.Request, message_id: int, secure_hash: str):
     if not client_cache.get('client'):
-        client_cache['client'] = ByteStreamer()
+        client_cache['client'] = get_streamer()
     stream = client_cache['client']
     file_id = await stream.get_file_properties(message_id)
     if file_id.unique_id[:6] != secure_hash:
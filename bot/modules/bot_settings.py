@@ -15,7 +15,7 @@ from bot import (bot, bot_dict, bot_lock, aria2, config_dict, Intervals, aria2_o
                  LOGGER, DATABASE_URL, DRIVES_IDS, DRIVES_NAMES, INDEX_URLS, GLOBAL_EXTENSION_FILTER, SHORTENERES, SHORTENER_APIS)
 from bot.helper.ext_utils.argo_tunnel import ping_base_route, kill_route
 from bot.helper.ext_utils.bot_utils import setInterval, sync_to_async, new_thread, cmd_exec
-from bot.helper.ext_utils.conf_loads import default_values, load_config, intialize_userbot, intialize_savebot
+from bot.helper.ext_utils.conf_loads import default_values, load_config, intialize_userbot, intialize_savebot, intialize_leech_bots
 from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.files_utils import clean_target
 from bot.helper.ext_utils.jdownloader_booter import jdownloader
@@ -222,6 +222,8 @@ async def edit_variable(_, message: Message, omsg: Message, key: str):
         await intialize_savebot(value)
     elif key == 'USER_SESSION_STRING':
         await intialize_userbot()
+    elif key == 'LEECH_BOT_TOKENS':
+        await intialize_leech_bots()
     LOGGER.info('Change var %s = %s: %s', key, value.__class__.__name__.upper(), value)
     await gather(update_buttons(omsg, 'var'), deleteMessage(message))
     if DATABASE_URL:
@@ -241,7 +243,7 @@ async def edit_variable(_, message: Message, omsg: Message, key: str):
             config_dict['STREAM_PORT'] = environ.get('PORT')
         await sleep(2)
         await start_server()
-    elif key in ['QUEUE_ALL', 'QUEUE_DOWNLOAD', 'QUEUE_UPLOAD']:
+    elif key in ['QUEUE_ALL', 'QUEUE_DOWNLOAD', 'QUEUE_UPLOAD', 'QUEUE_ENGINES']:
         await start_from_queued()
     elif key in ['RCLONE_SERVE_URL', 'RCLONE_SERVE_PORT', 'RCLONE_SERVE_USER', 'RCLONE_SERVE_PASS']:
         await rclone_serve_booter()
@@ -498,12 +500,14 @@ async def edit_bot_settings(client: Client, query: CallbackQuery):
         LOGGER.info('Change var %s = %s: %s', data[2], value.__class__.__name__.upper(), value)
         if data[2] == 'USER_SESSION_STRING':
             await intialize_userbot()
+        elif data[2] == 'LEECH_BOT_TOKENS':
+            await intialize_leech_bots()
         await update_buttons(message, 'var')
         if DATABASE_URL:
             await DbManager().update_config({data[2]: value})
         if data[2] in ('SEARCH_PLUGINS', 'SEARCH_API_LINK'):
             await initiate_search_tools()
-        elif data[2] in ['QUEUE_ALL', 'QUEUE_DOWNLOAD', 'QUEUE_UPLOAD']:
+        elif data[2] in ['QUEUE_ALL', 'QUEUE_DOWNLOAD', 'QUEUE_UPLOAD', 'QUEUE_ENGINES']:
             await start_from_queued()
         elif data[2] in ['RCLONE_SERVE_URL', 'RCLONE_SERVE_PORT', 'RCLONE_SERVE_USER', 'RCLONE_SERVE_PASS']:
             await rclone_serve_booter()
@@ -1,7 +1,7 @@
 from aiofiles import open as aiopen
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout
 from apscheduler.triggers.interval import IntervalTrigger
-from asyncio import Lock, sleep, gather
+from asyncio import Lock, Semaphore, sleep, gather
 from datetime import datetime, timedelta
 from feedparser import parse as feedparse
 from functools import partial
@@ -13,10 +13,11 @@ from re import split as re_split
 from time import time
 
 from bot import bot, scheduler, rss_dict, config_dict, LOGGER, DATABASE_URL
-from bot.helper.ext_utils.bot_utils import new_thread, new_task
+from bot.helper.ext_utils.bot_utils import new_thread, new_task, sync_to_async
 from bot.helper.ext_utils.help_messages import HelpString
 from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.exceptions import RssShutdownException
+from bot.helper.ext_utils.rss_filter import get_rss_filter, parse_filter_mode
 from bot.helper.telegram_helper.bot_commands import BotCommands
 from bot.helper.telegram_helper.button_build import ButtonMaker
 from bot.helper.telegram_helper.filters import CustomFilters
@@ -68,6 +69,19 @@ async def getRssMenu(_, message: Message):
     await sendMessage(msg, message, buttons)
 
 
+def _parse_args(item: str):
+    args = {}
+    for key in ('c', 'inf', 'exf', 'fm'):
+        arg = item.split(f' -{key} ', 1)
+        others = '|'.join(f' -{x} ' for x in ('c', 'inf', 'exf', 'fm') if x != key)
+        args[key] = re_split(others, arg[1])[0].strip() if len(arg) > 1 else None
+    return args['c'], args['inf'], args['exf'], args['fm']
+
+
+def _filter_lists(value: str):
+    return [x.split(' or ') for x in value.split('|')]
+
+
 async def rssSub(client: Client, message: Message, query: CallbackQuery):
     user_id = message.from_user.id
     handler_dict[user_id] = False
@@ -87,32 +101,22 @@ async def rssSub(client: Client, message: Message, query: CallbackQuery):
             _auto_delete(message, errmsg)
             continue
         feed_link = args[1].strip()
-        if feed_link.startswith(('-inf', '-exf', '-c')):
+        if feed_link.startswith(('-inf', '-exf', '-c', '-fm')):
             errmsg = await sendMessage(f'Wrong input in line {index}! Add Title! Read the example!', message)
             _auto_delete(message, errmsg)
             continue
         inf_lists, exf_lists = [], []
         if len(args) > 2:
-            arg = item.split(' -c ', 1)
-            cmd = re_split(' -inf | -exf ', arg[1])[0].strip() if len(arg) > 1 else None
-            arg = item.split(' -inf ', 1)
-            inf = re_split(' -c | -exf ', arg[1])[0].strip() if len(arg) > 1 else None
-            arg = item.split(' -exf ', 1)
-            exf = re_split(' -c | -inf ', arg[1])[0].strip() if len(arg) > 1 else None
+            cmd, inf, exf, fmode = _parse_args(item)
             if inf is not None:
-                filters_list = inf.split('|')
-                for x in filters_list:
-                    y = x.split(' or ')
-                    inf_lists.append(y)
+                inf_lists = _filter_lists(inf)
             if exf is not None:
-                filters_list = exf.split('|')
-                for x in filters_list:
-                    y = x.split(' or ')
-                    exf_lists.append(y)
+                exf_lists = _filter_lists(exf)
         else:
-            inf = exf = cmd = None
+            inf = exf = cmd = fmode = None
+        fmode = parse_filter_mode(fmode) if fmode else ''
         try:
-            async with ClientSession() as session, session.get(feed_link, ssl=False) as res:
+            async with (await _get_session()).get(feed_link, ssl=False) as res:
                 html = await res.text()
             rss_d = feedparse(html)
             last_title = rss_d.entries[0]['title']
@@ -126,11 +130,12 @@ async def rssSub(client: Client, message: Message, query: CallbackQuery):
                     f'Name: <code>{last_title.replace(">", "").replace("<", "")}</code>\n'
                     f'Link: <code>{last_link}</code>\n'
                     f'<b>Command: </b><code>{cmd}</code>\n'
-                    f'<b>Filters:-</b>\ninf: <code>{inf}</code>\nexf: <code>{exf}<code/>')
+                    f'<b>Filters:-</b>\ninf: <code>{inf}</code>\nexf: <code>{exf}<code/>\nmode: <code>{fmode or None}</code>')
             async with rss_dict_lock:
                 rss_dict.setdefault(user_id, {})
                 rss_dict[user_id][title] = {'link': feed_link, 'last_feed': last_link, 'last_title': last_title, 'inf': inf_lists,
-                                            'exf': exf_lists, 'paused': False, 'command': cmd, 'tag': tag}
+                                            'exf': exf_lists, 'fmode': fmode, 'paused': False, 'command': cmd, 'tag': tag}
+                get_rss_filter(rss_dict[user_id][title])
             LOGGER.info('Rss Feed Added: id: %s - title: %s - link: %s - c: %s - inf: %s - exf: %s', user_id, title, feed_link, cmd, inf, exf)
         except (IndexError, AttributeError) as e:
             emsg = f"The link: {feed_link} doesn't seem to be a RSS feed or it's region-blocked!"
@@ -192,6 +197,8 @@ async def rssUpdate(client: Client, message: Message, query: CallbackQuery, stat
                 scheduler.start()
         if is_sudo and DATABASE_URL and user_id != message.from_user.id:
             await DbManager().rss_update(user_id)
+        if state == 'unsubscribe':
+            _prune_feed_state()
         if not rss_dict[user_id]:
             async with rss_dict_lock:
                 del rss_dict[user_id]
@@ -223,6 +230,7 @@ async def rssList(query: CallbackQuery, start: int, all_users: bool=False):
                                   f'<b>Command:</b> <code>{data["command"]}</code>\n'
                                   f'<b>Inf:</b> <code>{data["inf"]}</code>\n'
                                   f'<b>Exf:</b> <code>{data["exf"]}</code>\n'
+                                  f'<b>Mode:</b> <code>{data.get("fmode") or None}</code>\n'
                                   f'<b>Paused:</b> <code>{data["paused"]}</code>\n'
                                   f'<b>User:</b> {data["tag"]}')
                     index += 1
@@ -237,6 +245,7 @@ async def rssList(query: CallbackQuery, start: int, all_users: bool=False):
                               f'<b>Command:</b> <code>{data["command"]}</code>\n'
                               f'<b>Inf:</b> <code>{data["inf"]}</code>\n'
                               f'<b>Exf:</b> <code>{data["exf"]}</code>\n'
+                              f'<b>Mode:</b> <code>{data.get("fmode") or None}</code>\n'
                               f'<b>Paused:</b> <code>{data["paused"]}</code>')
     buttons.button_data('<<', f'rss back {user_id}')
     buttons.button_data('Close', f'rss close {user_id}')
@@ -264,7 +273,7 @@ async def rssGet(_, message: Message, query: CallbackQuery):
         if data and count > 0:
             msg = await sendMessage(f'Getting the last <b>{count}</b> item(s) from {title}', message)
             try:
-                async with ClientSession() as session, session.get(data['link'], ssl=False) as res:
+                async with (await _get_session()).get(data['link'], ssl=False) as res:
                     html = await res.text()
                 rss_d = feedparse(html)
                 item_info = ''
@@ -312,32 +321,19 @@ async def rssEdit(_, message: Message, query: CallbackQuery):
             _auto_delete(message, msg)
             continue
         updated = True
-        inf_lists, exf_lists = [], []
-        arg = item.split(' -c ', 1)
-        cmd = re_split(' -inf | -exf ', arg[1])[0].strip() if len(arg) > 1 else None
-        arg = item.split(' -inf ', 1)
-        inf = re_split(' -c | -exf ', arg[1])[0].strip() if len(arg) > 1 else None
-        arg = item.split(' -exf ', 1)
-        exf = re_split(' -c | -inf ', arg[1])[0].strip() if len(arg) > 1 else None
+        cmd, inf, exf, fmode = _parse_args(item)
         async with rss_dict_lock:
             if cmd is not None:
                 if cmd.lower() == 'none':
                     cmd = None
                 rss_dict[user_id][title]['command'] = cmd
             if inf is not None:
-                if inf.lower() != 'none':
-                    filters_list = inf.split('|')
-                    for x in filters_list:
-                        y = x.split(' or ')
-                        inf_lists.append(y)
-                rss_dict[user_id][title]['inf'] = inf_lists
+                rss_dict[user_id][title]['inf'] = _filter_lists(inf) if inf.lower() != 'none' else []
             if exf is not None:
-                if exf.lower() != 'none':
-                    filters_list = exf.split('|')
-                    for x in filters_list:
-                        y = x.split(' or ')
-                        exf_lists.append(y)
-                rss_dict[user_id][title]['exf'] = exf_lists
+                rss_dict[user_id][title]['exf'] = _filter_lists(exf) if exf.lower() != 'none' else []
+            if fmode is not None:
+                rss_dict[user_id][title]['fmode'] = parse_filter_mode(fmode)
+            get_rss_filter(rss_dict[user_id][title])
     if DATABASE_URL and updated:
         await DbManager().rss_update(user_id)
     await gather(deleteMessage(message), updateRssMenu(query))
@@ -352,6 +348,7 @@ async def rssDelete(_, message: Message, query: CallbackQuery):
             del rss_dict[user]
         if DATABASE_URL:
             await DbManager().rss_delete(user)
+    _prune_feed_state()
     await updateRssMenu(query)
 
 
@@ -446,9 +443,10 @@ Examples:
 Title1 -c mirror -up remote:path/subdir -exf none -inf 1080 or 720
 Title2 -c none -inf none -opt none
 Title3 -c mirror -rcf xxx -up xxx -z pswd
+Title4 -fm iw
 
 Note:
-1. Argument -c for command and options
+1. Argument -c for command and options, -fm for filter mode (i: ignore case, w: whole words, none: reset)
 2. Only what you provide will be edited, the rest will be the same like example 2: -exf will stay same as it is.
 
 <i>Timeout: 60s.</i>
@@ -464,6 +462,7 @@ Note:
             if value.endswith('unsub'):
                 async with rss_dict_lock:
                     del rss_dict[int(data[2])]
+                _prune_feed_state()
                 if DATABASE_URL:
                     await DbManager().rss_delete(int(data[2]))
                 await updateRssMenu(query)
@@ -490,6 +489,7 @@ Note:
             if value.endswith('unsub'):
                 async with rss_dict_lock:
                     rss_dict.clear()
+                _prune_feed_state()
                 if DATABASE_URL:
                     await DbManager().trunc_table('rss')
                 await updateRssMenu(query)
@@ -534,6 +534,7 @@ Note:
             if scheduler.running:
                 await query.answer()
                 scheduler.shutdown(wait=False)
+                await close_rss_session()
                 await sleep(0.5)
                 await updateRssMenu(query)
             else:
@@ -548,91 +549,144 @@ Note:
                 await query.answer('Already Running!', True)
 
 
+class RssChatLimiter:
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._locks = {}
+        self._next_send = {}
+
+    async def wait(self, chat_id):
+        async with self._locks.setdefault(chat_id, Lock()):
+            if (delay := self._next_send.get(chat_id, 0) - time()) > 0:
+                try:
+                    await sleep(delay)
+                except:
+                    raise RssShutdownException('Rss Monitor Stopped!')
+            self._next_send[chat_id] = time() + self._interval
+
+
+rss_limiter = RssChatLimiter(3)
+feed_state = {}
+rss_session = {}
+
+
+async def _get_session() -> ClientSession:
+    if (session := rss_session.get('session')) is None or session.closed:
+        session = rss_session['session'] = ClientSession(timeout=ClientTimeout(total=60))
+    return session
+
+
+async def close_rss_session():
+    if (session := rss_session.pop('session', None)) and not session.closed:
+        await session.close()
+
+
+def _prune_feed_state():
+    links = {data['link'] for items in list(rss_dict.values()) for data in list(items.values())}
+    for link in [link for link in feed_state if link not in links]:
+        del feed_state[link]
+
+
+async def _fetch_feed(link: str):
+    headers, state = {}, feed_state.get(link, {})
+    if etag := state.get('etag'):
+        headers['If-None-Match'] = etag
+    if modified := state.get('modified'):
+        headers['If-Modified-Since'] = modified
+    async with (await _get_session()).get(link, headers=headers, ssl=False) as res:
+        if res.status == 304:
+            return None, state
+        html = await res.text()
+        state = {'etag': res.headers.get('ETag'), 'modified': res.headers.get('Last-Modified')}
+    return await sync_to_async(feedparse, html), state
+
+
+def _entry_link(entry):
+    try:
+        return entry['links'][1]['href']
+    except IndexError:
+        return entry['link']
+
+
+async def _process_feed(user, title, data):
+    if data['paused']:
+        return False
+    try:
+        rss_d, state = await _fetch_feed(data['link'])
+        if rss_d is None:
+            return True
+    except Exception as e:
+        LOGGER.error('%s - Feed Name: %s - Feed Link: %s', e, title, data['link'])
+        return False
+    try:
+        last_link, last_title = _entry_link(rss_d.entries[0]), rss_d.entries[0]['title']
+        if data['last_feed'] == last_link or data['last_title'] == last_title:
+            feed_state[data['link']] = state
+            return True
+        new_items = []
+        for entry in rss_d.entries:
+            item_title, url = entry['title'], _entry_link(entry)
+            if data['last_feed'] == url or data['last_title'] == item_title:
+                break
+            new_items.append((item_title, url))
+        else:
+            LOGGER.warning('Reached Max index no. %s for this feed: %s. Maybe you need to use less RSS_DELAY to not miss some torrents', len(rss_d.entries), title)
+        wanted = get_rss_filter(data).match_many([item_title for item_title, _ in new_items])
+        for (item_title, url), parse in zip(new_items, wanted):
+            if not parse:
+                continue
+            if cmds := data['command']:
+                cmd = cmds.split(maxsplit=1)
+                cmd.insert(1, url)
+                feed_msg = " ".join(cmd)
+                if not feed_msg.startswith('/'):
+                    feed_msg = f"/{feed_msg}"
+            else:
+                feed_msg = f"<b>Name: </b><code>{item_title.replace('>', '').replace('<', '')}</code>\n\n"
+                feed_msg += f"<b>Link: </b><code>{url}</code>"
+            feed_msg += f"\n<b>Tag: </b>{data['tag']} <code>{user}</code>"
+            await rss_limiter.wait(config_dict['RSS_CHAT'])
+            await sendCustom(feed_msg, config_dict['RSS_CHAT'])
+        async with rss_dict_lock:
+            if user not in rss_dict or not rss_dict[user].get(title, False):
+                return True
+            rss_dict[user][title].update({'last_feed': last_link, 'last_title': last_title})
+        feed_state[data['link']] = state
+        await DbManager().rss_update(user)
+        LOGGER.info('Feed Name: %s', title)
+        LOGGER.info('Last item: %s', last_link)
+    except RssShutdownException:
+        raise
+    except Exception as e:
+        LOGGER.error('%s - Feed Name: %s - Feed Link: %s', e, title, data['link'])
+    return True
+
+
 async def rssMonitor():
     if not config_dict['RSS_CHAT']:
         LOGGER.warning('RSS_CHAT not added! Shutting down rss scheduler...')
         scheduler.shutdown(wait=False)
+        await close_rss_session()
         return
     if len(rss_dict) == 0:
         scheduler.pause()
+        await close_rss_session()
         return
-    all_paused = True
-    for user, items in list(rss_dict.items()):
-        for title, data in list(items.items()):
-            try:
-                if data['paused']:
-                    continue
-                async with ClientSession() as session, session.get(data['link'], ssl=False) as res:
-                    html = await res.text()
-                rss_d = feedparse(html)
-                try:
-                    last_link = rss_d.entries[0]['links'][1]['href']
-                except IndexError:
-                    last_link = rss_d.entries[0]['link']
-                finally:
-                    all_paused = False
-                last_title = rss_d.entries[0]['title']
-                if data['last_feed'] == last_link or data['last_title'] == last_title:
-                    continue
-                feed_count = 0
-                while True:
-                    try:
-                        await sleep(10)
-                    except:
-                        raise RssShutdownException('Rss Monitor Stopped!')
-                    try:
-                        item_title = rss_d.entries[feed_count]['title']
-                        try:
-                            url = rss_d.entries[feed_count]['links'][1]['href']
-                        except IndexError:
-                            url = rss_d.entries[feed_count]['link']
-                        if data['last_feed'] == url or data['last_title'] == item_title:
-                            break
-                    except IndexError:
-                        LOGGER.warning('Reached Max index no. %s for this feed: %s. Maybe you need to use less RSS_DELAY to not miss some torrents', feed_count, title)
-                        break
-                    parse = True
-                    for flist in data['inf']:
-                        if all(x not in item_title for x in flist):
-                            parse = False
-                            feed_count += 1
-                            break
-                    if not parse:
-                        continue
-                    for flist in data['exf']:
-                        if any(x in item_title for x in flist):
-                            parse = False
-                            feed_count += 1
-                            break
-                    if not parse:
-                        continue
-                    if cmds := data['command']:
-                        cmd = cmds.split(maxsplit=1)
-                        cmd.insert(1, url)
-                        feed_msg = " ".join(cmd)
-                        if not feed_msg.startswith('/'):
-                            feed_msg = f"/{feed_msg}"
-                    else:
-                        feed_msg = f"<b>Name: </b><code>{item_title.replace('>', '').replace('<', '')}</code>\n\n"
-                        feed_msg += f"<b>Link: </b><code>{url}</code>"
-                    feed_msg += f"\n<b>Tag: </b>{data['tag']} <code>{user}</code>"
-                    await sendCustom(feed_msg, config_dict['RSS_CHAT'])
-                    feed_count += 1
-                async with rss_dict_lock:
-                    if user not in rss_dict or not rss_dict[user].get(title, False):
-                        continue
-                    rss_dict[user][title].update({'last_feed': last_link, 'last_title': last_title})
-                await DbManager().rss_update(user)
-                LOGGER.info('Feed Name: %s', title)
-                LOGGER.info('Last item: %s', last_link)
-            except RssShutdownException as ex:
-                LOGGER.info(ex)
-                break
-            except Exception as e:
-                LOGGER.error('%s - Feed Name: %s - Feed Link: %s', e, title, data['link'])
-                continue
-    if all_paused:
+    feeds = [(user, title, data) for user, items in list(rss_dict.items()) for title, data in list(items.items())]
+    semaphore = Semaphore(max(config_dict['RSS_WORKERS'], 1))
+
+    async def _worker(user, title, data):
+        async with semaphore:
+            return await _process_feed(user, title, data)
+
+    try:
+        results = await gather(*[_worker(*feed) for feed in feeds])
+    except RssShutdownException as ex:
+        LOGGER.info(ex)
+        return
+    if not any(results):
         scheduler.pause()
+        await close_rss_session()
 
 
 def addJob():